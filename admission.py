@@ -0,0 +1,310 @@
+"""
+Admission control for the expensive endpoints.
+
+Every /book (and retry) starts a Chromium flow and every /parse is an LLM
+call, so one client can crowd out everyone else. Before such a request
+runs it must pass, in order:
+
+  1. capacity: too many bookings in flight on this worker, or too many
+     parses waiting on the LLM -> 503 with Retry-After
+  2. token buckets per IP, per user (the `sub` of the bearer JWT) and, for
+     /book, per target restaurant -> 429 with Retry-After
+
+Limits are "<count>/<s|min|h>": the bucket holds <count> tokens (the burst)
+and refills at that rate.
+
+    ADMISSION_CONTROL=1
+    RATE_LIMIT_BOOK_USER=10/min    RATE_LIMIT_BOOK_IP=20/min    RATE_LIMIT_BOOK_RESTAURANT=30/min
+    RATE_LIMIT_PARSE_USER=30/min   RATE_LIMIT_PARSE_IP=60/min
+    ADMISSION_MAX_BOOKINGS=8       bookings in flight per worker
+    ADMISSION_MAX_PARSES=16        parses in flight per worker
+    ADMISSION_TRUST_PROXY=0        take the client IP from X-Forwarded-For
+    ADMISSION_BACKEND=memory       or "redis" (REDIS_URL) to share buckets between workers
+
+Capacity is per worker, since browsers belong to the worker that launched
+them; with the redis backend the buckets are shared.
+"""
+
+import os
+import re
+import json
+import math
+import time
+import logging
+from collections import Counter
+from typing import Optional, Dict, Any, Tuple, Callable
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # only needed for ADMISSION_BACKEND=redis
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+PER_SECONDS = {"s": 1.0, "min": 60.0, "h": 3600.0}
+PURGE_EVERY = 1000
+
+_RETRY_PATH = re.compile(r"^/booking/[^/]+/retry$")
+
+
+def parse_rate(text: str) -> Tuple[float, float]:
+    """'10/min' -> (refill tokens per second, burst)"""
+    count, _, unit = text.strip().partition("/")
+    if unit not in PER_SECONDS:
+        raise ValueError(f"Invalid rate limit {text!r}, expected e.g. 10/min")
+    burst = float(count)
+    return burst / PER_SECONDS[unit], burst
+
+
+class MemoryBuckets:
+    """Token buckets in this process"""
+
+    def __init__(self):
+        # key -> (tokens, updated, rate, burst)
+        self.buckets: Dict[str, Tuple[float, float, float, float]] = {}
+        self.calls = 0
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        """Take one token; returns 0 if taken, else seconds until one is available"""
+        now = time.monotonic()
+        self.calls += 1
+        if self.calls % PURGE_EVERY == 0:
+            # Buckets that have refilled completely (at their own rate) carry no state
+            self.buckets = {k: v for k, v in self.buckets.items() if v[0] + (now - v[1]) * v[2] < v[3]}
+        tokens, updated, _, _ = self.buckets.get(key, (burst, now, rate, burst))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        if tokens >= 1:
+            self.buckets[key] = (tokens - 1, now, rate, burst)
+            return 0.0
+        self.buckets[key] = (tokens, now, rate, burst)
+        return (1 - tokens) / rate
+
+
+# Refill and take atomically; returns the wait as a string (Lua numbers become integers)
+_TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisBuckets:
+    """Token buckets shared by every worker; a Redis outage admits requests rather than failing them"""
+
+    def __init__(self, url: str, prefix: str = "admission:"):
+        if aioredis is None:
+            raise RuntimeError("ADMISSION_BACKEND=redis requires the redis package")
+        self.client = aioredis.from_url(url)
+        self.script = self.client.register_script(_TAKE_SCRIPT)
+        self.prefix = prefix
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        try:
+            wait = await self.script(keys=[self.prefix + key], args=[rate, burst, time.time()])
+        except Exception as e:
+            logger.warning("Rate limit backend unavailable, admitting: %s", e)
+            return 0.0
+        return float(wait)
+
+
+class Rejection:
+    def __init__(self, status_code: int, reason: str, detail: str, retry_after: float):
+        self.status_code = status_code
+        self.reason = reason
+        self.detail = detail
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        buckets,
+        limits: Dict[str, Dict[str, Tuple[float, float]]],
+        active_bookings: Callable[[], int],
+        max_bookings: int = 8,
+        max_parses: int = 16,
+        trust_proxy: bool = False,
+    ):
+        self.buckets = buckets
+        self.limits = limits  # route -> scope -> (rate, burst)
+        self.active_bookings = active_bookings
+        self.max_bookings = max_bookings
+        self.max_parses = max_parses
+        self.trust_proxy = trust_proxy
+        self.parses_in_flight = 0
+        self.admitted: Counter = Counter()  # route -> count
+        self.rejected: Counter = Counter()  # "route:reason" -> count
+
+    def route_for(self, method: str, path: str) -> Optional[str]:
+        """Which limited route a request is, or None if it isn't limited"""
+        if method != "POST":
+            return None
+        if path in ("/parse", "/parse/stream"):
+            return "parse"
+        if path == "/book" or _RETRY_PATH.match(path):
+            return "book"
+        return None
+
+    def client_ip(self, request) -> str:
+        if self.trust_proxy and request.headers.get("x-forwarded-for"):
+            return request.headers["x-forwarded-for"].split(",")[0].strip()
+        return request.client.host if request.client else "unknown"
+
+    async def _restaurant(self, request) -> Optional[str]:
+        """Normalized restaurant + location of a /book body"""
+        try:
+            details = json.loads(await request.body()).get("reservation_details") or {}
+        except (ValueError, AttributeError):
+            return None
+        restaurant = str(details.get("restaurant") or "").strip().lower()
+        if not restaurant:
+            return None
+        return f"{restaurant}|{str(details.get('location') or '').strip().lower()}"
+
+    def _capacity(self, route: str) -> Optional[Rejection]:
+        if route == "book" and self.active_bookings() >= self.max_bookings:
+            return Rejection(503, "browser_capacity", "All booking browsers are busy, please retry shortly", 10)
+        if route == "parse" and self.parses_in_flight >= self.max_parses:
+            return Rejection(503, "llm_capacity", "The parser is busy, please retry shortly", 2)
+        return None
+
+    async def admit(self, request, route: str, user: Optional[str]) -> Optional[Rejection]:
+        """None if the request may run, else why not"""
+        rejection = self._capacity(route)
+        if rejection is None:
+            limits = self.limits.get(route, {})
+            keys = [("ip", self.client_ip(request))]
+            if user:
+                keys.append(("user", user))
+            if route == "book" and "restaurant" in limits and request.url.path == "/book":
+                keys.append(("restaurant", await self._restaurant(request)))
+            for scope, value in keys:
+                if scope not in limits or value is None:
+                    continue
+                rate, burst = limits[scope]
+                wait = await self.buckets.take(f"{route}:{scope}:{value}", rate, burst)
+                if wait > 0:
+                    rejection = Rejection(429, scope, f"Too many {route} requests for this {scope}, please slow down", wait)
+                    break
+
+        if rejection is not None:
+            self.rejected[f"{route}:{rejection.reason}"] += 1
+            return rejection
+        self.admitted[route] += 1
+        if route == "parse":
+            self.parses_in_flight += 1
+        return None
+
+    def finished(self, route: str) -> None:
+        """An admitted request's response has been fully sent"""
+        if route == "parse":
+            self.parses_in_flight -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self.buckets).__name__,
+            "max_bookings": self.max_bookings,
+            "max_parses": self.max_parses,
+            "active_bookings": self.active_bookings(),
+            "parses_in_flight": self.parses_in_flight,
+            "limits": {
+                route: {scope: f"{burst:g} per {burst / rate:g}s" for scope, (rate, burst) in scopes.items()}
+                for route, scopes in self.limits.items()
+            },
+            "admitted": dict(self.admitted),
+            "rejected": dict(self.rejected),
+        }
+
+
+class AdmissionMiddleware:
+    """
+    Runs admit() before limited routes. Plain ASGI rather than
+    BaseHTTPMiddleware so finished() runs in a finally around the whole
+    response, streamed bodies and client disconnects included.
+    """
+
+    def __init__(self, app: ASGIApp, controller: AdmissionController, user_for: Callable[[Request], Optional[str]]):
+        self.app = app
+        self.controller = controller
+        self.user_for = user_for
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        route = self.controller.route_for(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope, receive)
+        if route == "book":
+            # admit() may read the body for the restaurant; replay it downstream
+            body = await request.body()
+            receive = _replay(body, receive)
+        rejection = await self.controller.admit(request, route, self.user_for(request))
+        if rejection is not None:
+            response = JSONResponse(
+                status_code=rejection.status_code,
+                content={"detail": rejection.detail},
+                headers={"Retry-After": str(rejection.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.finished(route)
+
+
+def _replay(body: bytes, receive: Receive) -> Receive:
+    sent = False
+
+    async def replayed() -> Message:
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return replayed
+
+
+def build_admission_controller(active_bookings: Callable[[], int]) -> AdmissionController:
+    """Configured from the environment (see module docstring)"""
+    def limit(name: str, default: str) -> Tuple[float, float]:
+        return parse_rate(os.getenv(name, default))
+
+    limits = {
+        "book": {
+            "user": limit("RATE_LIMIT_BOOK_USER", "10/min"),
+            "ip": limit("RATE_LIMIT_BOOK_IP", "20/min"),
+            "restaurant": limit("RATE_LIMIT_BOOK_RESTAURANT", "30/min"),
+        },
+        "parse": {
+            "user": limit("RATE_LIMIT_PARSE_USER", "30/min"),
+            "ip": limit("RATE_LIMIT_PARSE_IP", "60/min"),
+        },
+    }
+    if os.getenv("ADMISSION_BACKEND", "memory") == "redis":
+        buckets = RedisBuckets(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    else:
+        buckets = MemoryBuckets()
+    return AdmissionController(
+        buckets,
+        limits,
+        active_bookings,
+        max_bookings=int(os.getenv("ADMISSION_MAX_BOOKINGS", "8")),
+        max_parses=int(os.getenv("ADMISSION_MAX_PARSES", "16")),
+        trust_proxy=os.getenv("ADMISSION_TRUST_PROXY") == "1",
+    )
@@ -1,9 +1,12 @@
-from fastapi import FastAPI, BackgroundTasks, HTTPException, Depends, status
+from fastapi import FastAPI, BackgroundTasks, HTTPException, Depends, Request, Header, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.responses import StreamingResponse, Response, JSONResponse
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+import os
 import uuid
+import time
 import asyncio
 from datetime import datetime, timedelta
 import logging
@@ -11,22 +14,54 @@ import json
 from sqlalchemy.orm import Session
 
 # Import your existing functions
-from parse_reservation import parse_reservation_request
-from book_opentable import book_reservation
-from database import get_db, User
+# RESERVATION_BACKEND=stub swaps in latency-simulating stubs for load testing
+RESERVATION_BACKEND = os.getenv("RESERVATION_BACKEND", "live")
+if RESERVATION_BACKEND == "stub":
+    from stub_backends import parse_reservation_request, stream_reservation_fields, book_reservation
+    parse_stats = None
+    OpenTableBooker = book_reservation_with_booker = verify_with_booker = prewarm_with_booker = None
+    preposition_with_booker = drop_book_with_booker = poll_slots_with_booker = close_global_booker = None
+else:
+    from parse_reservation import parse_reservation_request, stream_reservation_fields, parse_stats
+    from book_opentable import (
+        book_reservation, book_reservation_with_booker, verify_with_booker, prewarm_with_booker,
+        preposition_with_booker, drop_book_with_booker, poll_slots_with_booker, close_global_booker,
+        OpenTableBooker
+    )
+from loop_monitor import LoopLagMonitor
+from log_pipeline import setup_logging, shutdown_logging, booking_context
+from providers import build_default_registry
+from book_resy import close_resy_clients
+from browser_sessions import SessionManager
+from browser_farm import get_browser_farm
+from resource_watchdog import watchdog
+from profiling import profiler, current_profile
+from speculation import SpeculationManager
+from drop_scheduler import DropScheduler
+from watcher import AvailabilityWatcher, Subscription
+from artifacts import artifact_summary
+from booking_pipeline import CheckpointStore
+from booking_status import BookingStatusStore, STATUS_FIELDS
+from idempotency import IdempotencyStore, DatabaseIdempotencyStore, reservation_fingerprint
+from admission import build_admission_controller, AdmissionMiddleware
+from circuit_breaker import opentable_breakers
+from fast_responses import FastJSONResponse, CompressionMiddleware
+from worker_proxy import owned_booking_id, is_forwarded, forward, FORWARDED_CLIENT_HEADER
+from schemas import ParsedReservation
+from frontend_static import PrecompressedStaticFiles, frontend_directory
+from database import get_db, init_db, User
 from auth import (
     UserCreate, UserResponse, Token, create_access_token,
-    get_current_active_user, ACCESS_TOKEN_EXPIRE_MINUTES
+    get_current_active_user, token_subject, ACCESS_TOKEN_EXPIRE_MINUTES
 )
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="Restaurant Reservation API",
     description="AI-powered restaurant reservation booking system",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse,
 )
 
 # Enable CORS for frontend integration
@@ -38,35 +73,322 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Status polls and listings compress well; tiny responses aren't worth it
+app.add_middleware(CompressionMiddleware, minimum_size=int(os.getenv("GZIP_MIN_SIZE", "1000")))
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    """Profile this request when an admin asks for it with X-Profile/?profile=1"""
+    if "x-profile" not in request.headers and "profile" not in request.query_params:
+        return await call_next(request)
+    token = request.headers.get("x-admin-token") or request.query_params.get("admin_token")
+    if not profiler.authorized(token):
+        return JSONResponse(status_code=403, content={"detail": "Profiling requires a valid admin token"})
+    with profiler.profiling("request", f"{request.method} {request.url.path}",
+                            use_cprofile=True, sample_current_thread=True) as profile:
+        response = await call_next(request)
+    response.headers["X-Profile-Id"] = profile.profile_id
+    return response
+
 # In-memory storage for booking status (use Redis/DB in production)
 booking_sessions: Dict[str, Dict[str, Any]] = {}
 
+# With several API workers (production.py sets WEB_CONCURRENCY) each worker
+# mirrors its bookings' status to the database so /status works on any worker
+shared_status_store: Optional[BookingStatusStore] = None
+if int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+    shared_status_store = BookingStatusStore()
+
+# This worker's private address, set by production.py; stored with each
+# booking's status so other workers can forward requests for it here
+worker_address: Optional[str] = None
+
+async def publish_status(session: Dict[str, Any]) -> None:
+    if shared_status_store is None:
+        return
+    try:
+        await asyncio.to_thread(shared_status_store.save, session, worker_address)
+    except Exception as e:
+        logger.warning("Could not share status of booking %s: %s", session["booking_id"], e)
+
+# Set on SIGTERM: new bookings and watches are refused while in-flight
+# bookings get until drain_deadline to finish
+DRAIN_TIMEOUT = float(os.getenv("DRAIN_TIMEOUT", "120"))
+draining = False
+drain_deadline: Optional[float] = None
+
+def begin_drain() -> None:
+    global draining, drain_deadline
+    if not draining:
+        draining = True
+        drain_deadline = time.monotonic() + DRAIN_TIMEOUT
+        logger.info("Draining: refusing new bookings, %.0fs for in-flight ones", DRAIN_TIMEOUT)
+
+def reject_if_draining() -> None:
+    if draining:
+        raise HTTPException(
+            status_code=503,
+            detail="Server is shutting down, please retry",
+            headers={"Retry-After": "5"},
+        )
+
+# Duplicate /book submissions get the booking already started for them
+BOOKING_DEDUPE_WINDOW = float(os.getenv("BOOKING_DEDUPE_WINDOW", "600"))
+IDEMPOTENCY_KEY_TTL = float(os.getenv("IDEMPOTENCY_KEY_TTL", "86400"))
+idempotency_store = DatabaseIdempotencyStore() if shared_status_store is not None else IdempotencyStore()
+
+async def expire_verification(booking_id: str) -> None:
+    session = booking_sessions.get(booking_id)
+    if session and session["status"] == "awaiting_verification":
+        session["status"] = "failed"
+        session["message"] = "Verification code was not provided in time"
+        session["progress"] = "Verification expired"
+        session["updated_at"] = datetime.now()
+        await publish_status(session)
+
+# Browser sessions pinned to bookings; held while OpenTable waits for a
+# verification code so /booking/{id}/verify can resume the same page
+browser_sessions: Optional[SessionManager] = None
+if OpenTableBooker is not None:
+    browser_sessions = SessionManager(
+        booker_factory=lambda: OpenTableBooker(headless=os.getenv("OPENTABLE_HEADLESS") == "1"),
+        idle_timeout=float(os.getenv("VERIFICATION_IDLE_TIMEOUT", "300")),
+        on_expire=expire_verification,
+    )
+
+def active_booking_count() -> int:
+    return len([s for s in booking_sessions.values() if s["status"] in ("pending", "in_progress")])
+
+# Rate limits and capacity checks in front of /book and /parse
+admission_controller = None
+if os.getenv("ADMISSION_CONTROL", "1") == "1":
+    admission_controller = build_admission_controller(active_booking_count)
+
+def request_user(request: Request) -> Optional[str]:
+    authorization = request.headers.get("authorization", "")
+    return token_subject(authorization[7:]) if authorization.lower().startswith("bearer ") else None
+
+if admission_controller is not None:
+    # Reject /book and /parse over their rate limits or while capacity is saturated
+    app.add_middleware(AdmissionMiddleware, controller=admission_controller, user_for=request_user)
+
+@app.middleware("http")
+async def route_to_owner(request: Request, call_next):
+    """Send verify/retry/cancel for a booking started on another worker to that worker"""
+    if shared_status_store is None:
+        return await call_next(request)
+    if is_forwarded(request):
+        # The original client, for the per-IP rate limits applied here
+        request.scope["client"] = (request.headers.get(FORWARDED_CLIENT_HEADER, "unknown"), 0)
+        return await call_next(request)
+    booking_id = owned_booking_id(request.method, request.url.path)
+    if booking_id is None or booking_id in booking_sessions:
+        return await call_next(request)
+    owner = await asyncio.to_thread(shared_status_store.owner_of, booking_id)
+    if owner and owner != worker_address:
+        response = await forward(request, owner)
+        if response is not None:
+            return response
+    return await call_next(request)
+
+# Warm a browser on the restaurant's slot list between /parse and /book
+speculation_manager: Optional[SpeculationManager] = None
+if browser_sessions is not None and os.getenv("SPECULATIVE_PREWARM", "1") == "1":
+    speculation_manager = SpeculationManager(
+        browser_sessions,
+        prewarm_with_booker,
+        busy=active_booking_count,
+        max_active=int(os.getenv("SPECULATION_MAX_ACTIVE", "2")),
+        capacity=int(os.getenv("BROWSER_CAPACITY", "4")),
+        ttl=float(os.getenv("SPECULATION_TTL", "90")),
+    )
+
+# Bookings with release_at fire at the restaurant's table drop time
+drop_scheduler: Optional[DropScheduler] = None
+if browser_sessions is not None:
+    drop_scheduler = DropScheduler(
+        browser_sessions,
+        preposition_with_booker,
+        drop_book_with_booker,
+        lead=float(os.getenv("DROP_LEAD_SECONDS", "60")),
+        spin=float(os.getenv("DROP_SPIN_SECONDS", "0.02")),
+    )
+
+async def auto_book_watch_hit(subscription: Subscription, slot: str) -> str:
+    """Start a booking for a watched slot that just opened"""
+    if draining:
+        raise RuntimeError("Server is shutting down")
+    booking_id = str(uuid.uuid4())
+    now = datetime.now()
+    booking_sessions[booking_id] = {
+        "booking_id": booking_id,
+        "status": "pending",
+        "message": f"Slot {slot} opened, booking automatically",
+        "progress": "Initializing...",
+        "reservation_details": {
+            **{field: subscription.details.get(field) for field in ("restaurant", "location", "date", "party_size", "phone", "email")},
+            "time": slot,
+        },
+        "user_details": subscription.details.get("user_details"),
+        "provider": "opentable",
+        "debug_artifacts": False,
+        "result": None,
+        "created_at": now,
+        "updated_at": now
+    }
+    asyncio.get_running_loop().create_task(process_booking(booking_id))
+    return booking_id
+
+# One shared slot poller per watched venue, pushing diffs to subscribers
+availability_watcher: Optional[AvailabilityWatcher] = None
+if browser_sessions is not None:
+    availability_watcher = AvailabilityWatcher(
+        browser_sessions,
+        poll_slots_with_booker,
+        on_hit=auto_book_watch_hit,
+        max_pollers=int(os.getenv("WATCH_MAX_POLLERS", "8")),
+        min_interval=float(os.getenv("WATCH_MIN_INTERVAL", "15")),
+        max_interval=float(os.getenv("WATCH_MAX_INTERVAL", "300")),
+        idle_ttl=float(os.getenv("WATCH_IDLE_TTL", "600")),
+        auto_book_ttl=float(os.getenv("WATCH_AUTO_BOOK_TTL", "86400")),
+    )
+
+# Last completed booking step per booking, so retries resume mid-flow
+checkpoint_store = CheckpointStore()
+
+# Booking platforms process_booking dispatches through
+provider_registry = build_default_registry(book_reservation, book_reservation_with_booker, browser_sessions)
+
+# Event loop lag sampling, on for stub runs or with LOOP_LAG_MONITOR=1
+loop_lag_monitor: Optional[LoopLagMonitor] = None
+if RESERVATION_BACKEND == "stub" or os.getenv("LOOP_LAG_MONITOR") == "1":
+    loop_lag_monitor = LoopLagMonitor()
+
+@app.on_event("startup")
+async def init_logging():
+    # Queue-based logging; formatting and I/O happen on a listener thread
+    setup_logging()
+
+@app.on_event("startup")
+async def init_database():
+    init_db()
+
+@app.on_event("startup")
+async def start_loop_lag_monitor():
+    if loop_lag_monitor is not None:
+        loop_lag_monitor.start()
+
+@app.on_event("startup")
+async def start_browser_farm():
+    farm = get_browser_farm()
+    if farm is not None:
+        farm.start()
+
+@app.on_event("startup")
+async def start_browser_sessions():
+    if browser_sessions is not None:
+        browser_sessions.start()
+    if speculation_manager is not None:
+        speculation_manager.start()
+
+async def finish_drain() -> None:
+    """
+    Give in-flight bookings until the drain deadline, then fail the rest;
+    every completed step is checkpointed, so a retry resumes where they stopped.
+    production.py runs this before uvicorn starts cancelling request tasks.
+    """
+    begin_drain()
+    while active_booking_count() and time.monotonic() < drain_deadline:
+        await asyncio.sleep(0.5)
+
+    now = datetime.now()
+    for session in booking_sessions.values():
+        if session["status"] not in ("pending", "in_progress", "scheduled", "awaiting_verification"):
+            continue
+        session["status"] = "failed"
+        session["message"] = "Interrupted by shutdown; retry resumes from the last completed step"
+        session["progress"] = "Interrupted"
+        session["updated_at"] = now
+        await publish_status(session)
+        logger.warning("Booking %s interrupted by shutdown", session["booking_id"])
+
+@app.on_event("shutdown")
+async def drain_bookings():
+    await finish_drain()
+    if close_global_booker is not None:
+        try:
+            await asyncio.to_thread(close_global_booker)
+        except Exception as e:
+            logger.error("Error closing global booker: %s", e)
+
+@app.on_event("shutdown")
+async def stop_loop_lag_monitor():
+    if loop_lag_monitor is not None:
+        await loop_lag_monitor.stop()
+
+@app.on_event("shutdown")
+async def close_browser_sessions():
+    if availability_watcher is not None:
+        await availability_watcher.close_all()
+    if drop_scheduler is not None:
+        await drop_scheduler.close_all()
+    if speculation_manager is not None:
+        await speculation_manager.close_all()
+    if browser_sessions is not None:
+        await browser_sessions.close_all()
+
+@app.on_event("shutdown")
+async def close_provider_clients():
+    await close_resy_clients()
+
+@app.on_event("shutdown")
+async def stop_browser_farm():
+    farm = get_browser_farm()
+    if farm is not None:
+        await farm.stop()
+
+@app.on_event("shutdown")
+async def flush_logging():
+    shutdown_logging()
+
 # Pydantic models for request/response
 class ReservationRequest(BaseModel):
     user_input: str = Field(..., description="Natural language reservation request")
     
-class ParsedReservation(BaseModel):
-    restaurant: Optional[str] = None
-    date: Optional[str] = None
-    time: Optional[str] = None
-    party_size: Optional[int] = None
-    location: Optional[str] = None
-    phone: Optional[str] = None
-    email: Optional[str] = None
-    restaurant_url: Optional[str] = None
-
 class BookingRequest(BaseModel):
     reservation_details: ParsedReservation
     user_details: Optional[Dict[str, str]] = None
+    provider: Optional[str] = Field(None, description='"route", "race" or a provider name')
+    debug_artifacts: bool = Field(False, description="Keep browser traces for this booking even if it succeeds")
+    release_at: Optional[datetime] = Field(None, description="When the restaurant releases tables; the slot is clicked at this moment")
 
 class BookingResponse(BaseModel):
     booking_id: str
     status: str
     message: str
 
+class VerificationRequest(BaseModel):
+    code: str = Field(..., description="Verification code OpenTable sent to the guest")
+
+class WatchRequest(BaseModel):
+    restaurant: str
+    location: str
+    date: str
+    party_size: int
+    times: List[str] = Field(default_factory=list, description='Wanted times as "HH:MM"; empty means any')
+    auto_book: bool = Field(False, description="Book automatically when a wanted time opens")
+    phone: Optional[str] = None
+    email: Optional[str] = None
+    user_details: Optional[Dict[str, str]] = None
+
+class WatchResponse(BaseModel):
+    watch_id: str
+    subscribers: int
+    message: str
+
 class BookingStatus(BaseModel):
     booking_id: str
-    status: str  # "pending", "in_progress", "completed", "failed"
+    status: str  # "pending", "scheduled", "in_progress", "awaiting_verification", "completed", "failed"
     message: str
     progress: Optional[str] = None
     result: Optional[Dict[str, Any]] = None
@@ -83,7 +405,7 @@ async def parse_reservation(request: ReservationRequest):
     Parse natural language reservation request into structured data
     """
     try:
-        logger.info(f"Parsing reservation request: {request.user_input}")
+        logger.info("Parsing reservation request: %s", request.user_input)
         
         # Call your existing parsing function
         parsed_data = parse_reservation_request(request.user_input)
@@ -101,17 +423,69 @@ async def parse_reservation(request: ReservationRequest):
                 detail="Could not identify restaurant name. Please specify the restaurant."
             )
         
-        return ParsedReservation(**parsed_data)
+        parsed = ParsedReservation(**parsed_data)
+        if speculation_manager is not None and not draining:
+            parsed.speculation_token = speculation_manager.start_speculation(parsed.dict())
+        return parsed
         
     except Exception as e:
-        logger.error(f"Error parsing reservation: {str(e)}")
+        logger.error("Error parsing reservation: %s", e)
         raise HTTPException(status_code=500, detail=f"Parsing error: {str(e)}")
 
+@app.post("/parse/stream")
+async def parse_reservation_stream(request: ReservationRequest):
+    """
+    Parse with a streamed completion, sending each field as server-sent
+    events as soon as it is complete, then the validated reservation
+    """
+    logger.info("Streaming parse of reservation request: %s", request.user_input)
+
+    async def stream():
+        start = time.perf_counter()
+        parsed_data: Dict[str, Any] = {}
+        try:
+            async for field, value in stream_reservation_fields(request.user_input):
+                parsed_data[field] = value
+                event = {"type": "field", "field": field, "value": value,
+                         "elapsed_ms": round((time.perf_counter() - start) * 1000, 1)}
+                yield f"data: {json.dumps(event)}\n\n"
+
+            if "restaurant" not in parsed_data:
+                raise ValueError("Could not identify restaurant name. Please specify the restaurant.")
+            parsed = ParsedReservation(**parsed_data)
+            if speculation_manager is not None and not draining:
+                parsed.speculation_token = speculation_manager.start_speculation(parsed.dict())
+            event = {"type": "done", "reservation": parsed.dict(),
+                     "elapsed_ms": round((time.perf_counter() - start) * 1000, 1)}
+        except Exception as e:
+            logger.error("Error in streaming parse: %s", e)
+            event = {"type": "error", "detail": f"Parsing error: {str(e)}"}
+        yield f"data: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/parse/stats")
+async def get_parse_stats():
+    """
+    Model tier latency, token usage and escalation rate for /parse
+    """
+    if parse_stats is None:
+        raise HTTPException(status_code=404, detail="Parse stats are only recorded by the live parser")
+    return parse_stats()
+
 @app.post("/book", response_model=BookingResponse)
-async def start_booking(booking_request: BookingRequest, background_tasks: BackgroundTasks):
+async def start_booking(
+    booking_request: BookingRequest,
+    background_tasks: BackgroundTasks,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
+):
     """
-    Start the reservation booking process in the background
+    Start the reservation booking process in the background.
+    Resubmitting the same reservation (or Idempotency-Key) returns the
+    booking already started for it.
     """
+    reject_if_draining()
     try:
         # Generate unique booking ID
         booking_id = str(uuid.uuid4())
@@ -130,21 +504,68 @@ async def start_booking(booking_request: BookingRequest, background_tasks: Backg
             raise HTTPException(status_code=400, detail="Party size is required")
         if not reservation.phone:
             raise HTTPException(status_code=400, detail="Phone number is required")
-        
-        # Initialize booking session
+        if booking_request.provider and booking_request.provider not in provider_registry.modes():
+            raise HTTPException(status_code=400, detail=f"Unknown provider: {booking_request.provider}")
+        release_ts = booking_request.release_at.timestamp() if booking_request.release_at else None
+        if release_ts is not None:
+            if drop_scheduler is None:
+                raise HTTPException(status_code=400, detail="Scheduled booking requires the browser backend")
+            if release_ts <= time.time():
+                raise HTTPException(status_code=400, detail="release_at must be in the future")
+
+        # Initialize booking session (visible before claiming, so a duplicate finds it)
         now = datetime.now()
+        details = reservation.dict(exclude={"speculation_token"})
         booking_sessions[booking_id] = {
             "booking_id": booking_id,
             "status": "pending",
             "message": "Booking request received",
             "progress": "Initializing...",
-            "reservation_details": reservation.dict(),
+            "reservation_details": details,
             "user_details": booking_request.user_details,
+            "provider": booking_request.provider,
+            "debug_artifacts": booking_request.debug_artifacts,
+            "release_at": booking_request.release_at,
+            # Profile the background booking too if this request is profiled
+            "profile": current_profile.get() is not None,
             "result": None,
             "created_at": now,
             "updated_at": now
         }
+        await publish_status(booking_sessions[booking_id])
+
+        try:
+            existing = await claim_booking(booking_id, details, idempotency_key)
+        except HTTPException:
+            await drop_unstarted_booking(booking_id)
+            raise
+        if existing is not None:
+            await drop_unstarted_booking(booking_id)
+            logger.info("Duplicate booking request, returning %s", existing["booking_id"])
+            response.headers["Idempotent-Replayed"] = "true"
+            return BookingResponse(
+                booking_id=existing["booking_id"],
+                status=existing["status"],
+                message="This reservation is already being booked. Use the booking_id to check status."
+            )
+        
+        # Take over the browser warmed after /parse, or free one for this booking
+        if speculation_manager is not None and release_ts is None:
+            adopted = False
+            if reservation.speculation_token:
+                adopted = await speculation_manager.adopt(reservation.speculation_token, booking_id, details)
+            if not adopted:
+                await speculation_manager.make_room()
         
+        if release_ts is not None:
+            schedule_drop_booking(booking_id, release_ts)
+            await publish_status(booking_sessions[booking_id])
+            return BookingResponse(
+                booking_id=booking_id,
+                status="scheduled",
+                message=f"Booking scheduled for release at {booking_request.release_at.isoformat()}."
+            )
+
         # Start booking process in background
         background_tasks.add_task(process_booking, booking_id)
         
@@ -154,30 +575,97 @@ async def start_booking(booking_request: BookingRequest, background_tasks: Backg
             message="Booking process started. Use the booking_id to check status."
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error starting booking: {str(e)}")
+        logger.error("Error starting booking: %s", e)
+        # Drop the half-created booking; its dedupe claims then no longer match anything
+        booking_sessions.pop(booking_id, None)
         raise HTTPException(status_code=500, detail=f"Booking error: {str(e)}")
 
+async def known_booking(booking_id: str) -> Optional[Dict[str, Any]]:
+    """The booking's session on this worker, or its shared status from another one"""
+    if booking_id in booking_sessions:
+        return booking_sessions[booking_id]
+    if shared_status_store is not None:
+        return await asyncio.to_thread(shared_status_store.load, booking_id)
+    return None
+
+async def drop_unstarted_booking(booking_id: str) -> None:
+    """Remove a session published by /book that won't run"""
+    booking_sessions.pop(booking_id, None)
+    if shared_status_store is not None:
+        await asyncio.to_thread(shared_status_store.clear, booking_id)
+
+async def claim_booking(booking_id: str, details: Dict[str, Any], idempotency_key: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Claim the request's Idempotency-Key and reservation fingerprint for
+    booking_id. Returns the existing booking instead if this is a duplicate.
+    """
+    fingerprint = reservation_fingerprint(details)
+    claims = [(f"fp:{fingerprint}", BOOKING_DEDUPE_WINDOW)]
+    if idempotency_key:
+        claims.insert(0, (f"key:{idempotency_key}", IDEMPOTENCY_KEY_TTL))
+
+    owned = []
+    for key, ttl in claims:
+        existing = await asyncio.to_thread(idempotency_store.claim, key, fingerprint, booking_id, ttl)
+        if existing is None:
+            owned.append((key, ttl))
+            continue
+        existing_id, existing_fingerprint = existing
+        if key.startswith("key:") and existing_fingerprint != fingerprint:
+            for owned_key, _ in owned:
+                await asyncio.to_thread(idempotency_store.forget, owned_key)
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different reservation")
+        session = await known_booking(existing_id)
+        if session is None or (key.startswith("fp:") and session["status"] in ("failed", "cancelled")):
+            # Removed, or resubmitting a reservation whose booking failed: book it again
+            await asyncio.to_thread(idempotency_store.put, key, fingerprint, booking_id, ttl)
+            owned.append((key, ttl))
+            continue
+        # Keys claimed by this request now lead to the existing booking too
+        for owned_key, owned_ttl in owned:
+            await asyncio.to_thread(idempotency_store.put, owned_key, fingerprint, existing_id, owned_ttl)
+        return session
+    return None
+
 @app.get("/status/{booking_id}", response_model=BookingStatus)
 async def get_booking_status(booking_id: str):
     """
     Get the current status of a booking request
     """
-    if booking_id not in booking_sessions:
-        raise HTTPException(status_code=404, detail="Booking ID not found")
-    
-    session = booking_sessions[booking_id]
-    return BookingStatus(**session)
+    session = booking_sessions.get(booking_id)
+    if session is None:
+        # Started on another worker
+        shared = await asyncio.to_thread(shared_status_store.load, booking_id) if shared_status_store else None
+        if shared is None:
+            raise HTTPException(status_code=404, detail="Booking ID not found")
+        return FastJSONResponse(shared)
+
+    # Polled constantly: serialize the status fields directly instead of
+    # validating a BookingStatus and running it through jsonable_encoder
+    return FastJSONResponse({field: session.get(field) for field in STATUS_FIELDS})
+
+@app.get("/booking/{booking_id}/artifacts")
+async def get_booking_artifacts(booking_id: str):
+    """
+    Manifest of the traces/screenshots saved for a failed or debug booking
+    """
+    manifest = artifact_summary(booking_id)
+    if manifest is None:
+        raise HTTPException(status_code=404, detail="No artifacts saved for this booking")
+    return manifest
 
 @app.get("/bookings")
 async def list_bookings():
     """
     List all booking sessions (for debugging/admin)
     """
-    return {
+    return FastJSONResponse({
         "total": len(booking_sessions),
         "bookings": list(booking_sessions.keys())
-    }
+    })
 
 @app.delete("/booking/{booking_id}")
 async def cancel_booking(booking_id: str):
@@ -188,82 +676,373 @@ async def cancel_booking(booking_id: str):
         raise HTTPException(status_code=404, detail="Booking ID not found")
     
     session = booking_sessions[booking_id]
+    if session["status"] == "scheduled" and drop_scheduler is not None:
+        await drop_scheduler.cancel(booking_id)
+        session["status"] = "cancelled"
+        session["message"] = "Scheduled booking cancelled by user"
+        session["updated_at"] = datetime.now()
+        await publish_status(session)
+        return {"message": "Scheduled booking cancelled"}
     if session["status"] == "in_progress":
         # In a real app, you'd want to actually stop the browser automation
         session["status"] = "cancelled"
         session["message"] = "Booking cancelled by user"
         session["updated_at"] = datetime.now()
+        await publish_status(session)
         return {"message": "Booking cancelled"}
     else:
+        if browser_sessions is not None:
+            await browser_sessions.release(booking_id)
+        await asyncio.to_thread(checkpoint_store.clear, booking_id)
+        if shared_status_store is not None:
+            await asyncio.to_thread(shared_status_store.clear, booking_id)
         del booking_sessions[booking_id]
         return {"message": "Booking session removed"}
 
+@app.post("/booking/{booking_id}/retry", response_model=BookingResponse)
+async def retry_booking(booking_id: str, background_tasks: BackgroundTasks):
+    """
+    Retry a failed booking, continuing after its last completed step
+    """
+    reject_if_draining()
+    if booking_id not in booking_sessions:
+        raise HTTPException(status_code=404, detail="Booking ID not found")
+
+    session = booking_sessions[booking_id]
+    if session["status"] != "failed":
+        raise HTTPException(status_code=409, detail="Only failed bookings can be retried")
+
+    checkpoint = await asyncio.to_thread(checkpoint_store.load, booking_id)
+    resume_note = f" from after step '{checkpoint['last_step']}'" if checkpoint else " from the start"
+
+    session["status"] = "pending"
+    session["profile"] = current_profile.get() is not None
+    session["message"] = f"Retrying booking{resume_note}"
+    session["progress"] = "Initializing..."
+    session["updated_at"] = datetime.now()
+    await publish_status(session)
+    background_tasks.add_task(process_booking, booking_id)
+
+    return BookingResponse(
+        booking_id=booking_id,
+        status="pending",
+        message=f"Booking retry started{resume_note}."
+    )
+
+@app.post("/booking/{booking_id}/verify")
+async def verify_booking(booking_id: str, request: VerificationRequest):
+    """
+    Submit the verification code to the browser session held for this booking
+    """
+    if booking_id not in booking_sessions:
+        raise HTTPException(status_code=404, detail="Booking ID not found")
+
+    session = booking_sessions[booking_id]
+    browser_session = browser_sessions.get(booking_id) if browser_sessions is not None else None
+    if session["status"] != "awaiting_verification" or browser_session is None:
+        raise HTTPException(status_code=409, detail="Booking is not waiting for a verification code")
+
+    session["progress"] = "Submitting verification code..."
+    session["updated_at"] = datetime.now()
+    try:
+        with booking_context(booking_id):
+            verification = await browser_session.run(verify_with_booker, request.code, booking_id)
+    except Exception as e:
+        logger.error("Error verifying booking %s: %s", booking_id, e)
+        verification = {"success": False, "error": str(e)}
+
+    if not verification.get("success"):
+        # Keep the session held so the user can retry until it idles out
+        session["progress"] = "Verification failed, please retry"
+        session["updated_at"] = datetime.now()
+        raise HTTPException(status_code=400, detail="Failed to input verification code")
+
+    await browser_sessions.release(booking_id)
+    session["status"] = "completed"
+    session["message"] = "Reservation booked successfully with verification"
+    session["progress"] = "Completed"
+    session["result"] = {**(session["result"] or {}), **verification, "verification_pending": False}
+    session["updated_at"] = datetime.now()
+    await publish_status(session)
+    return {"booking_id": booking_id, "status": "completed", "message": session["message"]}
+
 async def process_booking(booking_id: str):
     """
     Background task to handle the actual booking process
     """
+    # Tag every log line from this booking (including browser threads)
+    with booking_context(booking_id):
+        if booking_sessions[booking_id].get("profile"):
+            with profiler.profiling("booking", f"booking {booking_id}", profile_id=f"booking-{booking_id}"):
+                await run_booking(booking_id)
+        else:
+            await run_booking(booking_id)
+
+async def run_booking(booking_id: str):
     session = booking_sessions[booking_id]
     
     try:
         # Update status to in_progress
         session["status"] = "in_progress"
-        session["message"] = "Starting browser automation..."
-        session["progress"] = "Opening OpenTable..."
+        session["message"] = "Starting booking..."
+        session["progress"] = "Selecting booking provider..."
         session["updated_at"] = datetime.now()
+        await publish_status(session)
         
-        logger.info(f"Starting booking process for {booking_id}")
+        logger.info("Starting booking process for %s", booking_id)
         
         # Prepare data for the booking function
-        booking_data = session["reservation_details"].copy()
-        
-        # Add user details if provided
-        if session.get("user_details"):
-            booking_data["user_details"] = session["user_details"]
+        booking_data = booking_data_for(booking_id)
         
         # Update progress
         session["progress"] = "Searching for restaurant..."
         session["updated_at"] = datetime.now()
         
-        # Call your existing booking function
-        # Note: This needs to be run in a thread since it's synchronous
-        import concurrent.futures
-        
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            future = executor.submit(book_reservation, booking_data)
-            result = future.result()  # This will block until completion
+        # Dispatch through the provider registry; blocking providers run
+        # in a worker thread so the event loop stays responsive
+        result = await provider_registry.book(booking_data, mode=session.get("provider"))
         
         # Update session with results
-        if result.get("success"):
-            session["status"] = "completed"
-            session["message"] = "Reservation booked successfully!"
-            session["progress"] = "Completed"
-            session["result"] = result
-        else:
-            session["status"] = "failed"
-            session["message"] = f"Booking failed: {result.get('error', 'Unknown error')}"
-            session["progress"] = "Failed"
-            session["result"] = result
+        record_booking_result(session, result)
             
     except Exception as e:
-        logger.error(f"Error in booking process {booking_id}: {str(e)}")
+        logger.error("Error in booking process %s: %s", booking_id, e)
         session["status"] = "failed"
         session["message"] = f"Booking failed due to error: {str(e)}"
         session["progress"] = "Error occurred"
         session["result"] = {"success": False, "error": str(e)}
     
     finally:
+        if browser_sessions is not None:
+            # A warm session the booking didn't end up using (e.g. routed to Resy)
+            await browser_sessions.drop_adopted(booking_id)
         session["updated_at"] = datetime.now()
-        logger.info(f"Booking process completed for {booking_id}: {session['status']}")
+        await publish_status(session)
+        logger.info("Booking process completed for %s: %s", booking_id, session['status'])
+
+def booking_data_for(booking_id: str) -> Dict[str, Any]:
+    """The dict the booking functions take, built from the stored session"""
+    session = booking_sessions[booking_id]
+    booking_data = session["reservation_details"].copy()
+    booking_data["booking_id"] = booking_id
+    booking_data["debug_artifacts"] = session.get("debug_artifacts", False)
+    if session.get("user_details"):
+        booking_data["user_details"] = session["user_details"]
+    return booking_data
+
+def record_booking_result(session: Dict[str, Any], result: Dict[str, Any]) -> None:
+    if result.get("success") and result.get("verification_pending"):
+        session["status"] = "awaiting_verification"
+        session["message"] = "Enter the verification code sent by the restaurant"
+        session["progress"] = "Waiting for verification code"
+    elif result.get("success"):
+        session["status"] = "completed"
+        session["message"] = "Reservation booked successfully!"
+        session["progress"] = "Completed"
+    else:
+        session["status"] = "failed"
+        session["message"] = f"Booking failed: {result.get('error', 'Unknown error')}"
+        session["progress"] = "Failed fast (circuit open)" if result.get("circuit_open") else "Failed"
+    session["result"] = result
+    session["updated_at"] = datetime.now()
+
+def schedule_drop_booking(booking_id: str, release_ts: float) -> None:
+    session = booking_sessions[booking_id]
+    session["status"] = "scheduled"
+    session["message"] = "Waiting for the restaurant to release tables"
+    session["progress"] = "Scheduled"
+
+    def on_progress(progress: str) -> None:
+        session["progress"] = progress
+        session["updated_at"] = datetime.now()
+
+    async def on_result(result: Dict[str, Any]) -> None:
+        if session["status"] != "cancelled":
+            record_booking_result(session, result)
+            await publish_status(session)
+        logger.info("Scheduled booking completed for %s: %s", booking_id, session["status"])
+
+    # The scheduler task inherits the booking context for its logs
+    with booking_context(booking_id):
+        drop_scheduler.schedule(booking_id, booking_data_for(booking_id), release_ts, on_progress, on_result)
 
 # Health check endpoint
 @app.get("/health")
 async def health_check():
+    circuits = opentable_breakers.snapshot()
+    degraded = any(circuit["state"] != "closed" for circuit in circuits.values())
     return {
-        "status": "healthy",
+        "status": "draining" if draining else "degraded" if degraded else "healthy",
         "timestamp": datetime.now(),
-        "active_bookings": len([s for s in booking_sessions.values() if s["status"] == "in_progress"])
+        "active_bookings": len([s for s in booking_sessions.values() if s["status"] == "in_progress"]),
+        "circuits": circuits
     }
 
+@app.get("/debug/loop-lag")
+async def get_loop_lag(reset: bool = False):
+    """
+    Event loop lag statistics (used by benchmarks/load_test.py)
+    """
+    if loop_lag_monitor is None:
+        raise HTTPException(status_code=404, detail="Loop lag monitor is disabled")
+    stats = loop_lag_monitor.stats()
+    if reset:
+        loop_lag_monitor.reset()
+    return {"backend": RESERVATION_BACKEND, "loop_lag": stats}
+
+@app.get("/providers")
+async def list_providers():
+    """
+    Registered booking providers and their routing stats
+    """
+    return provider_registry.snapshot()
+
+@app.post("/watch", response_model=WatchResponse)
+async def create_watch(request: WatchRequest):
+    """
+    Watch a restaurant for open slots; subscribers to the same venue share one poller
+    """
+    if availability_watcher is None:
+        raise HTTPException(status_code=404, detail="Availability watching requires the browser backend")
+    reject_if_draining()
+    if request.auto_book and not request.phone:
+        raise HTTPException(status_code=400, detail="Phone number is required for auto-booking")
+    try:
+        subscription = availability_watcher.subscribe(request.dict(), request.times, request.auto_book)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    poller = availability_watcher.pollers[subscription.key]
+    return WatchResponse(
+        watch_id=subscription.watch_id,
+        subscribers=len(poller.subscribers),
+        message="Watching for open slots. Subscribe to /watch/{watch_id}/events for updates."
+    )
+
+@app.get("/watch/{watch_id}/events")
+async def watch_events(watch_id: str):
+    """
+    Server-sent events with slot snapshots and diffs for a watch
+    """
+    subscription = availability_watcher.subscriptions.get(watch_id) if availability_watcher is not None else None
+    if subscription is None:
+        raise HTTPException(status_code=404, detail="Watch ID not found")
+
+    async def stream():
+        # A subscription whose client went away without DELETE expires once detached
+        subscription.attach()
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.events.get(), timeout=15.0)
+                except asyncio.TimeoutError:
+                    # Keep proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {json.dumps(event)}\n\n"
+                if event["type"] in ("closed", "booking_started"):
+                    break
+        finally:
+            subscription.detach()
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.delete("/watch/{watch_id}")
+async def delete_watch(watch_id: str):
+    """
+    Stop watching; the venue's poller stops with its last subscriber
+    """
+    if availability_watcher is None or not await availability_watcher.unsubscribe(watch_id):
+        raise HTTPException(status_code=404, detail="Watch ID not found")
+    return {"message": "Watch removed"}
+
+@app.get("/watches")
+async def list_watches():
+    """
+    Watched venues, their subscribers, poll intervals and total page loads
+    """
+    if availability_watcher is None:
+        raise HTTPException(status_code=404, detail="Availability watching is disabled")
+    return availability_watcher.snapshot()
+
+@app.get("/browser-nodes")
+async def list_browser_nodes():
+    """
+    Remote browser nodes with their load and health
+    """
+    farm = get_browser_farm()
+    if farm is None:
+        raise HTTPException(status_code=404, detail="No browser nodes configured; browsers launch locally")
+    return farm.snapshot()
+
+@app.get("/resources")
+async def browser_resources():
+    """
+    Browser memory/CPU per booking and recycle counts from the watchdog
+    """
+    return watchdog.snapshot()
+
+@app.get("/scheduled")
+async def list_scheduled():
+    """
+    Pending drop-time bookings and trigger-to-click latency stats
+    """
+    if drop_scheduler is None:
+        raise HTTPException(status_code=404, detail="Scheduled booking is disabled")
+    return drop_scheduler.snapshot()
+
+@app.get("/admission")
+async def admission_stats():
+    """
+    Rate limits, capacity and admitted/rejected counts per route and reason
+    """
+    if admission_controller is None:
+        raise HTTPException(status_code=404, detail="Admission control is disabled")
+    return admission_controller.snapshot()
+
+@app.get("/speculations")
+async def list_speculations():
+    """
+    Speculative prewarm budget, counters and sessions currently warming
+    """
+    if speculation_manager is None:
+        raise HTTPException(status_code=404, detail="Speculative prewarm is disabled")
+    return speculation_manager.snapshot()
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    if not profiler.authorized(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+@app.get("/admin/profiles", dependencies=[Depends(require_admin)])
+async def list_profiles():
+    """
+    Stored request/booking profiles, newest first
+    """
+    return {"profiles": profiler.list()}
+
+@app.get("/admin/profiles/{profile_id}.pstats", dependencies=[Depends(require_admin)])
+async def download_profile_pstats(profile_id: str):
+    """
+    cProfile stats for a request profile (load with pstats.Stats or snakeviz)
+    """
+    profile = profiler.get(profile_id)
+    if profile is None or profile.pstats is None:
+        raise HTTPException(status_code=404, detail="No pstats for this profile")
+    return Response(
+        content=profile.pstats,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.pstats"'},
+    )
+
+@app.get("/admin/profiles/{profile_id}.collapsed", dependencies=[Depends(require_admin)])
+async def download_profile_collapsed(profile_id: str):
+    """
+    Sampled stacks in collapsed format (flamegraph.pl, speedscope)
+    """
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return Response(content=profile.collapsed(), media_type="text/plain")
+
 # User management endpoints
 @app.post("/users/", response_model=UserResponse)
 async def create_user(user: UserCreate, db: Session = Depends(get_db)):
@@ -309,6 +1088,9 @@ async def login_for_access_token(
 async def read_users_me(current_user: User = Depends(get_current_active_user)):
     return current_user
 
+# Serve the frontend (built by build_frontend.py if available) from /app
+app.mount("/app", PrecompressedStaticFiles(directory=str(frontend_directory()), html=True), name="frontend")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
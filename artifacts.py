@@ -0,0 +1,211 @@
+"""
+Failure artifacts for browser bookings.
+
+Each booking records a Playwright trace one chunk per step. A step that
+succeeds has its chunk discarded without touching disk; a failing step's
+chunk is staged in a temporary directory, since a retry may still save the
+booking. If the booking fails the staged chunks are moved to
+artifacts/<booking_id>/ together with a manifest of the last few steps
+(URL, timing, outcome) kept in a bounded in-memory ring and any screenshots
+captured on error; if it succeeds they are deleted. With debug enabled for
+a booking every step's chunk is kept, whether or not the booking fails.
+
+    BOOKING_ARTIFACTS=0                  disable tracing entirely
+    BOOKING_ARTIFACT_DIR=artifacts       where failed bookings are written
+    BOOKING_ARTIFACT_MAX_MB=25           per-booking size cap
+    BOOKING_ARTIFACT_RETENTION_DAYS=7    older booking dirs are pruned
+    BOOKING_ARTIFACT_MAX_BOOKINGS=200    keep at most this many booking dirs
+"""
+
+import os
+import json
+import time
+import shutil
+import logging
+import tempfile
+from collections import deque
+from datetime import datetime
+from typing import Optional, Dict, Any, List
+
+logger = logging.getLogger(__name__)
+
+ARTIFACTS_ENABLED = os.getenv("BOOKING_ARTIFACTS", "1") == "1"
+ARTIFACT_DIR = os.getenv("BOOKING_ARTIFACT_DIR", "artifacts")
+MAX_BOOKING_BYTES = int(float(os.getenv("BOOKING_ARTIFACT_MAX_MB", "25")) * 1024 * 1024)
+RETENTION_DAYS = float(os.getenv("BOOKING_ARTIFACT_RETENTION_DAYS", "7"))
+MAX_BOOKINGS = int(os.getenv("BOOKING_ARTIFACT_MAX_BOOKINGS", "200"))
+RING_SIZE = 8
+MAX_SCREENSHOT_BYTES = 2 * 1024 * 1024
+
+
+class ArtifactRecorder:
+    def __init__(self, booking_id: str, context, debug: bool = False, ring_size: int = RING_SIZE):
+        self.booking_id = booking_id
+        self.context = context
+        self.debug = debug
+        self.ring: deque = deque(maxlen=ring_size)
+        self.screenshots: deque = deque(maxlen=2)
+        self.tracing = False
+        self.current_step: Optional[str] = None
+        self.step_count = 0
+        self.step_started = 0.0
+        self.saved_files: List[str] = []
+        self.bytes_written = 0
+        # Failed steps' chunks until the booking's outcome is known
+        self.staging: Optional[str] = None
+
+    @property
+    def directory(self) -> str:
+        return os.path.join(ARTIFACT_DIR, self.booking_id)
+
+    def start(self) -> None:
+        try:
+            self.context.tracing.start(screenshots=self.debug, snapshots=True, sources=False)
+            self.tracing = True
+        except Exception as e:
+            logger.warning("Could not start tracing for %s: %s", self.booking_id, e)
+
+    def begin_step(self, name: str) -> None:
+        self.current_step = name
+        self.step_count += 1
+        self.step_started = time.perf_counter()
+        if self.tracing:
+            self.context.tracing.start_chunk(title=name)
+
+    def end_step(self, ok: bool, page=None, detail: Optional[str] = None) -> None:
+        name = self.current_step or "unknown"
+        self.ring.append({
+            "step": name,
+            "ok": ok,
+            "url": _safe_url(page),
+            "duration_ms": round((time.perf_counter() - self.step_started) * 1000, 1),
+            "at": datetime.now().isoformat(timespec="milliseconds"),
+            "detail": detail,
+        })
+        if self.tracing:
+            if ok and not self.debug:
+                # Discard the chunk; nothing is written for successful steps
+                self.context.tracing.stop_chunk()
+            else:
+                self._stop_chunk_to_disk(name)
+        self.current_step = None
+
+    def capture_screenshot(self, page, label: str) -> None:
+        """Keep a screenshot in memory; only written if the booking fails"""
+        try:
+            data = page.screenshot(full_page=False)
+        except Exception as e:
+            logger.debug("Could not capture %s screenshot: %s", label, e)
+            return
+        if len(data) <= MAX_SCREENSHOT_BYTES:
+            self.screenshots.append((label, data))
+
+    def _chunk_directory(self) -> str:
+        if self.debug:
+            os.makedirs(self.directory, exist_ok=True)
+            return self.directory
+        if self.staging is None:
+            self.staging = tempfile.mkdtemp(prefix=f"booking-{self.booking_id}-")
+        return self.staging
+
+    def _stop_chunk_to_disk(self, step: str) -> None:
+        path = os.path.join(self._chunk_directory(), f"{self.step_count:02d}-{step}.trace.zip")
+        try:
+            self.context.tracing.stop_chunk(path=path)
+        except Exception as e:
+            logger.warning("Could not save trace chunk for %s: %s", self.booking_id, e)
+            return
+        self._account(path)
+
+    def _account(self, path: str) -> None:
+        size = os.path.getsize(path)
+        if self.bytes_written + size > MAX_BOOKING_BYTES:
+            os.remove(path)
+            logger.warning("Dropped %s (%d bytes): booking artifact cap reached", os.path.basename(path), size)
+            return
+        self.bytes_written += size
+        self.saved_files.append(os.path.basename(path))
+
+    def finish(self, success: bool) -> Optional[str]:
+        """
+        Stop tracing. Returns the artifact directory if anything was kept
+        (the booking failed or debug was on), otherwise None.
+        """
+        if self.tracing:
+            try:
+                self.context.tracing.stop()
+            except Exception as e:
+                logger.debug("Error stopping tracing: %s", e)
+            self.tracing = False
+
+        if success and not self.debug:
+            self._drop_staging()
+            return None
+
+        os.makedirs(self.directory, exist_ok=True)
+        if self.staging is not None:
+            for name in os.listdir(self.staging):
+                shutil.move(os.path.join(self.staging, name), os.path.join(self.directory, name))
+            self._drop_staging()
+        for label, data in self.screenshots:
+            path = os.path.join(self.directory, f"{label}.png")
+            with open(path, "wb") as f:
+                f.write(data)
+            self._account(path)
+        self.screenshots.clear()
+
+        manifest = {
+            "booking_id": self.booking_id,
+            "success": success,
+            "debug": self.debug,
+            "saved_at": datetime.now().isoformat(timespec="seconds"),
+            "steps": list(self.ring),
+            "files": self.saved_files,
+        }
+        with open(os.path.join(self.directory, "manifest.json"), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        prune_artifacts()
+        logger.info("Saved booking artifacts to %s", self.directory)
+        return self.directory
+
+    def _drop_staging(self) -> None:
+        if self.staging is not None:
+            shutil.rmtree(self.staging, ignore_errors=True)
+            self.staging = None
+
+
+def _safe_url(page) -> Optional[str]:
+    try:
+        return page.url if page is not None else None
+    except Exception:
+        return None
+
+
+def prune_artifacts() -> int:
+    """Apply retention: drop booking dirs past the age limit or over the count cap"""
+    if not os.path.isdir(ARTIFACT_DIR):
+        return 0
+    entries = []
+    for name in os.listdir(ARTIFACT_DIR):
+        path = os.path.join(ARTIFACT_DIR, name)
+        if os.path.isdir(path):
+            entries.append((os.path.getmtime(path), path))
+    entries.sort(reverse=True)
+
+    cutoff = time.time() - RETENTION_DAYS * 86400
+    removed = 0
+    for index, (mtime, path) in enumerate(entries):
+        if index >= MAX_BOOKINGS or mtime < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+    return removed
+
+
+def artifact_summary(booking_id: str) -> Optional[Dict[str, Any]]:
+    """Manifest for a booking's saved artifacts, if any"""
+    path = os.path.join(ARTIFACT_DIR, booking_id, "manifest.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
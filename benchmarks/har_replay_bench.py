@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark the OpenTable flow on recorded traffic
+
+Replays a HAR recording (see har_replay.py) several times and reports the
+wall time of the whole flow. Every version runs against identical traffic,
+so results from two checkouts can be compared directly.
+
+Usage (from the repository root):
+
+    python -m benchmarks.har_replay_bench --runs 5 --output results/har_new.json
+    python -m benchmarks.har_replay_bench --baseline results/har_old.json
+"""
+
+import os
+import sys
+import json
+import argparse
+import platform
+import subprocess
+from datetime import datetime
+from typing import Dict, Any
+
+from har_replay import DEFAULT_HAR, load_recording, replay_booking
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_benchmark(har_path: str, runs: int) -> Dict[str, Any]:
+    expected = load_recording(har_path)["outcome"]
+    times = []
+    mismatches = 0
+    for run in range(runs):
+        outcome, elapsed = replay_booking(har_path)
+        times.append(elapsed)
+        if outcome != expected:
+            mismatches += 1
+        print(f"   run {run + 1}/{runs}: {elapsed:.2f}s {'✅' if outcome == expected else '❌ ' + str(outcome)}")
+    ordered = sorted(times)
+    return {
+        "har": os.path.relpath(har_path, REPO_ROOT),
+        "runs": runs,
+        "mismatches": mismatches,
+        "seconds": {
+            "min": round(ordered[0], 3),
+            "p50": round(ordered[len(ordered) // 2], 3),
+            "max": round(ordered[-1], 3),
+        },
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    print(f"\n🔍 Compared to baseline ({baseline.get('revision')} -> {report['revision']})")
+    if baseline.get("har") != report["har"]:
+        print(f"   ⚠️  baseline used {baseline.get('har')}, results are not comparable")
+    for label in ("min", "p50", "max"):
+        old_value = baseline["seconds"][label]
+        new_value = report["seconds"][label]
+        change = ((new_value - old_value) / old_value * 100) if old_value else 0.0
+        print(f"   {label}: {old_value}s -> {new_value}s ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the OpenTable flow on a HAR recording")
+    parser.add_argument("--har", default=DEFAULT_HAR, help="Recording to replay")
+    parser.add_argument("--runs", type=int, default=5, help="Replays to time (default: 5)")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--baseline", help="Previous results JSON to compare against")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.har):
+        sys.exit(f"No recording at {args.har}; run 'python har_replay.py record' first")
+
+    print(f"🚀 Replaying {args.har} {args.runs} times...")
+    report = run_benchmark(args.har, args.runs)
+    report.update({
+        "timestamp": datetime.now().isoformat(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+    })
+    print(f"\n📊 p50 {report['seconds']['p50']}s, min {report['seconds']['min']}s, "
+          f"max {report['seconds']['max']}s, {report['mismatches']} mismatched outcomes")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(report, json.load(f))
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results saved to {args.output}")
+
+    if report["mismatches"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Import-time profile and cold start benchmark for the API
+
+Runs `python -X importtime -c "import app"` in a fresh interpreter and
+reports the slowest imports, plus the median wall time of a bare
+`import app` over several runs.
+
+Usage (from the repository root):
+
+    python -m benchmarks.import_profile
+    python -m benchmarks.import_profile --module app --top 25 --runs 5 --output results/startup.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from typing import Dict, Any, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def importtime_report(module: str, env: Dict[str, str]) -> List[Dict[str, Any]]:
+    """Parse -X importtime output into one entry per imported module"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3:
+            continue
+        name = fields[2].rstrip()
+        entries.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+            "self_ms": int(fields[0]) / 1000,
+            "cumulative_ms": int(fields[1]) / 1000,
+        })
+    return entries
+
+
+def cold_import_times(module: str, env: Dict[str, str], runs: int) -> List[float]:
+    """Wall time of `import module` in a fresh interpreter, per run"""
+    code = f"import time; s = time.perf_counter(); import {module}; print(time.perf_counter() - s)"
+    times = []
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+        times.append(float(proc.stdout.strip().splitlines()[-1]))
+    return times
+
+
+def top_level_packages(entries: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Cumulative time grouped by top-level package (depth-1 imports only)"""
+    totals: Dict[str, float] = {}
+    for entry in entries:
+        if entry["depth"] == 1:
+            package = entry["module"].split(".")[0]
+            totals[package] = totals.get(package, 0.0) + entry["cumulative_ms"]
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile import time and cold start of the API")
+    parser.add_argument("--module", default="app", help="Module to import (default: app)")
+    parser.add_argument("--top", type=int, default=20, help="Number of slowest imports to show")
+    parser.add_argument("--runs", type=int, default=5, help="Cold import runs for the wall time median")
+    parser.add_argument("--output", help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    env = os.environ.copy()
+    env.setdefault("RESERVATION_BACKEND", "live")
+
+    print(f"⏱️  Profiling `import {args.module}`...")
+    entries = importtime_report(args.module, env)
+    times = cold_import_times(args.module, env, args.runs)
+
+    slowest = sorted(entries, key=lambda e: e["self_ms"], reverse=True)[:args.top]
+    packages = top_level_packages(entries)
+
+    print(f"\n📦 Cold import wall time: median {statistics.median(times) * 1000:.1f} ms over {len(times)} runs")
+    print(f"\n{'self ms':>10}{'cum ms':>10}  module")
+    for entry in slowest:
+        print(f"{entry['self_ms']:>10.1f}{entry['cumulative_ms']:>10.1f}  {entry['module']}")
+
+    print(f"\n{'cum ms':>10}  top-level import")
+    for package, total in list(packages.items())[:args.top]:
+        print(f"{total:>10.1f}  {package}")
+
+    if args.output:
+        report = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "module": args.module,
+            "python": sys.version.split()[0],
+            "cold_import_ms": {
+                "median": round(statistics.median(times) * 1000, 2),
+                "runs": [round(t * 1000, 2) for t in times],
+            },
+            "top_level_ms": packages,
+            "slowest": slowest,
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
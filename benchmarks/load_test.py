@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Load generator for the reservation API
+
+Drives /parse, /book and /status one endpoint at a time against a single
+app.py worker and reports throughput, latency percentiles, error rate and
+server-side event loop lag per endpoint.
+
+Usage (from the repository root):
+
+    # Spawn a stub-backed worker and load it
+    python -m benchmarks.load_test --spawn --concurrency 32 --duration 20 \\
+        --output results/load_new.json
+
+    # Compare against a previous run
+    python -m benchmarks.load_test --spawn --baseline results/load_old.json
+"""
+
+import os
+import sys
+import json
+import time
+import itertools
+import asyncio
+import argparse
+import platform
+import subprocess
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_INPUTS = [
+    "make me a reservation at Nobu in Los Angeles for 4 people on 2025-06-20 at 19:00 phone number is 1234567890 email is test@test.com",
+    "book a table at Katana in Los Angeles for 2 people on 2025-07-02 at 20:30 phone 2135550100",
+    "reservation at Carbone in New York for 6 people on 2025-08-14 at 18:00 phone number is 3105550199 email is guest@example.com",
+]
+
+SAMPLE_RESERVATION = {
+    "restaurant": "Nobu",
+    "date": "June,20,2025",
+    "time": "19:00",
+    "party_size": 4,
+    "location": "Los Angeles",
+    "phone": "1234567890",
+    "email": "test@test.com",
+}
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class EndpointStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.status_codes: Dict[str, int] = {}
+        self.started = 0.0
+        self.finished = 0.0
+
+    def record(self, latency: float, status_code: Optional[int]) -> None:
+        self.latencies.append(latency)
+        key = str(status_code) if status_code is not None else "connection_error"
+        self.status_codes[key] = self.status_codes.get(key, 0) + 1
+        if status_code is None or status_code >= 400:
+            self.errors += 1
+
+    def summary(self) -> Dict[str, Any]:
+        ordered = sorted(self.latencies)
+        count = len(ordered)
+        elapsed = max(self.finished - self.started, 1e-9)
+        return {
+            "requests": count,
+            "duration_s": round(elapsed, 3),
+            "rps": round(count / elapsed, 2),
+            "error_rate": round(self.errors / count, 4) if count else 0.0,
+            "status_codes": self.status_codes,
+            "latency_ms": {
+                "mean": round(sum(ordered) / count * 1000, 2) if count else 0.0,
+                "p50": round(percentile(ordered, 50) * 1000, 2),
+                "p90": round(percentile(ordered, 90) * 1000, 2),
+                "p99": round(percentile(ordered, 99) * 1000, 2),
+                "max": round(ordered[-1] * 1000, 2) if count else 0.0,
+            },
+        }
+
+
+
+def sample_reservation(n: int) -> Dict[str, Any]:
+    """A distinct reservation per request; identical ones would be deduplicated by /book"""
+    return {**SAMPLE_RESERVATION, "phone": str(1234567890 + n)}
+
+
+async def _timed(client: httpx.AsyncClient, stats: EndpointStats, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+    except httpx.HTTPError:
+        stats.record(time.perf_counter() - start, None)
+        return None
+    stats.record(time.perf_counter() - start, response.status_code)
+    return response
+
+
+async def _seed_bookings(client: httpx.AsyncClient, count: int) -> List[str]:
+    """Create bookings so /status has something to poll"""
+    booking_ids = []
+    for n in range(count):
+        response = await client.post("/book", json={"reservation_details": sample_reservation(n)})
+        if response.status_code == 200:
+            booking_ids.append(response.json()["booking_id"])
+    return booking_ids
+
+
+async def run_endpoint(client: httpx.AsyncClient, endpoint: str, concurrency: int, duration: float, booking_ids: List[str]) -> EndpointStats:
+    stats = EndpointStats(endpoint)
+    booking_numbers = itertools.count(len(booking_ids))
+    deadline = time.perf_counter() + duration
+
+    async def worker(worker_id: int) -> None:
+        i = worker_id
+        while time.perf_counter() < deadline:
+            if endpoint == "parse":
+                await _timed(client, stats, "POST", "/parse",
+                             json={"user_input": SAMPLE_INPUTS[i % len(SAMPLE_INPUTS)]})
+            elif endpoint == "book":
+                response = await _timed(client, stats, "POST", "/book",
+                                        json={"reservation_details": sample_reservation(next(booking_numbers))})
+                if response is not None and response.status_code == 200:
+                    booking_ids.append(response.json()["booking_id"])
+            else:
+                booking_id = booking_ids[i % len(booking_ids)]
+                await _timed(client, stats, "GET", f"/status/{booking_id}")
+            i += concurrency
+
+    stats.started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    stats.finished = time.perf_counter()
+    return stats
+
+
+async def fetch_loop_lag(client: httpx.AsyncClient, reset: bool) -> Optional[Dict[str, Any]]:
+    try:
+        response = await client.get("/debug/loop-lag", params={"reset": str(reset).lower()})
+    except httpx.HTTPError:
+        return None
+    if response.status_code != 200:
+        return None
+    return response.json()
+
+
+async def run_load_test(base_url: str, endpoints: List[str], concurrency: int, duration: float) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    results: Dict[str, Any] = {}
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        backend_info = await fetch_loop_lag(client, reset=True)
+        booking_ids: List[str] = []
+
+        for endpoint in endpoints:
+            if endpoint == "status" and not booking_ids:
+                booking_ids = await _seed_bookings(client, max(10, concurrency))
+                if not booking_ids:
+                    print("⚠️ Could not create bookings to poll, skipping /status")
+                    continue
+
+            print(f"🔥 Loading /{endpoint} with {concurrency} workers for {duration:.0f}s...")
+            await fetch_loop_lag(client, reset=True)
+            stats = await run_endpoint(client, endpoint, concurrency, duration, booking_ids)
+            lag = await fetch_loop_lag(client, reset=True)
+
+            summary = stats.summary()
+            summary["loop_lag_ms"] = lag["loop_lag"] if lag else None
+            results[endpoint] = summary
+
+    return {
+        "backend": backend_info["backend"] if backend_info else "unknown",
+        "endpoints": results,
+    }
+
+
+def spawn_server(port: int) -> subprocess.Popen:
+    env = os.environ.copy()
+    env.setdefault("RESERVATION_BACKEND", "stub")
+    env["LOOP_LAG_MONITOR"] = "1"
+    # Measure the endpoints themselves, not the rate limiter
+    env.setdefault("ADMISSION_CONTROL", "0")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=REPO_ROOT, env=env,
+    )
+
+
+async def wait_for_server(base_url: str, timeout: float = 30.0) -> float:
+    """Wait until /health answers; returns seconds taken"""
+    start = time.perf_counter()
+    async with httpx.AsyncClient(base_url=base_url, timeout=1.0) as client:
+        while time.perf_counter() - start < timeout:
+            try:
+                response = await client.get("/health")
+                if response.status_code == 200:
+                    return time.perf_counter() - start
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.05)
+    raise TimeoutError(f"Server at {base_url} did not become healthy within {timeout}s")
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"\n📊 Results (backend: {report['backend']})")
+    print(f"{'endpoint':<10}{'rps':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'errors':>9}{'lag p99':>10}{'lag max':>10}")
+    for endpoint, summary in report["endpoints"].items():
+        latency = summary["latency_ms"]
+        lag = summary.get("loop_lag_ms") or {}
+        print(f"/{endpoint:<9}{summary['rps']:>10}{latency['p50']:>10}{latency['p90']:>10}{latency['p99']:>10}"
+              f"{summary['error_rate'] * 100:>8.1f}%{lag.get('p99_ms', '-'):>10}{lag.get('max_ms', '-'):>10}")
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    print("\n🔍 Compared to baseline")
+    if report.get("time_to_healthy_s") is not None and baseline.get("time_to_healthy_s") is not None:
+        print(f"   worker startup: {baseline['time_to_healthy_s']}s -> {report['time_to_healthy_s']}s")
+    for endpoint, summary in report["endpoints"].items():
+        old = baseline.get("endpoints", {}).get(endpoint)
+        if not old:
+            print(f"   /{endpoint}: no baseline data")
+            continue
+        for label, new_value, old_value in [
+            ("rps", summary["rps"], old["rps"]),
+            ("p50", summary["latency_ms"]["p50"], old["latency_ms"]["p50"]),
+            ("p99", summary["latency_ms"]["p99"], old["latency_ms"]["p99"]),
+        ]:
+            change = ((new_value - old_value) / old_value * 100) if old_value else 0.0
+            print(f"   /{endpoint} {label}: {old_value} -> {new_value} ({change:+.1f}%)")
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    server = None
+    base_url = args.url
+    startup_s = None
+    if args.spawn:
+        base_url = f"http://127.0.0.1:{args.port}"
+        print(f"🚀 Spawning stub-backed API worker on {base_url}...")
+        server = spawn_server(args.port)
+    try:
+        startup_s = await wait_for_server(base_url)
+        endpoints = [e.strip().lstrip("/") for e in args.endpoints.split(",") if e.strip()]
+        report = await run_load_test(base_url, endpoints, args.concurrency, args.duration)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    report.update({
+        "timestamp": datetime.now().isoformat(),
+        "base_url": base_url,
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "python": platform.python_version(),
+        "time_to_healthy_s": round(startup_s, 3) if args.spawn and startup_s is not None else None,
+        "stub_config": {k: v for k, v in os.environ.items() if k.startswith("STUB_")},
+    })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the reservation API")
+    parser.add_argument("--url", default="http://localhost:8000", help="API base URL (ignored with --spawn)")
+    parser.add_argument("--spawn", action="store_true", help="Start a stub-backed uvicorn worker for the run")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the spawned worker (default: 8765)")
+    parser.add_argument("--endpoints", default="parse,book,status", help="Comma separated endpoints to load")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients (default: 16)")
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds per endpoint (default: 15)")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--baseline", help="Previous results JSON to compare against")
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+    print_report(report)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(report, json.load(f))
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Parse accuracy, latency and token cost on a labeled corpus
+
+Replays every request in benchmarks/parse_corpus.jsonl through
+parse_reservation_request and compares the result with the expected
+fields. Reports per-field and exact-match accuracy, latency percentiles,
+tokens and estimated cost per model tier, and the escalation rate.
+
+The LLM backend is pluggable:
+
+    stub                 the regex extractor behind --stub-latency (default; no API key needed)
+    openai               the real models (PARSE_FAST_MODEL / PARSE_FULL_MODEL)
+    module:function      any (model, messages, **kwargs) -> (content, usage) callable
+
+With --baseline the run fails (exit 1) if accuracy drops by more than
+--max-accuracy-drop or p95 latency / cost per parse grows by more than
+--max-latency-increase / --max-cost-increase.
+
+Usage (from the repository root):
+
+    python -m benchmarks.parse_bench --output results/parse_stub.json
+    python -m benchmarks.parse_bench --backend openai --output results/parse_openai.json
+    python -m benchmarks.parse_bench --backend openai --baseline results/parse_openai.json
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import importlib
+import platform
+import subprocess
+from datetime import datetime
+from typing import Dict, Any, List
+
+from parse_reservation import parse_reservation_request, parse_stats, reset_parse_stats, set_completion_backend
+from stub_backends import LatencyDistribution, make_stub_completion
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CORPUS = os.path.join(REPO_ROOT, "benchmarks", "parse_corpus.jsonl")
+
+FIELDS = ("restaurant", "date", "time", "party_size", "location", "phone", "email")
+
+# USD per 1K (prompt, completion) tokens; override with --prices '{"gpt-4": [0.03, 0.06]}'
+PRICES = {
+    "gpt-4": (0.03, 0.06),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-3.5-turbo-0125": (0.0005, 0.0015),
+}
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def load_corpus(path: str) -> List[Dict[str, Any]]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def load_backend(name: str, stub_latency: str):
+    if name == "stub":
+        return make_stub_completion(LatencyDistribution.parse(stub_latency))
+    if name == "openai":
+        return None
+    module, _, function = name.partition(":")
+    if not function:
+        raise SystemExit(f"Unknown backend {name!r}, expected stub, openai or module:function")
+    return getattr(importlib.import_module(module), function)
+
+
+def normalize(field: str, value: Any) -> Any:
+    """Compare values the way the booker uses them, not character for character"""
+    if value in (None, ""):
+        return None
+    if field == "phone":
+        digits = re.sub(r"\D", "", str(value))
+        return digits[-10:]
+    if field == "party_size":
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return str(value)
+    if field == "time":
+        hours, _, minutes = str(value).strip().partition(":")
+        return f"{hours.zfill(2)}:{minutes}"
+    if field == "date":
+        return re.sub(r"\s+", "", str(value)).lower()
+    return re.sub(r"\s+", " ", str(value).strip()).lower()
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[int(fraction * (len(ordered) - 1))]
+
+
+def run_benchmark(corpus: List[Dict[str, Any]], prices: Dict[str, Any], verbose: bool) -> Dict[str, Any]:
+    reset_parse_stats()
+    correct = {field: 0 for field in FIELDS}
+    exact = 0
+    errors = 0
+    times = []
+    misses = []
+    for case in corpus:
+        start = time.perf_counter()
+        try:
+            parsed = parse_reservation_request(case["input"])
+        except Exception as e:
+            print(f"   {case['id']}: ❌ {e}")
+            parsed = {}
+            errors += 1
+        times.append(time.perf_counter() - start)
+
+        wrong = [field for field in FIELDS
+                 if normalize(field, parsed.get(field)) != normalize(field, case["expected"].get(field))]
+        for field in FIELDS:
+            if field not in wrong:
+                correct[field] += 1
+        if not wrong:
+            exact += 1
+        else:
+            misses.append({"id": case["id"], "fields": {
+                field: {"expected": case["expected"].get(field), "got": parsed.get(field)} for field in wrong
+            }})
+        if verbose:
+            print(f"   {case['id']}: {'✅' if not wrong else '❌ ' + ', '.join(wrong)} ({times[-1] * 1000:.0f}ms)")
+
+    stats = parse_stats()
+    tiers = {}
+    total_cost = 0.0
+    for tier in stats["tiers"]:
+        prompt_price, completion_price = prices.get(tier["model"], (0.0, 0.0))
+        cost = (tier["prompt_tokens"] * prompt_price + tier["completion_tokens"] * completion_price) / 1000
+        total_cost += cost
+        tiers[tier["name"]] = {
+            "model": tier["model"],
+            "calls": tier["calls"],
+            "accepted": tier["accepted"],
+            "rejections": tier["rejections"],
+            "prompt_tokens": tier["prompt_tokens"],
+            "completion_tokens": tier["completion_tokens"],
+            "cost_usd": round(cost, 6),
+        }
+
+    cases = len(corpus)
+    ordered = sorted(times)
+    return {
+        "cases": cases,
+        "errors": errors,
+        "accuracy": {
+            "exact": round(exact / cases, 4),
+            "fields": {field: round(correct[field] / cases, 4) for field in FIELDS},
+            "mean_field": round(sum(correct.values()) / (cases * len(FIELDS)), 4),
+        },
+        "latency_ms": {
+            "p50": round(percentile(ordered, 0.50) * 1000, 1),
+            "p95": round(percentile(ordered, 0.95) * 1000, 1),
+            "p99": round(percentile(ordered, 0.99) * 1000, 1),
+            "max": round(ordered[-1] * 1000, 1),
+        },
+        "tiers": tiers,
+        "cost_per_parse_usd": round(total_cost / cases, 6),
+        "escalation_rate": stats["escalation_rate"],
+        "misses": misses,
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], max_accuracy_drop: float,
+            max_latency_increase: float, max_cost_increase: float) -> List[str]:
+    """Print the changes against the baseline and return the regressions beyond the thresholds"""
+    print(f"\n🔍 Compared to baseline ({baseline.get('revision')} -> {report['revision']})")
+    if baseline.get("corpus") != report["corpus"] or baseline.get("backend") != report["backend"]:
+        print(f"   ⚠️  baseline ran {baseline.get('backend')} on {baseline.get('corpus')}, results are not comparable")
+    regressions = []
+
+    def relative(old: float, new: float) -> float:
+        return (new - old) / old if old else 0.0
+
+    old_accuracy = baseline["accuracy"]
+    checks = [("exact", old_accuracy["exact"], report["accuracy"]["exact"])]
+    checks += [(field, old_accuracy["fields"].get(field), value)
+               for field, value in report["accuracy"]["fields"].items()]
+    for name, old, new in checks:
+        if old is None:
+            continue
+        print(f"   accuracy {name}: {old:.1%} -> {new:.1%} ({(new - old) * 100:+.1f} pts)")
+        if old - new > max_accuracy_drop:
+            regressions.append(f"{name} accuracy dropped {(old - new) * 100:.1f} pts")
+
+    for label in ("p50", "p95", "p99"):
+        old, new = baseline["latency_ms"][label], report["latency_ms"][label]
+        print(f"   latency {label}: {old}ms -> {new}ms ({relative(old, new):+.1%})")
+    change = relative(baseline["latency_ms"]["p95"], report["latency_ms"]["p95"])
+    if change > max_latency_increase:
+        regressions.append(f"p95 latency up {change:.1%}")
+
+    old, new = baseline["cost_per_parse_usd"], report["cost_per_parse_usd"]
+    change = relative(old, new)
+    print(f"   cost per parse: ${old:.6f} -> ${new:.6f} ({change:+.1%})")
+    if change > max_cost_increase:
+        regressions.append(f"cost per parse up {change:.1%}")
+    print(f"   escalation rate: {baseline.get('escalation_rate')} -> {report['escalation_rate']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure parse accuracy, latency and token cost on a labeled corpus")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Labeled requests, one JSON object per line")
+    parser.add_argument("--backend", default="stub", help="stub, openai or module:function (default: stub)")
+    parser.add_argument("--stub-latency", default="normal:0.02,0.005",
+                        help="Stub completion latency distribution (default: normal:0.02,0.005)")
+    parser.add_argument("--prices", help="JSON of model -> [prompt, completion] USD per 1K tokens")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--baseline", help="Previous results JSON to compare against")
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.02,
+                        help="Fail if any accuracy falls by more than this fraction (default: 0.02)")
+    parser.add_argument("--max-latency-increase", type=float, default=0.20,
+                        help="Fail if p95 latency grows by more than this fraction (default: 0.20)")
+    parser.add_argument("--max-cost-increase", type=float, default=0.20,
+                        help="Fail if cost per parse grows by more than this fraction (default: 0.20)")
+    parser.add_argument("--verbose", action="store_true", help="Print every case")
+    args = parser.parse_args()
+
+    prices = dict(PRICES)
+    if args.prices:
+        prices.update(json.loads(args.prices))
+    corpus = load_corpus(args.corpus)
+    set_completion_backend(load_backend(args.backend, args.stub_latency))
+
+    print(f"🚀 Parsing {len(corpus)} labeled requests with the {args.backend} backend...")
+    try:
+        report = run_benchmark(corpus, prices, args.verbose)
+    finally:
+        set_completion_backend(None)
+    report.update({
+        "corpus": os.path.relpath(os.path.abspath(args.corpus), REPO_ROOT),
+        "backend": args.backend,
+        "timestamp": datetime.now().isoformat(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+    })
+
+    accuracy = report["accuracy"]
+    print(f"\n📊 exact {accuracy['exact']:.1%}, mean field {accuracy['mean_field']:.1%}, "
+          f"{report['errors']} errors, escalation rate {report['escalation_rate']}")
+    print("   " + "  ".join(f"{field} {value:.0%}" for field, value in accuracy["fields"].items()))
+    latency = report["latency_ms"]
+    print(f"   latency p50 {latency['p50']}ms, p95 {latency['p95']}ms, p99 {latency['p99']}ms, max {latency['max']}ms")
+    for name, tier in report["tiers"].items():
+        print(f"   {name} ({tier['model']}): {tier['calls']} calls, {tier['prompt_tokens']}+{tier['completion_tokens']} "
+              f"tokens, ${tier['cost_usd']:.4f}")
+    print(f"   ${report['cost_per_parse_usd']:.6f} per parse")
+
+    regressions: List[str] = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.max_accuracy_drop,
+                                  args.max_latency_increase, args.max_cost_increase)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results saved to {args.output}")
+
+    if regressions:
+        print("\n❌ Regressions: " + "; ".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Serialization cost per endpoint
+
+Times how long it takes to turn a representative payload of each hot
+endpoint into response bytes, two ways:
+
+    model    a response model, jsonable_encoder and stdlib json, the way
+             FastAPI serializes by default
+    direct   FastJSONResponse on plain data, what the endpoints now do
+
+It also reports each payload's size before and after gzip, and the gzip
+time, for payloads above GZIP_MIN_SIZE.
+
+Usage (from the repository root):
+
+    python -m benchmarks.serialization_bench
+    python -m benchmarks.serialization_bench --iterations 20000 --output results/serialization.json
+    python -m benchmarks.serialization_bench --baseline results/serialization_old.json
+"""
+
+import os
+import gzip
+import json
+import time
+import uuid
+import argparse
+import platform
+import subprocess
+from datetime import datetime
+from typing import Dict, Any, Callable
+
+# Importing app must not launch browsers or need OpenAI credentials
+os.environ.setdefault("RESERVATION_BACKEND", "stub")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app import BookingStatus
+from booking_status import STATUS_FIELDS
+from fast_responses import FastJSONResponse, orjson
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def sample_session() -> Dict[str, Any]:
+    """A completed booking as it sits in booking_sessions"""
+    now = datetime.now()
+    booking_id = str(uuid.uuid4())
+    return {
+        "booking_id": booking_id,
+        "status": "completed",
+        "message": "Reservation booked successfully!",
+        "progress": "Completed",
+        "reservation_details": {"restaurant": "Nobu", "location": "Los Angeles", "date": "June,20,2025",
+                                "time": "19:00", "party_size": 4, "phone": "1234567890", "email": "test@test.com"},
+        "user_details": {"first_name": "Test", "last_name": "User"},
+        "provider": None,
+        "debug_artifacts": False,
+        "release_at": None,
+        "profile": False,
+        "result": {
+            "success": True,
+            "message": "Reservation booked successfully",
+            "provider": "opentable",
+            "resources": {"booking_id": booking_id, "rss_start_mb": 412.3, "rss_end_mb": 455.9,
+                          "rss_peak_mb": 498.1, "rss_growth_mb": 43.6, "cpu_seconds": 6.42, "duration_s": 38.2},
+        },
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def endpoints(bookings: int) -> Dict[str, Dict[str, Callable[[], bytes]]]:
+    session = sample_session()
+    listing = {"total": bookings, "bookings": [str(uuid.uuid4()) for _ in range(bookings)]}
+    health = {
+        "status": "healthy",
+        "timestamp": datetime.now(),
+        "active_bookings": 3,
+        "circuits": {f"step:{name}": {"state": "closed", "calls": 20, "failure_rate": 0.05, "retry_after_s": 0.0,
+                                      "times_opened": 0, "rejected": 0}
+                     for name in ("search", "select_slot", "input_info")},
+    }
+    return {
+        "status": {
+            "model": lambda: JSONResponse(jsonable_encoder(BookingStatus(**session))).body,
+            "direct": lambda: FastJSONResponse({field: session.get(field) for field in STATUS_FIELDS}).body,
+        },
+        "bookings": {
+            "model": lambda: JSONResponse(jsonable_encoder(listing)).body,
+            "direct": lambda: FastJSONResponse(listing).body,
+        },
+        "health": {
+            "model": lambda: JSONResponse(jsonable_encoder(health)).body,
+            "direct": lambda: FastJSONResponse(health).body,
+        },
+    }
+
+
+def time_per_call(fn: Callable[[], Any], iterations: int) -> float:
+    """Best of three runs, in microseconds per call"""
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        best = min(best, (time.perf_counter() - start) / iterations)
+    return best * 1e6
+
+
+def run_benchmark(iterations: int, bookings: int, gzip_min_size: int) -> Dict[str, Any]:
+    results = {}
+    for name, variants in endpoints(bookings).items():
+        model_us = time_per_call(variants["model"], iterations)
+        direct_us = time_per_call(variants["direct"], iterations)
+        body = variants["direct"]()
+        entry = {
+            "model_us": round(model_us, 2),
+            "direct_us": round(direct_us, 2),
+            "speedup": round(model_us / direct_us, 2),
+            "bytes": len(body),
+        }
+        if len(body) >= gzip_min_size:
+            entry["gzip_bytes"] = len(gzip.compress(body, compresslevel=6))
+            entry["gzip_us"] = round(time_per_call(lambda: gzip.compress(body, compresslevel=6), max(1, iterations // 10)), 2)
+        results[name] = entry
+        print(f"   {name:9s} model {model_us:8.2f}us  direct {direct_us:8.2f}us  "
+              f"({entry['speedup']}x)  {len(body)} bytes"
+              + (f" -> {entry['gzip_bytes']} gzipped" if "gzip_bytes" in entry else ""))
+    return results
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    print(f"\n🔍 Compared to baseline ({baseline.get('revision')} -> {report['revision']})")
+    for name, entry in report["endpoints"].items():
+        old = baseline.get("endpoints", {}).get(name)
+        if not old:
+            continue
+        change = (entry["direct_us"] - old["direct_us"]) / old["direct_us"] * 100 if old["direct_us"] else 0.0
+        print(f"   {name}: {old['direct_us']}us -> {entry['direct_us']}us ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure response serialization cost per endpoint")
+    parser.add_argument("--iterations", type=int, default=10000, help="Calls per timing run (default: 10000)")
+    parser.add_argument("--bookings", type=int, default=500, help="Bookings in the /bookings listing (default: 500)")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--baseline", help="Previous results JSON to compare against")
+    args = parser.parse_args()
+
+    gzip_min_size = int(os.getenv("GZIP_MIN_SIZE", "1000"))
+    print(f"🚀 Serializing each payload {args.iterations} times (orjson {'on' if orjson else 'missing'})...")
+    report = {
+        "endpoints": run_benchmark(args.iterations, args.bookings, gzip_min_size),
+        "orjson": orjson is not None,
+        "gzip_min_size": gzip_min_size,
+        "timestamp": datetime.now().isoformat(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+    }
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(report, json.load(f))
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
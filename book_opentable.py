@@ -1,56 +1,164 @@
 import os
-from playwright.sync_api import sync_playwright
 import time
 import json
+import threading
 from typing import Optional, Dict, Any
 import logging
 from datetime import datetime
-from book_resy import book_resy
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("opentable_booking.log"),
-        logging.StreamHandler()
-    ]
-)
+
+from log_pipeline import setup_logging, booking_context, set_step
+from artifacts import ArtifactRecorder, ARTIFACTS_ENABLED
+import dom_extract
+from booking_pipeline import BookingPipeline, Step, RetryPolicy, CheckpointStore, Unavailable
+from browser_farm import get_browser_farm, NoBrowserNodeAvailable
+from resource_watchdog import watchdog, child_pids, find_driver_pid
+from circuit_breaker import opentable_breakers, CircuitOpenError
+
 logger = logging.getLogger("opentable_booking")
+# Per-selector probing chatter; sampled by the logging pipeline
+probe_logger = logging.getLogger("opentable_booking.probe")
 
 # Global booker instance to maintain browser session
 _global_booker = None
 
+# Bookers start in parallel threads; one at a time, so each finds its own driver process
+_driver_start_lock = threading.Lock()
+
+# Pins Date in replayed pages to when the HAR was recorded, so date pickers
+# render the same month they did live
+_SHIFT_CLOCK_JS = """
+(() => {
+    const offset = %d - Date.now();
+    const RealDate = Date;
+    class ShiftedDate extends RealDate {
+        constructor(...args) {
+            if (args.length === 0) super(RealDate.now() + offset);
+            else super(...args);
+        }
+        static now() { return RealDate.now() + offset; }
+    }
+    window.Date = ShiftedDate;
+})();
+"""
+
+TIME_SLOT_SELECTOR = 'ul[data-test="time-slots"] li[data-test^="time-slot-"] div[role="button"]'
+# What OpenTable shows instead of slots when it has nothing to offer
+NO_RESULTS_SELECTOR = 'text=/no (results|restaurants) (found|match)/i'
+NO_AVAILABILITY_SELECTOR = 'text=/no (online )?availability|no (times|tables) available/i'
+
 class OpenTableBooker:
     BASE_URL = "https://www.opentable.com"
     
-    def __init__(self, headless: bool = False):
+    def __init__(
+        self,
+        headless: bool = False,
+        record_har_path: Optional[str] = None,
+        replay_har_path: Optional[str] = None,
+        replay_clock_ms: Optional[int] = None,
+    ):
+        """
+        record_har_path: write the session's network traffic to this HAR
+        (.har or .har.zip) when the booker closes.
+        replay_har_path: serve every request from this HAR instead of the
+        network; requests that weren't recorded are aborted. Fixed waits are
+        skipped, and replay_clock_ms (epoch ms of the recording) pins Date.
+        Both default to OPENTABLE_RECORD_HAR / OPENTABLE_REPLAY_HAR.
+        """
         self.headless = headless
+        self.record_har_path = record_har_path or os.getenv("OPENTABLE_RECORD_HAR")
+        self.replay_har_path = replay_har_path or os.getenv("OPENTABLE_REPLAY_HAR")
+        self.replay_clock_ms = replay_clock_ms
         self.playwright = None
         self.browser = None
+        self.node = None  # browser farm node when connected remotely
+        self.context = None
+        self.context_recycled = False
         self.page = None
+        self.artifacts: Optional[ArtifactRecorder] = None
+        self.watch_url: Optional[str] = None  # slot page an availability poller reloads
     
     def start(self) -> None:
-        self.playwright = sync_playwright().start()
-        self.browser = self.playwright.chromium.launch(headless=self.headless)
-        self.page = self.browser.new_page()
+        # Playwright is imported here so importing this module stays cheap
+        from playwright.sync_api import sync_playwright
+
+        setup_logging()
+        with _driver_start_lock:
+            before = child_pids()
+            self.playwright = sync_playwright().start()
+            driver_pid = find_driver_pid(before)
+        self.browser = self._open_browser()
+        self.context_recycled = False
+        if self.node is None:
+            # Remote browsers are accounted for on their own hosts
+            if driver_pid is None and watchdog.enabled:
+                logger.warning("Playwright driver process not found; no resource accounting for this browser")
+            watchdog.track(self, driver_pid)
+        self._open_context()
+
+    def _open_context(self) -> None:
+        context_options = {}
+        if self.record_har_path:
+            context_options["record_har_path"] = self.record_har_path
+        self.context = self.browser.new_context(**context_options)
+        if self.replay_har_path:
+            self.context.route_from_har(self.replay_har_path, not_found="abort")
+            if self.replay_clock_ms:
+                self.context.add_init_script(_SHIFT_CLOCK_JS % self.replay_clock_ms)
+        self.page = self.context.new_page()
         self.page.set_viewport_size({"width": 1280, "height": 800})
         self.page.set_extra_http_headers({
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36"
         })
         self.page.set_default_timeout(15000)
 
+    def recycle_context(self) -> None:
+        """Replace the browser context (and its renderer processes), keeping the browser"""
+        self.page.close()
+        self.context.close()
+        self._open_context()
+        self.context_recycled = True
+
+    def _open_browser(self):
+        farm = get_browser_farm()
+        if farm is not None:
+            try:
+                self.browser, self.node = farm.connect(self.playwright)
+                logger.info("Connected to browser node %s", self.node.ws_endpoint)
+                return self.browser
+            except NoBrowserNodeAvailable:
+                if not farm.local_fallback:
+                    raise
+                logger.warning("No browser node available, launching locally")
+        return self.playwright.chromium.launch(headless=self.headless)
+
     def close(self) -> None:
         try:
+            if self.artifacts is not None:
+                # Closing mid-booking (e.g. verification expired) counts as a failure
+                self.artifacts.finish(False)
+                self.artifacts = None
             if self.page:
                 self.page.close()
+            if self.context:
+                # Closing the context is what writes a recorded HAR
+                self.context.close()
             if self.browser:
                 self.browser.close()
             if self.playwright:
                 self.playwright.stop()
         except Exception as e:
-            logger.error(f"Error closing browser: {str(e)}")
+            logger.error("Error closing browser: %s", e)
+        finally:
+            watchdog.untrack(self)
+            if self.node is not None:
+                get_browser_farm().release(self.node)
+                self.node = None
     
+    def pause(self, seconds: float) -> None:
+        """Fixed wait for the live site; replayed traffic needs none"""
+        if not self.replay_har_path:
+            time.sleep(seconds)
+
     def time_to_12h(self, time: str) -> str:
         """
         Convert 24-hour time string to 12-hour format (e.g., "20:00" -> "8:00 PM")
@@ -69,12 +177,18 @@ class OpenTableBooker:
         3. Set date, time, and party size on the search page using robust selectors
         4. Click on the restaurant name link
         """
-        logger.info(f"Searching for restaurant: {restaurant_name} in {location or 'any location'}")
+        logger.info("Searching for restaurant: %s in %s", restaurant_name, location or 'any location')
+
+        # Don't load the page if a selector group the search can't do without is known broken
+        for group in ("selectors:date_picker", "selectors:search_input"):
+            breaker = opentable_breakers.get(group)
+            if not breaker.would_allow():
+                raise CircuitOpenError(group, breaker.retry_after())
 
         # 1. Go to OpenTable homepage
         self.page.goto(self.BASE_URL)
         self.page.wait_for_load_state("networkidle")
-        time.sleep(2)
+        self.pause(2)
 
 
         # 3. Set party size
@@ -83,16 +197,24 @@ class OpenTableBooker:
             '[data-test="party-size-picker"]',
             '[aria-label="Party size selector"]'
         ]
+        party_breaker = opentable_breakers.get("selectors:party_size")
+        if not party_breaker.allow():
+            probe_logger.warning("Party size selectors keep failing, skipping them (circuit open)")
+            party_selectors = []
         party_dropdown = None
+        party_set = False
         for selector in party_selectors:
             party_dropdown = self.page.query_selector(selector)
             if party_dropdown:
                 try:
                     self.page.select_option(selector, str(party_size))
-                    logger.info(f"Party size set to {party_size} using selector {selector}.")
+                    probe_logger.info("Party size set to %s using selector %s.", party_size, selector)
+                    party_set = True
                     break
                 except Exception as e:
-                    logger.warning(f"Failed to set party size with {selector}: {e}")
+                    probe_logger.warning("Failed to set party size with %s: %s", selector, e)
+        if party_selectors:
+            party_breaker.record(party_set)
         if not party_dropdown:
             logger.warning("Could not find party size dropdown with any selector.")
 
@@ -105,10 +227,10 @@ class OpenTableBooker:
                 target_day = int(date_parts[1].strip())  # e.g., 5
                 target_year = int(date_parts[2].strip())  # e.g., 2025
             else:
-                logger.error(f"Invalid date format: {date_str}. Expected format: 'Month,Day,Year'")
-                return
+                logger.error("Invalid date format: %s. Expected format: 'Month,Day,Year'", date_str)
+                return Unavailable(f"Invalid date '{date_str}', expected Month,Day,Year")
             
-            logger.info(f"Setting date to {target_month_name} {target_day}, {target_year}")
+            logger.info("Setting date to %s %s, %s", target_month_name, target_day, target_year)
             
             # Find and click the date input to open calendar widget
             date_input_selectors = [
@@ -127,6 +249,9 @@ class OpenTableBooker:
                 'button:has-text("Pick Date")'
             ]
             
+            date_breaker = opentable_breakers.get("selectors:date_picker")
+            if not date_breaker.allow():
+                raise CircuitOpenError(date_breaker.name, date_breaker.retry_after())
             date_input_clicked = False
             for selector in date_input_selectors:
                 try:
@@ -135,8 +260,8 @@ class OpenTableBooker:
                     if date_input:
                         # Try to click the element
                         date_input.click()
-                        logger.info(f"Clicked date input using selector: {selector}")
-                        time.sleep(1)  # Wait for calendar to open
+                        probe_logger.info("Clicked date input using selector: %s", selector)
+                        self.pause(1)  # Wait for calendar to open
                         
                         # Verify calendar opened by checking for calendar elements
                         calendar_indicators = [
@@ -150,7 +275,7 @@ class OpenTableBooker:
                             try:
                                 if self.page.wait_for_selector(indicator, state="visible", timeout=2000):
                                     date_input_clicked = True
-                                    logger.info("Calendar successfully opened")
+                                    probe_logger.info("Calendar successfully opened")
                                     break
                             except:
                                 continue
@@ -158,32 +283,34 @@ class OpenTableBooker:
                         if date_input_clicked:
                             break
                 except Exception as e:
-                    logger.warning(f"Failed to click date input with {selector}: {e}")
+                    probe_logger.warning("Failed to click date input with %s: %s", selector, e)
                     continue
             
             if not date_input_clicked:
                 # Try one last approach - look for any clickable element that might be the date picker
                 try:
                     # Look for elements that might contain date-related text
-                    date_elements = self.page.query_selector_all('button, input, div[role="button"]')
+                    # (one evaluate call instead of text_content() per element)
+                    date_elements = dom_extract.snapshot(self.page, 'button, input, div[role="button"]')
                     for element in date_elements:
                         try:
-                            text = element.text_content().strip().lower()
+                            text = element["text_content"].lower()
                             if any(date_term in text for date_term in ['date', 'calendar', 'pick date', 'select date']):
-                                element.click()
-                                logger.info("Clicked potential date input element")
-                                time.sleep(1)
+                                dom_extract.locator(self.page, element).click()
+                                probe_logger.info("Clicked potential date input element")
+                                self.pause(1)
                                 
                                 # Verify calendar opened
                                 if self.page.query_selector('div[aria-live="polite"][role="presentation"]'):
                                     date_input_clicked = True
-                                    logger.info("Calendar successfully opened")
+                                    probe_logger.info("Calendar successfully opened")
                                     break
                         except:
                             continue
                 except Exception as e:
-                    logger.warning(f"Failed in final date input attempt: {e}")
+                    logger.warning("Failed in final date input attempt: %s", e)
             
+            date_breaker.record(date_input_clicked)
             if not date_input_clicked:
                 logger.error("Could not find or click date input to open calendar")
                 return
@@ -212,11 +339,11 @@ class OpenTableBooker:
                         logger.warning("Could not find current month/year display")
                         break
                     
-                    logger.info(f"Current calendar shows: {current_month_year}")
+                    probe_logger.info("Current calendar shows: %s", current_month_year)
                     
                     # Check if we're at the target month/year
                     if target_month_name in current_month_year and str(target_year) in current_month_year:
-                        logger.info(f"Reached target month/year: {target_month_name} {target_year}")
+                        logger.info("Reached target month/year: %s %s", target_month_name, target_year)
                         break
                     
                     # Click next month button - try the most specific selector first
@@ -230,8 +357,8 @@ class OpenTableBooker:
                     
                     if next_button:
                         next_button.click()
-                        logger.info("Clicked next month button")
-                        time.sleep(0.5)  # Wait for calendar to update
+                        probe_logger.info("Clicked next month button")
+                        self.pause(0.5)  # Wait for calendar to update
                     else:
                         logger.warning("Could not find next month button")
                         break
@@ -239,7 +366,7 @@ class OpenTableBooker:
                     navigation_attempts += 1
                     
                 except Exception as e:
-                    logger.error(f"Error during calendar navigation: {e}")
+                    logger.error("Error during calendar navigation: %s", e)
                     break
             
             # Select the target day
@@ -248,44 +375,48 @@ class OpenTableBooker:
                 day_button = self.page.query_selector(f'button[name="day"][aria-label*="{target_month_name} {target_day}"]')
                 
                 if not day_button:
-                    # Try other selectors if the specific one fails
-                    for selector in [
+                    # Try other selectors if the specific one fails; all
+                    # candidates and their labels come back in one evaluate
+                    candidates = dom_extract.snapshot(self.page, [
                         f'button[name="day"]:has-text("{target_day}")',
                         f'td button:has-text("{target_day}")',
                         f'button[aria-label*="{target_day}"]'
-                    ]:
-                        day_buttons = self.page.query_selector_all(selector)
-                        for button in day_buttons:
-                            button_text = button.text_content().strip()
-                            aria_label = button.get_attribute('aria-label') or ''
-                            
-                            # Verify this is the correct day
-                            if button_text == str(target_day) or str(target_day) in aria_label:
-                                day_button = button
-                                break
-                        if day_button:
-                            break
+                    ])
+                    # Verify this is the correct day
+                    match = dom_extract.first_match(
+                        candidates,
+                        lambda b: b["text_content"] == str(target_day) or str(target_day) in b["aria_label"]
+                    )
+                    if match:
+                        day_button = dom_extract.locator(self.page, match)
                 
                 if day_button:
                     day_button.click()
-                    logger.info(f"Successfully clicked day {target_day}")
-                    time.sleep(1)  # Wait for selection to register
-                    logger.info(f"Date successfully set to {target_month_name} {target_day}, {target_year}")
+                    logger.info("Successfully clicked day %s", target_day)
+                    self.pause(1)  # Wait for selection to register
+                    logger.info("Date successfully set to %s %s, %s", target_month_name, target_day, target_year)
                 else:
-                    logger.warning(f"Could not find or click day {target_day}")
+                    logger.warning("Could not find or click day %s", target_day)
                     
             except Exception as e:
-                logger.error(f"Error selecting target day: {e}")
+                logger.error("Error selecting target day: %s", e)
                 
+        except CircuitOpenError:
+            raise
         except Exception as e:
-            logger.error(f"Error in date setting process: {e}")
+            logger.error("Error in date setting process: %s", e)
         # 5. Set time
         time_selectors = [
             'select[data-test="time-picker"]',
             '[data-test="time-picker"]',
             '[aria-label="Time selector"]'
         ]
+        time_breaker = opentable_breakers.get("selectors:time")
+        if not time_breaker.allow():
+            probe_logger.warning("Time selectors keep failing, skipping them (circuit open)")
+            time_selectors = []
         time_dropdown = None
+        time_set = False
         for selector in time_selectors:
             time_dropdown = self.page.query_selector(selector)
             if time_dropdown:
@@ -294,27 +425,34 @@ class OpenTableBooker:
                     time_obj = datetime.strptime(time_str, "%H:%M")
                     time_display = time_obj.strftime("%-I:%M %p").replace("AM", "AM").replace("PM", "PM")
                     self.page.select_option(selector, label=time_display)
-                    logger.info(f"Time set to {time_display} using selector {selector}.")
+                    logger.info("Time set to %s using selector %s.", time_display, selector)
+                    time_set = True
                     break
                 except Exception as e:
-                    logger.warning(f"Failed to set time with {selector}: {e}")
+                    probe_logger.warning("Failed to set time with %s: %s", selector, e)
+        if time_selectors:
+            time_breaker.record(time_set)
         if not time_dropdown:
             logger.warning("Could not find time dropdown with any selector.")
 
-        time.sleep(1)
+        self.pause(1)
 
          # 2. Type "restaurant + location" in the search bar and submit
         search_term = restaurant_name if not location else f"{restaurant_name} {location}"
+        search_breaker = opentable_breakers.get("selectors:search_input")
+        if not search_breaker.allow():
+            raise CircuitOpenError(search_breaker.name, search_breaker.retry_after())
         search_input = self.page.query_selector('input[placeholder*="Location, Restaurant, or Cuisine"]')
+        search_breaker.record(search_input is not None)
         if not search_input:
             logger.error("Could not find the search input on OpenTable homepage.")
             return None
         search_input.fill(search_term)
-        time.sleep(1)
+        self.pause(1)
 
         # 6. Click enter on keyboard
         self.page.keyboard.press("Enter")
-        time.sleep(1)
+        self.pause(1)
 
         
         return True
@@ -323,7 +461,7 @@ class OpenTableBooker:
         """
         Confirm the reservation with the given phone and email
         """
-        logger.info(f"Confirming reservation with phone: {phone} and email: {email}")
+        logger.info("Confirming reservation with phone: %s and email: %s", phone, email)
         
         # Convert 24-hour time string to 12-hour format (e.g., "20:00" -> "8:00 PM")
         time_12h = self.time_to_12h(time)
@@ -331,30 +469,38 @@ class OpenTableBooker:
 
         try:
             # Wait for time slot buttons to be available using the new selector
-            self.page.wait_for_selector('ul[data-test="time-slots"] li[data-test^="time-slot-"] div[role="button"]', state="visible", timeout=5000)
-            
-            # Get all available time slots
-            time_slots = self.page.query_selector_all('ul[data-test="time-slots"] li[data-test^="time-slot-"] div[role="button"]')
-            
-            # Iterate through time slots to find matching time
-            for slot in time_slots:
-                slot_text = slot.inner_text().strip()
-                if slot_text == time_12h:
-                    slot.click()
-                    logger.info(f"Clicked time slot button for {time_12h}")
-                    time_clicked = True
-                    # Wait for the page to load after clicking the time slot
-                    self.page.wait_for_load_state("networkidle")
-                    break
+            try:
+                self.page.wait_for_selector(TIME_SLOT_SELECTOR, state="visible", timeout=5000)
+            except Exception:
+                # No slot list: OpenTable saying so is an answer, anything else is a broken page
+                if self.page.query_selector(NO_RESULTS_SELECTOR):
+                    logger.error("OpenTable found no matching restaurant")
+                    return Unavailable("Could not find the restaurant on OpenTable")
+                if self.page.query_selector(NO_AVAILABILITY_SELECTOR):
+                    logger.error("No availability on the requested date")
+                    return Unavailable("No tables available on the requested date")
+                raise
+
+            # Get all available time slots and their labels in one round trip
+            time_slots = dom_extract.time_slots(self.page)
+
+            # Find the matching time in the snapshot
+            slot = dom_extract.first_match(time_slots, lambda s: s["text"] == time_12h and not s["disabled"])
+            if slot:
+                dom_extract.locator(self.page, slot).click()
+                logger.info("Clicked time slot button for %s", time_12h)
+                time_clicked = True
+                # Wait for the page to load after clicking the time slot
+                self.page.wait_for_load_state("networkidle")
             
             if not time_clicked:
-                logger.error(f"Could not find time slot for {time_12h}")
-                return False
+                logger.error("Could not find time slot for %s", time_12h)
+                return Unavailable(f"{time_12h} is not available")
 
             return True
 
         except Exception as e:
-            logger.error(f"Error during reservation confirmation: {str(e)}")
+            logger.error("Error during reservation confirmation: %s", e)
             return False
         
     def input_info(self, phone: str, email: str) -> bool:
@@ -366,7 +512,7 @@ class OpenTableBooker:
             phone_input = self.page.wait_for_selector('#phoneNumber', state='visible', timeout=5000)
             if phone_input:
                 phone_input.fill(phone)
-                logger.info(f"Successfully input phone number: {phone}")
+                logger.info("Successfully input phone number: %s", phone)
                 
                 # Click the complete reservation button
                 complete_button = self.page.wait_for_selector('#complete-reservation', state='visible', timeout=5000)
@@ -377,7 +523,7 @@ class OpenTableBooker:
                     # Wait for the page to load after clicking
                     self.page.wait_for_load_state('networkidle')
                   
-                    time.sleep(15)  # Additional small delay to ensure page loads completely
+                    self.pause(15)  # Additional small delay to ensure page loads completely
                     return True
                 else:
                     logger.error("Could not find complete reservation button")
@@ -386,7 +532,7 @@ class OpenTableBooker:
                 logger.error("Could not find phone number input field")
                 return False
         except Exception as e:
-            logger.error(f"Error in reservation process: {str(e)}")
+            logger.error("Error in reservation process: %s", e)
             return False
         
     def input_verification_code(self, code: str) -> bool:
@@ -394,7 +540,7 @@ class OpenTableBooker:
         Input the verification code into the reservation form
         The verification form appears inside an iframe that loads dynamically
         """
-        logger.info(f"Inputting verification code: {code}")
+        logger.info("Inputting %d-character verification code", len(code))
         
         try:
             # Wait for the iframe to be attached to the DOM and visible
@@ -410,34 +556,22 @@ class OpenTableBooker:
             code_input_locator = frame_locator.locator('#emailVerificationCode')
             code_input_locator.wait_for(state='visible', timeout=10000)
             
-            # Optional: Take a targeted screenshot of the iframe for debugging
-            try:
-                iframe_element = self.page.query_selector('#authenticationModalIframe')
-                if iframe_element:
-                    iframe_element.screenshot(path="verification_iframe_debug.png")
-                    logger.info("Debug screenshot of iframe taken")
-            except Exception as e:
-                logger.debug(f"Could not take iframe debug screenshot: {e}")
-            
             # Fill the verification code
             code_input_locator.fill(code)
             logger.info("Successfully input verification code in iframe")
             
             # Wait for the page to load after input
             self.page.wait_for_load_state('networkidle')
-            time.sleep(1)  # Small delay to ensure input is processed
+            self.pause(1)  # Small delay to ensure input is processed
             
             return True
 
         except Exception as e:
-            logger.error(f"Error in input_verification_code: {str(e)}")
+            logger.error("Error in input_verification_code: %s", e)
             
-            # Take a full-page screenshot for debugging on failure
-            try:
-                self.page.screenshot(path="verification_error_screenshot.png")
-                logger.info("Error screenshot taken for debugging")
-            except Exception as screenshot_error:
-                logger.error(f"Failed to take error screenshot: {screenshot_error}")
+            # Keep a screenshot in memory; it's only written if the booking fails
+            if self.artifacts is not None:
+                self.artifacts.capture_screenshot(self.page, "verification_error")
             
             return False
 
@@ -473,53 +607,347 @@ def book_reservation(data: Dict[str, Any]) -> Dict[str, Any]:
             }
     
     booker = get_global_booker()  # Use global booker instance
+    result = book_reservation_with_booker(booker, data)
+    if not result.get("verification_pending"):
+        # add_code() still needs this page while verification is pending
+        recycle_global_booker_if_needed()
+    return result
+
+def recycle_global_booker_if_needed() -> Optional[str]:
+    """Recycle the global booker's context or browser if the watchdog says it has grown too large"""
+    if _global_booker is None:
+        return None
+    return recycle_booker_if_needed(_global_booker)
+
+def recycle_booker_if_needed(booker: OpenTableBooker) -> Optional[str]:
+    """Recycle a long-lived booker's context, or restart its browser, per the watchdog"""
+    action = watchdog.recycle_action(booker)
+    if action is None:
+        return None
+    watchdog.record_recycle(booker, action)
+    if action == "context":
+        try:
+            booker.recycle_context()
+            return action
+        except Exception as e:
+            logger.error("Context recycle failed, restarting browser: %s", e)
+    booker.close()
+    booker.start()
+    return "browser"
+
+def book_reservation_with_booker(booker: OpenTableBooker, data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run the booking flow on a specific booker (e.g. one pinned to a booking).
+    When no verification code is supplied the result carries
+    verification_pending=True and the page is left on the verification step.
+    """
+    for field in ["restaurant", "location"]:
+        if field not in data:
+            return {
+                "success": False,
+                "error": f"Missing required field: {field}"
+            }
+
+    with booking_context(data.get("booking_id")):
+        watchdog.begin_booking(booker, data.get("booking_id"))
+        try:
+            result = _book_flow(booker, data)
+        finally:
+            usage = watchdog.end_booking(booker)
+        if usage is not None:
+            result["resources"] = usage
+        return result
+
+def _run_step(booker: OpenTableBooker, name: str, fn, *args, **kwargs):
+    """Run one booking step, tracing it when artifacts are being recorded"""
+    set_step(name)
+    recorder = booker.artifacts
+    if recorder is None:
+        return fn(*args, **kwargs)
+
+    recorder.begin_step(name)
     try:
-        restaurant_url = booker.search_restaurant(
-            restaurant_name=data["restaurant"],
-            location=data["location"],
-            date_str=data["date"],
-            time_str=data["time"],
-            party_size=data["party_size"]
-        )
-        if restaurant_url:
-            booking_confirmation = booker.confirm_reservation(data["phone"], data["email"], data['time'])
-            if booking_confirmation:
-                info_inputted = booker.input_info(data["phone"], data["email"])
-                if info_inputted:
-                    # Check if verification code is provided and handle it
-                    if "verification_code" in data and data["verification_code"]:
-                        verification_success = booker.input_verification_code(data["verification_code"])
-                        if verification_success:
-                            return {
-                                "success": True,
-                                "message": "Reservation booked successfully with verification"
-                            }
-                        else:
-                            return {
-                                "success": False,
-                                "error": "Failed to input verification code"
-                            }
-                    else:
-                        return {
-                            "success": True,
-                            "message": "Reservation booked successfully (verification code not provided)"
-                        }
+        result = fn(*args, **kwargs)
+    except Exception as e:
+        recorder.capture_screenshot(booker.page, f"{name}_error")
+        recorder.end_step(False, booker.page, detail=str(e))
+        raise
+    if not result:
+        recorder.capture_screenshot(booker.page, f"{name}_failed")
+    recorder.end_step(bool(result), booker.page)
+    return result
+
+def _finish_artifacts(booker: OpenTableBooker, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Stop tracing and attach the artifact path if the booking's artifacts were kept"""
+    if booker.artifacts is not None:
+        saved = booker.artifacts.finish(bool(result.get("success")))
+        booker.artifacts = None
+        if saved:
+            result["artifacts"] = saved
+    return result
+
+
+def _page_has(booker: OpenTableBooker, selector: str) -> bool:
+    return booker.page.query_selector(selector) is not None
+
+def build_pipeline(store: Optional[CheckpointStore] = None) -> BookingPipeline:
+    """
+    The OpenTable flow as resumable steps. input_info submits the form, so it
+    is never retried blindly; its idempotency check detects a prior submit.
+    """
+    return BookingPipeline([
+        Step(
+            "search",
+            lambda booker, data: booker.search_restaurant(
+                restaurant_name=data["restaurant"],
+                location=data["location"],
+                date_str=data["date"],
+                time_str=data["time"],
+                party_size=data["party_size"]
+            ),
+            error="Could not find restaurant",
+            retry=RetryPolicy(attempts=2, backoff=2.0),
+            done=lambda booker, data: _page_has(booker, TIME_SLOT_SELECTOR),
+        ),
+        Step(
+            "select_slot",
+            lambda booker, data: booker.confirm_reservation(data["phone"], data["email"], data["time"]),
+            error="Failed to confirm reservation",
+            retry=RetryPolicy(attempts=2, backoff=1.0),
+            done=lambda booker, data: _page_has(booker, '#phoneNumber'),
+        ),
+        Step(
+            "input_info",
+            lambda booker, data: booker.input_info(data["phone"], data["email"]),
+            error="Failed to input contact information",
+            retry=RetryPolicy(attempts=1),
+            done=lambda booker, data: _page_has(booker, '#authenticationModalIframe'),
+        ),
+    ], store=store, breakers=opentable_breakers)
+
+_checkpoint_store = CheckpointStore()
+
+def _book_flow(booker: OpenTableBooker, data: Dict[str, Any]) -> Dict[str, Any]:
+    booking_id = data.get("booking_id")
+    if booking_id and (ARTIFACTS_ENABLED or data.get("debug_artifacts")):
+        booker.artifacts = ArtifactRecorder(booking_id, booker.page.context, debug=bool(data.get("debug_artifacts")))
+        booker.artifacts.start()
+
+    try:
+        # Checkpoints only make sense for bookings that can be retried by id
+        pipeline = build_pipeline(_checkpoint_store if booking_id else None)
+        outcome = pipeline.run(booker, data, _run_step, booking_id)
+        if outcome.get("circuit_open"):
+            result = {
+                "success": False,
+                "error": f"OpenTable automation is failing at step '{outcome['failed_step']}'; "
+                         f"not attempted, retry in {outcome['retry_after']:.0f}s",
+                "failed_step": outcome["failed_step"],
+                "circuit_open": True,
+                "retry_after": round(outcome["retry_after"], 1),
+            }
+        elif not outcome["success"]:
+            error = outcome["error"]
+            if outcome["failed_step"] == "search" and not outcome.get("unavailable"):
+                error = f"Could not find restaurant '{data['restaurant']}' in '{data['location']}'"
+            result = {
+                "success": False,
+                "error": error,
+                "failed_step": outcome["failed_step"]
+            }
+            if outcome.get("unavailable"):
+                result["unavailable"] = True
+        elif data.get("verification_code"):
+            # Verification code was provided up front
+            if _run_step(booker, "verify", booker.input_verification_code, data["verification_code"]):
+                result = {
+                    "success": True,
+                    "message": "Reservation booked successfully with verification"
+                }
             else:
-                return {
+                result = {
                     "success": False,
-                    "error": "Failed to confirm reservation"
+                    "error": "Failed to input verification code",
+                    "failed_step": "verify"
                 }
         else:
+            # Leave tracing running; verify_with_booker finishes it
             return {
-                "success": False,
-                "error": f"Could not find restaurant '{data['restaurant']}' in '{data['location']}'"
+                "success": True,
+                "message": "Reservation booked successfully (verification code not provided)",
+                "verification_pending": True,
+                "resumed_from": outcome["resumed_from"]
             }
+        if outcome["resumed_from"]:
+            result["resumed_from"] = outcome["resumed_from"]
     except Exception as e:
-        logger.error(f"Error during booking: {str(e)}")
-        return {
+        logger.error("Error during booking: %s", e)
+        result = {
             "success": False,
             "error": str(e)
         }
+    if result.get("success") and booking_id:
+        _checkpoint_store.clear(booking_id)
+    return _finish_artifacts(booker, result)
+
+def prewarm_with_booker(booker: OpenTableBooker, data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Speculatively run the search step so a booking that later adopts this
+    booker starts on the slot list (the pipeline skips search when the
+    slots are already on the page). Nothing is checkpointed or traced.
+    """
+    with booking_context(step="prewarm"):
+        found = booker.search_restaurant(
+            restaurant_name=data["restaurant"],
+            location=data["location"],
+            date_str=data["date"],
+            time_str=data["time"],
+            party_size=data["party_size"]
+        )
+        if not found:
+            return {"ready": False, "error": "Could not find restaurant"}
+        slots = dom_extract.time_slots(booker.page)
+        return {
+            "ready": True,
+            "url": booker.page.url,
+            "slots": [slot["text"] for slot in slots if not slot["disabled"]],
+        }
+
+def wait_until(target: float, spin: float = 0.02, cancelled: Optional[threading.Event] = None) -> Optional[float]:
+    """
+    Block until time.time() reaches target: sleep until `spin` seconds
+    before it, then busy-wait the rest. Returns how late the wake-up was in
+    seconds, or None if cancelled while sleeping.
+    """
+    while True:
+        remaining = target - time.time()
+        if remaining <= spin:
+            break
+        if cancelled is not None and cancelled.is_set():
+            return None
+        time.sleep(min(remaining - spin, 0.5))
+    while time.time() < target:
+        pass
+    return time.time() - target
+
+def preposition_with_booker(booker: OpenTableBooker, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Open the restaurant's slot page ahead of a drop-time booking"""
+    with booking_context(data.get("booking_id"), step="preposition"):
+        found = booker.search_restaurant(
+            restaurant_name=data["restaurant"],
+            location=data["location"],
+            date_str=data["date"],
+            time_str=data["time"],
+            party_size=data["party_size"]
+        )
+        return {"ready": bool(found), "url": booker.page.url}
+
+def drop_book_with_booker(
+    booker: OpenTableBooker,
+    data: Dict[str, Any],
+    release_ts: float,
+    spin: float = 0.02,
+    cancelled: Optional[threading.Event] = None,
+) -> Dict[str, Any]:
+    """
+    Wait for release_ts on the browser thread, reload the pre-positioned
+    slot page and click the requested slot, then finish the booking through
+    the normal pipeline (resuming after select_slot if the click landed).
+    The result carries drop_timing with trigger lateness and
+    trigger-to-click latency in milliseconds.
+    """
+    booking_id = data.get("booking_id")
+    timing: Dict[str, Any] = {}
+    with booking_context(booking_id, step="drop"):
+        lateness = wait_until(release_ts, spin, cancelled)
+        if lateness is None:
+            return {"success": False, "error": "Scheduled booking cancelled"}
+        triggered = time.perf_counter()
+        timing["trigger_lateness_ms"] = round(lateness * 1000, 3)
+
+        clicked = False
+        try:
+            booker.page.reload(wait_until="domcontentloaded")
+            booker.page.wait_for_selector(TIME_SLOT_SELECTOR, state="visible", timeout=10000)
+            time_12h = booker.time_to_12h(data["time"])
+            slot = dom_extract.first_match(
+                dom_extract.time_slots(booker.page),
+                lambda s: s["text"] == time_12h and not s["disabled"]
+            )
+            if slot:
+                dom_extract.locator(booker.page, slot).click()
+                clicked = True
+                timing["trigger_to_click_ms"] = round((time.perf_counter() - triggered) * 1000, 1)
+                booker.page.wait_for_load_state("networkidle")
+            else:
+                logger.warning("Slot %s not offered at release time", time_12h)
+        except Exception as e:
+            logger.warning("Drop-time slot click failed: %s", e)
+
+        if clicked and booking_id:
+            _checkpoint_store.save(booking_id, "select_slot", booker.page.url, {"select_slot": 1})
+
+    # Without a click this runs the whole flow from search as a fallback
+    result = book_reservation_with_booker(booker, data)
+    result["drop_timing"] = timing
+    return result
+
+def poll_slots_with_booker(booker: OpenTableBooker, data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Slots currently offered for a watched reservation. Polls run the search
+    until it lands on the restaurant's slot page; later polls only reload
+    that page.
+    """
+    with booking_context(step="watch"):
+        try:
+            if recycle_booker_if_needed(booker):
+                booker.watch_url = None  # fresh page, search again
+            if booker.watch_url and booker.page.url == booker.watch_url:
+                booker.page.reload(wait_until="domcontentloaded")
+                booker.page.wait_for_load_state("networkidle")
+            else:
+                booker.watch_url = None
+                if not booker.search_restaurant(
+                    restaurant_name=data["restaurant"],
+                    location=data["location"],
+                    date_str=data["date"],
+                    time_str=data.get("time") or "19:00",
+                    party_size=data["party_size"]
+                ):
+                    return {"ok": False, "error": "Could not find restaurant"}
+                try:
+                    booker.page.wait_for_selector(TIME_SLOT_SELECTOR, state="visible", timeout=10000)
+                except Exception:
+                    pass  # sold out, or not the restaurant's page; checked below
+            on_slot_page = _page_has(booker, TIME_SLOT_SELECTOR) or _page_has(booker, NO_AVAILABILITY_SELECTOR)
+            if not on_slot_page:
+                # Search results or a broken page: search again next poll
+                booker.watch_url = None
+                return {"ok": False, "error": "Restaurant slot page not found"}
+            booker.watch_url = booker.page.url
+            slots = dom_extract.time_slots(booker.page)
+        except Exception as e:
+            booker.watch_url = None
+            return {"ok": False, "error": str(e)}
+        return {"ok": True, "slots": [slot["text"] for slot in slots if not slot["disabled"]]}
+
+def verify_with_booker(booker: OpenTableBooker, code: str, booking_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Submit a verification code on a booker held at the verification step
+    """
+    if not _run_step(booker, "verify", booker.input_verification_code, code):
+        # Keep tracing so a retried code is recorded too; close() saves
+        # the artifacts if the session expires without success
+        return {
+            "success": False,
+            "error": "Failed to input verification code"
+        }
+    if booking_id:
+        _checkpoint_store.clear(booking_id)
+    return _finish_artifacts(booker, {
+        "success": True,
+        "message": "Reservation booked successfully with verification"
+    })
 
 def add_code(code: str) -> Dict[str, Any]:
     """
@@ -546,7 +974,7 @@ def add_code(code: str) -> Dict[str, Any]:
                 "error": "Failed to input verification code"
             }
     except Exception as e:
-        logger.error(f"Error in add_code: {str(e)}")
+        logger.error("Error in add_code: %s", e)
         return {
             "success": False,
             "error": f"Error: {str(e)}"
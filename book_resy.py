@@ -1,7 +1,255 @@
-def book_resy(data: dict) -> dict:
-    print("Booking on Resy...")
-    pass
+import os
+import json
+import asyncio
+import logging
+import weakref
+from datetime import datetime
+from typing import Optional, Dict, Any, List
+
+import httpx
+
+logger = logging.getLogger("resy_booking")
+
+# Point RESY_API_BASE at resy_standin.py to book against a local stand-in
+RESY_API_BASE = os.getenv("RESY_API_BASE", "https://api.resy.com")
+RESY_API_KEY = os.getenv("RESY_API_KEY", "")
+RESY_AUTH_TOKEN = os.getenv("RESY_AUTH_TOKEN", "")
+RESY_PAYMENT_METHOD_ID = os.getenv("RESY_PAYMENT_METHOD_ID")
+
+
+class ResyError(Exception):
+    """Raised when a Resy endpoint returns an unexpected response"""
+
+
+def to_resy_day(date_str: str) -> str:
+    """
+    Convert our parsed date format ("June,5,2025") to Resy's "2025-06-05".
+    ISO dates are passed through unchanged.
+    """
+    try:
+        return datetime.strptime(date_str, "%Y-%m-%d").strftime("%Y-%m-%d")
+    except ValueError:
+        pass
+    month, day, year = [part.strip() for part in date_str.split(",")]
+    return datetime.strptime(f"{month} {day} {year}", "%B %d %Y").strftime("%Y-%m-%d")
+
+
+class ResyClient:
+    """
+    Thin async client over Resy's JSON API. One instance holds a pooled
+    httpx.AsyncClient, so keep it around instead of creating one per booking.
+    """
+
+    def __init__(
+        self,
+        base_url: str = RESY_API_BASE,
+        api_key: str = RESY_API_KEY,
+        auth_token: str = RESY_AUTH_TOKEN,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        timeout: float = 10.0,
+    ):
+        headers = {
+            "Authorization": f'ResyAPI api_key="{api_key}"',
+            "X-Resy-Auth-Token": auth_token,
+            "X-Resy-Universal-Auth": auth_token,
+            "Accept": "application/json",
+            "Origin": "https://resy.com",
+            "Referer": "https://resy.com/",
+        }
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            transport=transport,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+        )
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+    async def _json(self, response: httpx.Response) -> Dict[str, Any]:
+        if response.status_code >= 400:
+            raise ResyError(f"{response.request.method} {response.request.url.path} returned {response.status_code}: {response.text[:200]}")
+        return response.json()
+
+    async def find_venue(self, restaurant: str, location: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Look up a venue by name, preferring hits in the requested location
+        """
+        payload = {
+            "query": restaurant,
+            "per_page": 5,
+            "types": ["venue"],
+        }
+        data = await self._json(await self.client.post("/3/venuesearch/search", json=payload))
+        hits: List[Dict[str, Any]] = data.get("search", {}).get("hits", [])
+        if not hits:
+            return None
+
+        name = restaurant.strip().lower()
+        city = (location or "").strip().lower()
+
+        def score(hit: Dict[str, Any]) -> int:
+            hit_name = str(hit.get("name", "")).lower()
+            hit_location = json.dumps(hit.get("location", {})).lower()
+            value = 0
+            if hit_name == name:
+                value += 2
+            elif name in hit_name:
+                value += 1
+            if city and city in hit_location:
+                value += 2
+            return value
+
+        best = max(hits, key=score)
+        if score(best) == 0:
+            return None
+        return best
+
+    async def find_slots(self, venue_id: int, day: str, party_size: int, lat: float = 0, lng: float = 0) -> List[Dict[str, Any]]:
+        params = {
+            "lat": lat,
+            "long": lng,
+            "day": day,
+            "party_size": party_size,
+            "venue_id": venue_id,
+        }
+        data = await self._json(await self.client.get("/4/find", params=params))
+        venues = data.get("results", {}).get("venues", [])
+        if not venues:
+            return []
+        return venues[0].get("slots", [])
 
+    async def get_details(self, config_token: str, day: str, party_size: int) -> Dict[str, Any]:
+        payload = {
+            "config_id": config_token,
+            "day": day,
+            "party_size": party_size,
+        }
+        return await self._json(await self.client.post("/3/details", json=payload))
 
+    async def book(self, book_token: str, payment_method_id: Optional[int] = None) -> Dict[str, Any]:
+        form = {
+            "book_token": book_token,
+            "source_id": "resy.com-venue-details",
+        }
+        if payment_method_id is not None:
+            form["struct_payment_method"] = json.dumps({"id": payment_method_id})
+        return await self._json(await self.client.post("/3/book", data=form))
 
 
+def match_slot(slots: List[Dict[str, Any]], time_str: str) -> Optional[Dict[str, Any]]:
+    """
+    Find the slot starting at time_str ("19:00"). Slot start looks like
+    "2025-06-05 19:00:00".
+    """
+    wanted = time_str.strip()[:5]
+    for slot in slots:
+        start = slot.get("date", {}).get("start", "")
+        if start[11:16] == wanted:
+            return slot
+    return None
+
+
+# Keyed by the loop itself (weakly), so a client dies with its loop and a
+# new loop that reuses a dead loop's id() never gets that loop's client
+_shared_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ResyClient]" = weakref.WeakKeyDictionary()
+
+
+def get_resy_client() -> ResyClient:
+    """Get the pooled client for the running event loop, creating it if needed"""
+    loop = asyncio.get_running_loop()
+    client = _shared_clients.get(loop)
+    if client is None:
+        client = ResyClient()
+        _shared_clients[loop] = client
+    return client
+
+
+async def close_resy_clients() -> None:
+    """Close the running loop's pooled client (called on application shutdown)"""
+    client = _shared_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
+
+
+async def book_resy_async(data: Dict[str, Any], client: Optional[ResyClient] = None) -> Dict[str, Any]:
+    """
+    Book a reservation through Resy's API.
+    Args:
+        data: Same dictionary book_reservation takes (restaurant, location, date, time, party_size)
+        client: Optional ResyClient, defaults to the pooled client for this loop
+    Returns:
+        Dictionary with results of the booking attempt, same shape as book_reservation
+    """
+    for field in ["restaurant", "location", "date", "time", "party_size"]:
+        if field not in data:
+            return {
+                "success": False,
+                "error": f"Missing required field: {field}"
+            }
+
+    client = client or get_resy_client()
+    try:
+        day = to_resy_day(data["date"])
+        party_size = int(data["party_size"])
+
+        venue = await client.find_venue(data["restaurant"], data.get("location"))
+        if not venue:
+            return {
+                "success": False,
+                "error": f"Could not find restaurant '{data['restaurant']}' in '{data['location']}' on Resy"
+            }
+        venue_id = venue["id"]["resy"]
+        geo = venue.get("_geoloc", {})
+        logger.info(f"Resy venue {venue_id} matched for {data['restaurant']}")
+
+        slots = await client.find_slots(venue_id, day, party_size, geo.get("lat", 0), geo.get("lng", 0))
+        slot = match_slot(slots, data["time"])
+        if not slot:
+            return {
+                "success": False,
+                "error": f"No Resy slot at {data['time']} on {day}"
+            }
+
+        details = await client.get_details(slot["config"]["token"], day, party_size)
+        book_token = details.get("book_token", {}).get("value")
+        if not book_token:
+            return {
+                "success": False,
+                "error": "Resy did not return a book token"
+            }
+
+        payment_method_id = RESY_PAYMENT_METHOD_ID
+        if payment_method_id is None:
+            payment_methods = details.get("user", {}).get("payment_methods", [])
+            payment_method_id = payment_methods[0]["id"] if payment_methods else None
+
+        booking = await client.book(book_token, int(payment_method_id) if payment_method_id is not None else None)
+        return {
+            "success": True,
+            "message": "Reservation booked successfully on Resy",
+            "provider": "resy",
+            "reservation_id": booking.get("reservation_id"),
+            "resy_token": booking.get("resy_token"),
+        }
+    except (ResyError, httpx.HTTPError, KeyError, ValueError) as e:
+        logger.error(f"Error during Resy booking: {str(e)}")
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+
+def book_resy(data: dict) -> dict:
+    """
+    Synchronous wrapper around book_resy_async for scripts and threads
+    """
+    async def run() -> Dict[str, Any]:
+        client = ResyClient()
+        try:
+            return await book_resy_async(data, client)
+        finally:
+            await client.close()
+
+    return asyncio.run(run())
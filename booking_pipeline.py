@@ -0,0 +1,264 @@
+"""
+Resumable booking step pipeline.
+
+The OpenTable flow is a list of Steps. Each step has a retry policy and an
+idempotency check ("is the page already past this step?"). After every
+completed step a checkpoint with the step name and page URL is stored, so a
+retry or a different worker resumes by loading that URL and continuing with
+the next step instead of starting again from the OpenTable homepage.
+"""
+
+import json
+import time
+import logging
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Callable
+
+from sqlalchemy import Column, String, Text, DateTime
+
+from database import Base, SessionLocal
+from circuit_breaker import BreakerRegistry, CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+
+class BookingCheckpoint(Base):
+    __tablename__ = "booking_checkpoints"
+
+    booking_id = Column(String, primary_key=True, index=True)
+    last_step = Column(String, nullable=False)
+    page_url = Column(String, nullable=True)
+    attempts = Column(Text, nullable=True)  # JSON: step name -> attempts used
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "last_step": self.last_step,
+            "page_url": self.page_url,
+            "attempts": json.loads(self.attempts or "{}"),
+            "updated_at": self.updated_at.isoformat(),
+        }
+
+
+class CheckpointStore:
+    """Checkpoints in the app database so any worker can resume a booking"""
+
+    def load(self, booking_id: str) -> Optional[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            row = db.get(BookingCheckpoint, booking_id)
+            return row.to_dict() if row else None
+        finally:
+            db.close()
+
+    def save(self, booking_id: str, last_step: str, page_url: Optional[str], attempts: Dict[str, int]) -> None:
+        db = SessionLocal()
+        try:
+            row = db.get(BookingCheckpoint, booking_id)
+            if row is None:
+                row = BookingCheckpoint(booking_id=booking_id)
+                db.add(row)
+            row.last_step = last_step
+            row.page_url = page_url
+            row.attempts = json.dumps(attempts)
+            row.updated_at = datetime.utcnow()
+            db.commit()
+        finally:
+            db.close()
+
+    def clear(self, booking_id: str) -> None:
+        db = SessionLocal()
+        try:
+            db.query(BookingCheckpoint).filter(BookingCheckpoint.booking_id == booking_id).delete()
+            db.commit()
+        finally:
+            db.close()
+
+
+class RetryPolicy:
+    def __init__(self, attempts: int = 1, backoff: float = 1.0, multiplier: float = 2.0):
+        self.attempts = max(1, attempts)
+        self.backoff = backoff
+        self.multiplier = multiplier
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait before retry number `attempt` (1-based)"""
+        return self.backoff * (self.multiplier ** (attempt - 1))
+
+
+class Unavailable:
+    """
+    Returned by a step that worked but found nothing to book: the restaurant
+    doesn't exist, the date is invalid, the time is sold out. Falsy, so the
+    booking fails, but it isn't retried and doesn't count against the step's
+    circuit breaker, which is only for broken automation.
+    """
+
+    def __init__(self, reason: str):
+        self.reason = reason
+
+    def __bool__(self) -> bool:
+        return False
+
+    def __repr__(self) -> str:
+        return f"Unavailable({self.reason!r})"
+
+
+class Step:
+    """
+    run(booker, data) -> truthy on success, Unavailable if there is nothing to book.
+    done(booker, data) -> True if the page shows this step already happened.
+    error is the message returned when the step ultimately fails.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable[[Any, Dict[str, Any]], Any],
+        error: str,
+        retry: Optional[RetryPolicy] = None,
+        done: Optional[Callable[[Any, Dict[str, Any]], bool]] = None,
+    ):
+        self.name = name
+        self.run = run
+        self.error = error
+        self.retry = retry or RetryPolicy()
+        self.done = done
+
+
+class BookingPipeline:
+    def __init__(self, steps: List[Step], store: Optional[CheckpointStore] = None,
+                 breakers: Optional[BreakerRegistry] = None):
+        self.steps = steps
+        self.store = store
+        self.breakers = breakers
+
+    def _start_index(self, checkpoint: Optional[Dict[str, Any]]) -> int:
+        if not checkpoint:
+            return 0
+        names = [step.name for step in self.steps]
+        if checkpoint["last_step"] not in names:
+            return 0
+        return names.index(checkpoint["last_step"]) + 1
+
+    def _already_done(self, step: Step, booker, data: Dict[str, Any]) -> bool:
+        if step.done is None:
+            return False
+        try:
+            return bool(step.done(booker, data))
+        except Exception:
+            return False
+
+    def run(
+        self,
+        booker,
+        data: Dict[str, Any],
+        runner: Callable[..., Any],
+        booking_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run the steps, resuming from the stored checkpoint for booking_id.
+        runner(booker, name, fn, *args) executes one attempt of a step (lets
+        the caller wrap steps with tracing). Returns {"success": bool,
+        "failed_step": name or None, "error": message or None, "resumed_from": name or None}.
+        If a step's circuit breaker, or a selector group inside the step, is
+        open the booking fails fast, and the result also has circuit_open=True
+        and retry_after (seconds). If a step returned
+        Unavailable, the result has unavailable=True and its reason as error.
+        """
+        checkpoint = self.store.load(booking_id) if self.store and booking_id else None
+        start = self._start_index(checkpoint)
+        attempts: Dict[str, int] = dict(checkpoint["attempts"]) if checkpoint else {}
+        resumed_from = checkpoint["last_step"] if checkpoint and start > 0 else None
+        # (step name, page URL) of the last completed step
+        last_completed = (checkpoint["last_step"], checkpoint["page_url"]) if resumed_from else None
+
+        # Permits for every remaining step up front, so a broken step fails the booking before any page load
+        permits: Dict[str, Any] = {}
+        if self.breakers is not None:
+            for step in self.steps[start:]:
+                breaker = self.breakers.get(f"step:{step.name}")
+                if not breaker.allow():
+                    self._release(permits)
+                    logger.warning("Step %s circuit is open, failing fast", step.name)
+                    return {"success": False, "failed_step": step.name, "error": step.error,
+                            "resumed_from": resumed_from, "circuit_open": True, "retry_after": breaker.retry_after()}
+                permits[step.name] = breaker
+
+        if resumed_from and checkpoint.get("page_url") and booker.page.url != checkpoint["page_url"]:
+            logger.info("Resuming after step %s at %s", resumed_from, checkpoint["page_url"])
+            booker.page.goto(checkpoint["page_url"])
+            booker.page.wait_for_load_state("networkidle")
+
+        for step in self.steps[start:]:
+            if self._already_done(step, booker, data):
+                logger.info("Step %s already done, skipping", step.name)
+                self._release({step.name: permits.pop(step.name, None)})
+                last_completed = (step.name, booker.page.url)
+                self._save(booking_id, last_completed, attempts)
+                continue
+
+            ok = False
+            unavailable: Optional[Unavailable] = None
+            circuit_open: Optional[CircuitOpenError] = None
+            for attempt in range(1, step.retry.attempts + 1):
+                attempts[step.name] = attempts.get(step.name, 0) + 1
+                try:
+                    outcome = runner(booker, step.name, step.run, booker, data)
+                except CircuitOpenError as e:
+                    # A selector group inside the step is known broken; retrying won't help
+                    logger.warning("Step %s failing fast: %s", step.name, e)
+                    circuit_open = e
+                    break
+                except Exception as e:
+                    logger.error("Step %s raised: %s", step.name, e)
+                    outcome = False
+                ok = bool(outcome)
+                if isinstance(outcome, Unavailable):
+                    logger.info("Step %s found nothing to book: %s", step.name, outcome.reason)
+                    unavailable = outcome
+                    break
+                if ok:
+                    break
+                if attempt < step.retry.attempts:
+                    # A failed attempt may have gotten further than it reported
+                    if self._already_done(step, booker, data):
+                        ok = True
+                        break
+                    delay = step.retry.delay(attempt)
+                    logger.warning("Step %s failed (attempt %d/%d), retrying in %.1fs",
+                                   step.name, attempt, step.retry.attempts, delay)
+                    time.sleep(delay)
+
+            if circuit_open is not None:
+                # The step didn't get to run, so its own breaker learns nothing
+                self._release(permits)
+                self._save(booking_id, last_completed, attempts)
+                return {"success": False, "failed_step": step.name, "error": step.error,
+                        "resumed_from": resumed_from, "circuit_open": True, "retry_after": circuit_open.retry_after}
+            if step.name in permits:
+                # The automation worked even if the restaurant had nothing to offer
+                permits.pop(step.name).record(ok or unavailable is not None)
+            if not ok:
+                self._release(permits)
+                # Keep the last good checkpoint, with updated attempt counts
+                self._save(booking_id, last_completed, attempts)
+                if unavailable is not None:
+                    return {"success": False, "failed_step": step.name, "error": unavailable.reason,
+                            "resumed_from": resumed_from, "unavailable": True}
+                return {"success": False, "failed_step": step.name, "error": step.error, "resumed_from": resumed_from}
+
+            last_completed = (step.name, booker.page.url)
+            self._save(booking_id, last_completed, attempts)
+
+        return {"success": True, "failed_step": None, "error": None, "resumed_from": resumed_from}
+
+    def _release(self, permits: Dict[str, Any]) -> None:
+        """Return breaker permits for steps that didn't run"""
+        for breaker in permits.values():
+            if breaker is not None:
+                breaker.release()
+
+    def _save(self, booking_id: Optional[str], last_completed, attempts: Dict[str, int]) -> None:
+        if self.store and booking_id and last_completed:
+            self.store.save(booking_id, last_completed[0], last_completed[1], attempts)
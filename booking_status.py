@@ -0,0 +1,72 @@
+"""
+Booking status shared across API worker processes.
+
+Each worker keeps its bookings in memory (app.booking_sessions); with more
+than one worker a /status request can land on a worker that didn't start
+the booking. Workers mirror each booking's public status into this table at
+every state change, and /status falls back to it for unknown IDs.
+
+The row also records the owning worker's private address (see
+worker_proxy.py), so requests that need the booking's session or browser
+can be sent to that worker.
+"""
+
+import json
+from datetime import datetime
+from typing import Optional, Dict, Any
+
+from sqlalchemy import Column, String, Text, DateTime
+
+from database import Base, SessionLocal
+
+STATUS_FIELDS = ("booking_id", "status", "message", "progress", "result", "created_at", "updated_at")
+
+
+class BookingStatusRecord(Base):
+    __tablename__ = "booking_status"
+
+    booking_id = Column(String, primary_key=True, index=True)
+    payload = Column(Text, nullable=False)  # JSON of STATUS_FIELDS
+    owner = Column(String, nullable=True)  # address of the worker holding the session
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class BookingStatusStore:
+    def save(self, session: Dict[str, Any], owner: Optional[str] = None) -> None:
+        payload = json.dumps({field: session.get(field) for field in STATUS_FIELDS}, default=str)
+        db = SessionLocal()
+        try:
+            row = db.get(BookingStatusRecord, session["booking_id"])
+            if row is None:
+                row = BookingStatusRecord(booking_id=session["booking_id"])
+                db.add(row)
+            row.payload = payload
+            row.owner = owner
+            row.updated_at = datetime.utcnow()
+            db.commit()
+        finally:
+            db.close()
+
+    def load(self, booking_id: str) -> Optional[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            row = db.get(BookingStatusRecord, booking_id)
+            return json.loads(row.payload) if row else None
+        finally:
+            db.close()
+
+    def owner_of(self, booking_id: str) -> Optional[str]:
+        db = SessionLocal()
+        try:
+            row = db.get(BookingStatusRecord, booking_id)
+            return row.owner if row else None
+        finally:
+            db.close()
+
+    def clear(self, booking_id: str) -> None:
+        db = SessionLocal()
+        try:
+            db.query(BookingStatusRecord).filter(BookingStatusRecord.booking_id == booking_id).delete()
+            db.commit()
+        finally:
+            db.close()
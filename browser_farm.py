@@ -0,0 +1,226 @@
+"""
+Remote browser farm.
+
+By default every OpenTableBooker launches Chromium on the API host, which
+caps concurrency at what that host's RAM allows. With BROWSER_NODES set,
+bookers connect to remote Playwright browser servers instead:
+
+    BROWSER_NODES="ws://10.0.0.5:3100/farm-0,ws://10.0.0.6:3100/farm-1"
+    BROWSER_NODE_CAPACITY=4            concurrent browsers per node
+    BROWSER_FARM_LOCAL_FALLBACK=1      launch locally when no node has room
+
+Each booker is placed on the healthy node with the lowest load. A node is
+evicted after repeated connect or health-check failures and readmitted once
+its health check passes again, so new bookings rebalance onto it; a booking
+that was on a dead node fails its step and resumes from its checkpoint on
+another node when retried.
+
+To try it on one machine, start a few browser servers (on ports from
+BROWSER_FARM_PORT, default 3100, clear of the frontend on 3000):
+
+    python browser_farm.py --count 3
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+import threading
+import subprocess
+from urllib.parse import urlparse
+from typing import Optional, Dict, Any, List
+
+logger = logging.getLogger(__name__)
+
+EVICT_AFTER_FAILURES = 2
+
+
+class NoBrowserNodeAvailable(RuntimeError):
+    """Raised when every node is evicted or at capacity"""
+
+
+class BrowserNode:
+    def __init__(self, ws_endpoint: str, capacity: int):
+        self.ws_endpoint = ws_endpoint
+        self.capacity = capacity
+        self.active = 0
+        self.healthy = True
+        self.failures = 0
+        self.placed = 0
+        self.last_check: Optional[float] = None
+
+    @property
+    def address(self):
+        parsed = urlparse(self.ws_endpoint)
+        return parsed.hostname, parsed.port or (443 if parsed.scheme == "wss" else 80)
+
+    def load(self) -> float:
+        return self.active / self.capacity
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ws_endpoint": self.ws_endpoint,
+            "healthy": self.healthy,
+            "active": self.active,
+            "capacity": self.capacity,
+            "failures": self.failures,
+            "placed": self.placed,
+        }
+
+
+class BrowserFarm:
+    """
+    Placement is called from browser session threads, so node state is
+    guarded by a lock; health checks run on the event loop.
+    """
+
+    def __init__(self, endpoints: List[str], capacity: int = 4, local_fallback: bool = True, check_interval: float = 10.0):
+        self.nodes = [BrowserNode(endpoint, capacity) for endpoint in endpoints]
+        self.local_fallback = local_fallback
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self._checker: Optional[asyncio.Task] = None
+
+    def candidates(self) -> List[BrowserNode]:
+        """Healthy nodes with room, least loaded first"""
+        with self.lock:
+            nodes = [n for n in self.nodes if n.healthy and n.active < n.capacity]
+            return sorted(nodes, key=lambda n: (n.load(), n.placed))
+
+    def acquire(self, node: BrowserNode) -> bool:
+        with self.lock:
+            if not node.healthy or node.active >= node.capacity:
+                return False
+            node.active += 1
+            node.placed += 1
+            return True
+
+    def release(self, node: BrowserNode) -> None:
+        with self.lock:
+            node.active = max(0, node.active - 1)
+
+    def report_failure(self, node: BrowserNode) -> None:
+        with self.lock:
+            node.failures += 1
+            if node.healthy and node.failures >= EVICT_AFTER_FAILURES:
+                node.healthy = False
+                logger.warning("Evicted browser node %s after %d failures", node.ws_endpoint, node.failures)
+
+    def report_success(self, node: BrowserNode) -> None:
+        with self.lock:
+            node.failures = 0
+            if not node.healthy:
+                node.healthy = True
+                logger.info("Browser node %s is back", node.ws_endpoint)
+
+    def connect(self, playwright, timeout: float = 15000):
+        """
+        Connect to the least-loaded node, trying the others if it fails.
+        Returns (browser, node), or raises NoBrowserNodeAvailable.
+        """
+        for node in self.candidates():
+            if not self.acquire(node):
+                continue
+            try:
+                browser = playwright.chromium.connect(node.ws_endpoint, timeout=timeout)
+            except Exception as e:
+                self.release(node)
+                self.report_failure(node)
+                logger.warning("Could not connect to browser node %s: %s", node.ws_endpoint, e)
+                continue
+            self.report_success(node)
+            return browser, node
+        raise NoBrowserNodeAvailable("No browser node has capacity")
+
+    async def _check(self, node: BrowserNode) -> None:
+        host, port = node.address
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=3.0)
+            writer.close()
+            await writer.wait_closed()
+        except (OSError, asyncio.TimeoutError):
+            self.report_failure(node)
+        else:
+            self.report_success(node)
+        node.last_check = time.time()
+
+    async def _run_checks(self) -> None:
+        while True:
+            await asyncio.gather(*(self._check(node) for node in self.nodes))
+            await asyncio.sleep(self.check_interval)
+
+    def start(self) -> None:
+        if self._checker is None:
+            self._checker = asyncio.get_running_loop().create_task(self._run_checks())
+
+    async def stop(self) -> None:
+        if self._checker is not None:
+            self._checker.cancel()
+            self._checker = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "local_fallback": self.local_fallback,
+                "nodes": [node.to_dict() for node in self.nodes],
+            }
+
+
+_farm: Optional[BrowserFarm] = None
+_farm_loaded = False
+
+
+def get_browser_farm() -> Optional[BrowserFarm]:
+    """The farm configured by BROWSER_NODES, or None to launch browsers locally"""
+    global _farm, _farm_loaded
+    if not _farm_loaded:
+        endpoints = [e.strip() for e in os.getenv("BROWSER_NODES", "").split(",") if e.strip()]
+        if endpoints:
+            _farm = BrowserFarm(
+                endpoints,
+                capacity=int(os.getenv("BROWSER_NODE_CAPACITY", "4")),
+                local_fallback=os.getenv("BROWSER_FARM_LOCAL_FALLBACK", "1") == "1",
+            )
+        _farm_loaded = True
+    return _farm
+
+
+def serve_local_nodes(count: int, base_port: int, headless: bool = True) -> None:
+    """Run `count` Playwright browser servers on this machine until interrupted"""
+    processes = []
+    endpoints = []
+    config_dir = tempfile.mkdtemp(prefix="browser-farm-")
+    for index in range(count):
+        port = base_port + index
+        config_path = os.path.join(config_dir, f"node-{index}.json")
+        with open(config_path, "w") as f:
+            json.dump({"port": port, "wsPath": f"farm-{index}", "headless": headless}, f)
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "playwright", "launch-server", "--browser", "chromium", "--config", config_path]
+        ))
+        endpoints.append(f"ws://127.0.0.1:{port}/farm-{index}")
+
+    print(f"🚀 Started {count} browser servers")
+    print(f'export BROWSER_NODES="{",".join(endpoints)}"')
+    try:
+        for process in processes:
+            process.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run local Playwright browser servers for testing the farm")
+    parser.add_argument("--count", type=int, default=3, help="Number of browser servers (default: 3)")
+    parser.add_argument("--port", type=int, default=int(os.getenv("BROWSER_FARM_PORT", "3100")),
+                        help="First port (default: BROWSER_FARM_PORT or 3100)")
+    parser.add_argument("--headed", action="store_true", help="Show the browser windows")
+    args = parser.parse_args()
+    serve_local_nodes(args.count, args.port, headless=not args.headed)
@@ -0,0 +1,158 @@
+"""
+Per-booking browser sessions.
+
+Sync Playwright objects can only be used from the thread that created them,
+so each BrowserSession owns a single worker thread and every call on its
+booker is submitted to that thread. A session can be held after the booking
+flow (e.g. while OpenTable waits for a verification code) and is closed
+when released or after sitting idle past the timeout. A session that was
+already warmed up (speculative prewarm) can be adopted by a booking so its
+create() returns that session instead of launching a new browser.
+"""
+
+import time
+import asyncio
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Callable, Awaitable
+
+from profiling import attached
+
+logger = logging.getLogger(__name__)
+
+
+class BrowserSession:
+    def __init__(self, session_id: str, booker_factory: Callable[[], Any]):
+        self.session_id = session_id
+        self.booker_factory = booker_factory
+        self.booker = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"browser-{session_id[:8]}")
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.closed = False
+
+    def _call(self, fn: Callable[..., Any], args: tuple) -> Any:
+        # Runs on the session thread
+        with attached():
+            if self.booker is None:
+                self.booker = self.booker_factory()
+                self.booker.start()
+            return fn(self.booker, *args)
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Call fn(booker, *args) on this session's browser thread"""
+        if self.closed:
+            raise RuntimeError(f"Browser session {self.session_id} is closed")
+        self.last_used = time.monotonic()
+        # Carry context variables (booking_id for logging) onto the browser thread
+        context = contextvars.copy_context()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, context.run, self._call, fn, args)
+        finally:
+            self.last_used = time.monotonic()
+
+    def _close_booker(self) -> None:
+        if self.booker is not None:
+            self.booker.close()
+            self.booker = None
+
+    async def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self._close_booker)
+        except Exception as e:
+            logger.error(f"Error closing browser session {self.session_id}: {str(e)}")
+        finally:
+            self.executor.shutdown(wait=False)
+
+    def idle_seconds(self) -> float:
+        return time.monotonic() - self.last_used
+
+
+class SessionManager:
+    """
+    Creates sessions for bookings and keeps the ones that need a follow-up
+    step (verification) alive until released or idle for idle_timeout seconds.
+    """
+
+    def __init__(
+        self,
+        booker_factory: Callable[[], Any],
+        idle_timeout: float = 300.0,
+        on_expire: Optional[Callable[[str], Awaitable[None]]] = None,
+    ):
+        self.booker_factory = booker_factory
+        self.idle_timeout = idle_timeout
+        self.on_expire = on_expire
+        self.held: Dict[str, BrowserSession] = {}
+        # Warm sessions waiting for their booking to start
+        self.adopted: Dict[str, BrowserSession] = {}
+        self._reaper: Optional[asyncio.Task] = None
+
+    def create(self, booking_id: str) -> BrowserSession:
+        session = self.adopted.pop(booking_id, None)
+        if session is not None and not session.closed:
+            return session
+        return BrowserSession(booking_id, self.booker_factory)
+
+    def adopt(self, booking_id: str, session: BrowserSession) -> None:
+        """Hand an already-started session to booking_id's next create()"""
+        self.adopted[booking_id] = session
+
+    async def drop_adopted(self, booking_id: str) -> None:
+        """Close an adopted session the booking never used (e.g. it went to another provider)"""
+        session = self.adopted.pop(booking_id, None)
+        if session is not None:
+            await session.close()
+
+    def hold(self, booking_id: str, session: BrowserSession) -> None:
+        self.held[booking_id] = session
+        logger.info(f"Holding browser session for {booking_id} (idle timeout {self.idle_timeout:.0f}s)")
+
+    def get(self, booking_id: str) -> Optional[BrowserSession]:
+        return self.held.get(booking_id)
+
+    async def release(self, booking_id: str) -> None:
+        await self.drop_adopted(booking_id)
+        session = self.held.pop(booking_id, None)
+        if session is not None:
+            await session.close()
+            logger.info(f"Released browser session for {booking_id}")
+
+    async def _reap(self) -> None:
+        while True:
+            await asyncio.sleep(min(30.0, self.idle_timeout / 4))
+            for booking_id, session in list(self.held.items()):
+                if session.idle_seconds() > self.idle_timeout:
+                    logger.info(f"Browser session for {booking_id} idle for {session.idle_seconds():.0f}s, closing")
+                    await self.release(booking_id)
+                    if self.on_expire is not None:
+                        await self.on_expire(booking_id)
+            for booking_id, session in list(self.adopted.items()):
+                if session.idle_seconds() > self.idle_timeout:
+                    await self.drop_adopted(booking_id)
+
+    def start(self) -> None:
+        if self._reaper is None:
+            self._reaper = asyncio.get_running_loop().create_task(self._reap())
+
+    async def close_all(self) -> None:
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        for booking_id in list(self.held) + list(self.adopted):
+            await self.release(booking_id)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "held": len(self.held),
+            "adopted": len(self.adopted),
+            "idle_timeout_s": self.idle_timeout,
+            "sessions": {
+                booking_id: {"idle_s": round(session.idle_seconds(), 1)}
+                for booking_id, session in self.held.items()
+            },
+        }
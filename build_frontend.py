@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Build the frontend for production
+
+Extracts the inline <style> and <script> blocks from each page into
+fingerprinted, minified assets, rewrites the pages to reference them, and
+writes gzip (and brotli, if installed) variants next to every file:
+
+    frontend/dist/index.html
+    frontend/dist/assets/index.3f9c2a1b7d.js
+    frontend/dist/assets/index.3f9c2a1b7d.js.gz
+    frontend/dist/assets/index.3f9c2a1b7d.js.br
+
+Fingerprinted assets are served with long-lived immutable cache headers;
+HTML is always revalidated (see frontend_static.py).
+"""
+
+import re
+import gzip
+import shutil
+import hashlib
+from pathlib import Path
+from typing import Dict
+
+try:
+    import brotli
+except ImportError:  # brotli variants are optional
+    brotli = None
+
+FRONTEND_DIR = Path(__file__).parent / "frontend"
+DIST_DIR = FRONTEND_DIR / "dist"
+ASSETS_DIR = DIST_DIR / "assets"
+
+INLINE_STYLE = re.compile(r"<style>(.*?)</style>", re.S)
+INLINE_SCRIPT = re.compile(r"<script>(.*?)</script>", re.S)
+LOCAL_SCRIPT = re.compile(r'<script src="(js/[^"]+)"></script>')
+
+COMPRESSIBLE = {".html", ".js", ".css", ".svg", ".json"}
+
+
+def minify_css(css: str) -> str:
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{}:;,>])\s*", r"\1", css)
+    return css.replace(";}", "}").strip()
+
+
+def minify_js(js: str) -> str:
+    """
+    Conservative JS minifier: drops comments, indentation and blank lines
+    while leaving strings, template literals and regex literals untouched.
+    Newlines are kept so automatic semicolon insertion behaves the same.
+    """
+    out = []
+    i = 0
+    length = len(js)
+    last_significant = ""
+    while i < length:
+        char = js[i]
+        nxt = js[i + 1] if i + 1 < length else ""
+
+        if char in "'\"`":
+            end = i + 1
+            while end < length and js[end] != char:
+                end += 2 if js[end] == "\\" else 1
+            out.append(js[i:end + 1])
+            last_significant = char
+            i = end + 1
+        elif char == "/" and nxt == "/":
+            while i < length and js[i] != "\n":
+                i += 1
+        elif char == "/" and nxt == "*":
+            end = js.find("*/", i + 2)
+            i = length if end == -1 else end + 2
+        elif char == "/" and (last_significant in "(,=:[!&|?{};+-*%<>~^" or last_significant == ""):
+            # Regex literal
+            end = i + 1
+            in_class = False
+            while end < length and (js[end] != "/" or in_class) and js[end] != "\n":
+                if js[end] == "\\":
+                    end += 1
+                elif js[end] == "[":
+                    in_class = True
+                elif js[end] == "]":
+                    in_class = False
+                end += 1
+            out.append(js[i:end + 1])
+            last_significant = "/"
+            i = end + 1
+        else:
+            out.append(char)
+            if not char.isspace():
+                last_significant = char
+            i += 1
+
+    lines = [line.strip() for line in "".join(out).splitlines()]
+    return "\n".join(line for line in lines if line)
+
+
+def fingerprint(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()[:10]
+
+
+def write_asset(stem: str, suffix: str, content: str) -> str:
+    data = content.encode("utf-8")
+    name = f"{stem}.{fingerprint(data)}{suffix}"
+    (ASSETS_DIR / name).write_bytes(data)
+    return f"assets/{name}"
+
+
+def precompress(path: Path) -> None:
+    data = path.read_bytes()
+    path.with_name(path.name + ".gz").write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        path.with_name(path.name + ".br").write_bytes(brotli.compress(data, quality=11))
+
+
+def build() -> Dict[str, int]:
+    if DIST_DIR.exists():
+        shutil.rmtree(DIST_DIR)
+    ASSETS_DIR.mkdir(parents=True)
+
+    # Shared local scripts first so pages can point at their fingerprinted names
+    shared: Dict[str, str] = {}
+    for script in sorted((FRONTEND_DIR / "js").glob("*.js")):
+        shared[f"js/{script.name}"] = write_asset(script.stem, ".js", minify_js(script.read_text()))
+
+    for page in sorted(FRONTEND_DIR.glob("*.html")):
+        html = page.read_text()
+        stem = page.stem
+
+        styles = "\n".join(INLINE_STYLE.findall(html))
+        if styles.strip():
+            css_path = write_asset(stem, ".css", minify_css(styles))
+            html = INLINE_STYLE.sub("", html, count=0)
+            html = html.replace("</head>", f'    <link href="{css_path}" rel="stylesheet">\n</head>', 1)
+
+        scripts = "\n".join(INLINE_SCRIPT.findall(html))
+        if scripts.strip():
+            js_path = write_asset(stem, ".js", minify_js(scripts))
+            # Keep the page script where the first inline block was so load order holds
+            first = True
+
+            def replace_script(match: re.Match) -> str:
+                nonlocal first
+                if first:
+                    first = False
+                    return f'<script src="{js_path}"></script>'
+                return ""
+
+            html = INLINE_SCRIPT.sub(replace_script, html)
+
+        html = LOCAL_SCRIPT.sub(lambda m: f'<script src="{shared.get(m.group(1), m.group(1))}"></script>', html)
+        (DIST_DIR / page.name).write_text(html)
+
+    sizes = {}
+    for path in sorted(DIST_DIR.rglob("*")):
+        if path.is_file() and path.suffix in COMPRESSIBLE:
+            precompress(path)
+            sizes[str(path.relative_to(DIST_DIR))] = path.stat().st_size
+    return sizes
+
+
+if __name__ == "__main__":
+    print("🔨 Building frontend...")
+    sizes = build()
+    for name, size in sizes.items():
+        gz_size = (DIST_DIR / (name + ".gz")).stat().st_size
+        print(f"   {name:<40} {size:>8} bytes  (gzip {gz_size})")
+    if brotli is None:
+        print("💡 Install brotli to also generate .br variants")
+    print(f"✅ Frontend built into {DIST_DIR}")
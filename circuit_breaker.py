@@ -0,0 +1,190 @@
+"""
+Circuit breakers for the OpenTable browser automation.
+
+When OpenTable changes its markup or is degraded, every booking would still
+walk all selector fallbacks and retries before failing. Breakers track the
+recent outcomes of each pipeline step ("step:search", ...) and of each
+selector group inside a step ("selectors:date_picker", ...):
+
+  closed     calls run; once at least min_calls outcomes in the window fail
+             at failure_rate or more, the breaker opens
+  open       calls fail fast for open_seconds
+  half_open  the next booking runs as a trial; success closes the breaker,
+             failure opens it again
+
+A booking checks the breakers of its steps before a browser is launched,
+so while OpenTable automation is broken bookings fail in milliseconds (and
+route mode moves on to the next provider). State is served on /health.
+
+    CIRCUIT_WINDOW=20              recent outcomes kept per breaker
+    CIRCUIT_WINDOW_SECONDS=600     outcomes older than this are forgotten
+    CIRCUIT_MIN_CALLS=5
+    CIRCUIT_FAILURE_RATE=0.5
+    CIRCUIT_OPEN_SECONDS=60
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from typing import Optional, Dict, Any, List
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of running a call whose breaker is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit {name} is open, retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Called from browser session threads, so state is guarded by a lock"""
+
+    def __init__(self, name: str, window: int = 20, window_seconds: float = 600.0, min_calls: int = 5,
+                 failure_rate: float = 0.5, open_seconds: float = 60.0, half_open_trials: int = 1):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.half_open_trials = half_open_trials
+        self.outcomes: deque = deque(maxlen=window)  # (monotonic time, success)
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.trials = 0
+        self.trial_started = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    def _recent(self, now: float) -> List[bool]:
+        while self.outcomes and now - self.outcomes[0][0] > self.window_seconds:
+            self.outcomes.popleft()
+        return [ok for _, ok in self.outcomes]
+
+    def _open(self, now: float) -> None:
+        self.state = OPEN
+        self.opened_at = now
+        self.trials = 0
+        self.times_opened += 1
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.open_seconds - time.monotonic()) if self.state == OPEN else 0.0
+
+    def would_allow(self) -> bool:
+        """allow() without taking a half-open trial"""
+        now = time.monotonic()
+        with self.lock:
+            if self.state == OPEN:
+                return now >= self.opened_at + self.open_seconds
+            if self.state == HALF_OPEN and self.trials and now - self.trial_started > self.open_seconds:
+                return True
+            return self.state == CLOSED or self.trials < self.half_open_trials
+
+    def allow(self) -> bool:
+        """Whether a call may run now; in half-open it takes one of the trial slots"""
+        now = time.monotonic()
+        with self.lock:
+            if self.state == OPEN and now >= self.opened_at + self.open_seconds:
+                self.state = HALF_OPEN
+                self.trials = 0
+                logger.info("Circuit %s half-open, letting a trial through", self.name)
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and self.trials and now - self.trial_started > self.open_seconds:
+                # The trial never reported back (e.g. its booking crashed)
+                self.trials = 0
+            if self.state == HALF_OPEN and self.trials < self.half_open_trials:
+                self.trials += 1
+                self.trial_started = now
+                return True
+            self.rejected += 1
+            return False
+
+    def release(self) -> None:
+        """Give back a permit from allow() whose call never ran"""
+        with self.lock:
+            if self.state == HALF_OPEN and self.trials:
+                self.trials -= 1
+
+    def record(self, success: bool) -> None:
+        now = time.monotonic()
+        with self.lock:
+            if self.state == HALF_OPEN:
+                if success:
+                    self.state = CLOSED
+                    self.outcomes.clear()
+                    logger.info("Circuit %s closed after a successful trial", self.name)
+                else:
+                    self._open(now)
+                    logger.warning("Circuit %s trial failed, open for another %.0fs", self.name, self.open_seconds)
+                return
+            if self.state == OPEN:
+                # A call admitted before the breaker opened
+                return
+            self.outcomes.append((now, success))
+            recent = self._recent(now)
+            failures = recent.count(False)
+            if len(recent) >= self.min_calls and failures / len(recent) >= self.failure_rate:
+                self._open(now)
+                logger.warning("Circuit %s opened: %d of the last %d calls failed", self.name, failures, len(recent))
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self.lock:
+            recent = self._recent(time.monotonic())
+            return {
+                "state": self.state,
+                "calls": len(recent),
+                "failure_rate": round(recent.count(False) / len(recent), 3) if recent else None,
+                "retry_after_s": round(self.retry_after(), 1),
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
+
+
+class BreakerRegistry:
+    """Breakers created on first use, all with the same settings"""
+
+    def __init__(self, **settings: Any):
+        self.settings = settings
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.lock = threading.Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        with self.lock:
+            breaker = self.breakers.get(name)
+            if breaker is None:
+                breaker = self.breakers[name] = CircuitBreaker(name, **self.settings)
+            return breaker
+
+    def blocking(self, prefix: str = "") -> Optional[CircuitBreaker]:
+        """An open breaker (whose name starts with prefix) that would reject a call now, if any"""
+        with self.lock:
+            breakers = [b for name, b in self.breakers.items() if name.startswith(prefix)]
+        for breaker in breakers:
+            if not breaker.would_allow():
+                return breaker
+        return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            breakers = dict(self.breakers)
+        return {name: breaker.to_dict() for name, breaker in sorted(breakers.items())}
+
+
+opentable_breakers = BreakerRegistry(
+    window=int(os.getenv("CIRCUIT_WINDOW", "20")),
+    window_seconds=float(os.getenv("CIRCUIT_WINDOW_SECONDS", "600")),
+    min_calls=int(os.getenv("CIRCUIT_MIN_CALLS", "5")),
+    failure_rate=float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5")),
+    open_seconds=float(os.getenv("CIRCUIT_OPEN_SECONDS", "60")),
+)
@@ -34,8 +34,9 @@ class User(Base):
     def get_password_hash(password):
         return pwd_context.hash(password)
 
-# Create all tables
-Base.metadata.create_all(bind=engine)
+def init_db():
+    """Create all tables (called from the app's startup hook, not at import)"""
+    Base.metadata.create_all(bind=engine)
 
 # Dependency to get DB session
 def get_db():
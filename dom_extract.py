@@ -0,0 +1,94 @@
+"""
+Single-round-trip DOM extraction for the booking flow.
+
+Reading elements one by one (inner_text(), text_content(), get_attribute())
+costs one Chromium round trip per call. These helpers collect every matching
+element's text and attributes with a single page.evaluate, tag each element
+with a data-rb-handle attribute, and let the flow match in Python and then
+act on the chosen element through that handle.
+"""
+
+import re
+import uuid
+from typing import List, Dict, Any, Optional, Callable, Tuple
+
+HANDLE_ATTR = "data-rb-handle"
+
+# Playwright's :has-text() isn't CSS, so it's split off and applied in JS
+HAS_TEXT = re.compile(r""":has-text\((["'])(.*?)\1\)""")
+
+_EXTRACT_JS = """
+([specs, token, handleAttr]) => {
+    const seen = new Set();
+    const results = [];
+    specs.forEach(([css, hasText], group) => {
+        let nodes;
+        try {
+            nodes = document.querySelectorAll(css);
+        } catch (e) {
+            return;
+        }
+        nodes.forEach((el) => {
+            const text = (el.innerText || '').trim();
+            const textContent = (el.textContent || '').trim();
+            if (hasText && !textContent.toLowerCase().includes(hasText.toLowerCase())) return;
+            if (seen.has(el)) return;
+            seen.add(el);
+            const handle = `${token}-${results.length}`;
+            el.setAttribute(handleAttr, handle);
+            const rect = el.getBoundingClientRect();
+            results.push({
+                handle: handle,
+                group: group,
+                tag: el.tagName.toLowerCase(),
+                text: text,
+                text_content: textContent,
+                aria_label: el.getAttribute('aria-label') || '',
+                name: el.getAttribute('name') || '',
+                data_test: el.getAttribute('data-test') || '',
+                placeholder: el.getAttribute('placeholder') || '',
+                disabled: !!el.disabled || el.getAttribute('aria-disabled') === 'true',
+                visible: rect.width > 0 && rect.height > 0,
+            });
+        });
+    });
+    return results;
+}
+"""
+
+
+def _spec(selector: str) -> Tuple[str, Optional[str]]:
+    match = HAS_TEXT.search(selector)
+    if not match:
+        return selector, None
+    return HAS_TEXT.sub("", selector).strip() or "*", match.group(2)
+
+
+def snapshot(page, selectors) -> List[Dict[str, Any]]:
+    """
+    Collect every element matching any of the selectors in one evaluate call.
+    Each entry has handle, group (index of the selector that matched first),
+    text (innerText), text_content, aria_label, name, data_test, placeholder,
+    disabled and visible. Elements matched by several selectors appear once.
+    """
+    if isinstance(selectors, str):
+        selectors = [selectors]
+    token = uuid.uuid4().hex[:8]
+    return page.evaluate(_EXTRACT_JS, [[list(_spec(s)) for s in selectors], token, HANDLE_ATTR])
+
+
+def locator(page, element: Dict[str, Any]):
+    """Locator for an element returned by snapshot()"""
+    return page.locator(f'[{HANDLE_ATTR}="{element["handle"]}"]')
+
+
+def first_match(elements: List[Dict[str, Any]], predicate: Callable[[Dict[str, Any]], bool]) -> Optional[Dict[str, Any]]:
+    """First element (in selector priority order) satisfying predicate"""
+    for element in sorted(elements, key=lambda e: e["group"]):
+        if predicate(element):
+            return element
+    return None
+
+
+def time_slots(page) -> List[Dict[str, Any]]:
+    return snapshot(page, 'ul[data-test="time-slots"] li[data-test^="time-slot-"] div[role="button"]')
@@ -0,0 +1,172 @@
+"""
+Drop-time booking.
+
+Popular restaurants release tables at a fixed time. A booking with a
+release_at timestamp is handed to the DropScheduler, which sleeps until
+lead seconds before the release, opens a browser session on the
+restaurant's slot page, and then hands the session thread a precise wait:
+a coarse sleep followed by a short spin, a reload, and the slot click.
+Every fire records how late the trigger woke up and the trigger-to-click
+latency so the lead and spin can be tuned.
+
+    DROP_LEAD_SECONDS=60      pre-position the browser this long before release
+    DROP_SPIN_SECONDS=0.02    busy-wait this final stretch instead of sleeping
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Optional, Dict, Any, Callable, Awaitable
+
+from browser_sessions import SessionManager
+
+logger = logging.getLogger(__name__)
+
+
+def _summary(values) -> Dict[str, Any]:
+    if not values:
+        return {"samples": 0}
+    ordered = sorted(values)
+    count = len(ordered)
+    return {
+        "samples": count,
+        "p50_ms": ordered[int(0.50 * (count - 1))],
+        "p95_ms": ordered[int(0.95 * (count - 1))],
+        "max_ms": ordered[-1],
+    }
+
+
+class ScheduledDrop:
+    def __init__(self, booking_id: str, release_ts: float):
+        self.booking_id = booking_id
+        self.release_ts = release_ts
+        self.cancelled = threading.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.stage = "waiting"
+
+
+class DropScheduler:
+    def __init__(
+        self,
+        sessions: SessionManager,
+        preposition_fn: Callable[[Any, Dict[str, Any]], Dict[str, Any]],
+        drop_fn: Callable[..., Dict[str, Any]],
+        lead: float = 60.0,
+        spin: float = 0.02,
+        history: int = 200,
+    ):
+        self.sessions = sessions
+        self.preposition_fn = preposition_fn
+        self.drop_fn = drop_fn
+        self.lead = lead
+        self.spin = spin
+        self.scheduled: Dict[str, ScheduledDrop] = {}
+        self.trigger_to_click: deque = deque(maxlen=history)
+        self.trigger_lateness: deque = deque(maxlen=history)
+
+    def schedule(
+        self,
+        booking_id: str,
+        data: Dict[str, Any],
+        release_ts: float,
+        on_progress: Callable[[str], None],
+        on_result: Callable[[Dict[str, Any]], Awaitable[None]],
+    ) -> None:
+        drop = ScheduledDrop(booking_id, release_ts)
+        drop.task = asyncio.get_running_loop().create_task(self._run(drop, data, on_progress, on_result))
+        self.scheduled[booking_id] = drop
+
+    async def _sleep_until(self, ts: float) -> None:
+        # Sleep in slices so wall-clock adjustments are picked up
+        while True:
+            remaining = ts - time.time()
+            if remaining <= 0:
+                return
+            await asyncio.sleep(min(remaining, 30.0))
+
+    async def _run(
+        self,
+        drop: ScheduledDrop,
+        data: Dict[str, Any],
+        on_progress: Callable[[str], None],
+        on_result: Callable[[Dict[str, Any]], Awaitable[None]],
+    ) -> None:
+        session = None
+        held = False
+        try:
+            await self._sleep_until(drop.release_ts - self.lead)
+
+            drop.stage = "prepositioning"
+            on_progress("Opening the restaurant page ahead of release...")
+            session = self.sessions.create(drop.booking_id)
+            try:
+                prepared = await session.run(self.preposition_fn, data)
+            except Exception as e:
+                logger.warning("Pre-positioning failed: %s", e)
+                prepared = {"ready": False}
+            if not prepared.get("ready"):
+                # The drop still fires; without a slot page it books from search
+                logger.warning("Slot page not ready before release; will search at release time")
+
+            drop.stage = "armed"
+            on_progress("Waiting for tables to be released...")
+            result = await session.run(self.drop_fn, data, drop.release_ts, self.spin, drop.cancelled)
+            self._record(result.get("drop_timing") or {})
+
+            if result.get("success") and result.get("verification_pending"):
+                self.sessions.hold(drop.booking_id, session)
+                held = True
+            await on_result(result)
+        except asyncio.CancelledError:
+            drop.cancelled.set()
+            raise
+        except Exception as e:
+            logger.error("Scheduled booking failed: %s", e)
+            await on_result({"success": False, "error": str(e)})
+        finally:
+            self.scheduled.pop(drop.booking_id, None)
+            if session is not None and not held:
+                await session.close()
+
+    def _record(self, timing: Dict[str, Any]) -> None:
+        if "trigger_lateness_ms" in timing:
+            self.trigger_lateness.append(timing["trigger_lateness_ms"])
+        if "trigger_to_click_ms" in timing:
+            self.trigger_to_click.append(timing["trigger_to_click_ms"])
+            logger.info("Drop fired %.3fms late, clicked %.1fms after trigger",
+                        timing.get("trigger_lateness_ms", 0.0), timing["trigger_to_click_ms"])
+
+    async def cancel(self, booking_id: str) -> bool:
+        drop = self.scheduled.get(booking_id)
+        if drop is None:
+            return False
+        drop.cancelled.set()
+        if drop.task is not None:
+            drop.task.cancel()
+            try:
+                await drop.task
+            except asyncio.CancelledError:
+                pass
+        return True
+
+    async def close_all(self) -> None:
+        for booking_id in list(self.scheduled):
+            await self.cancel(booking_id)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "lead_s": self.lead,
+            "spin_s": self.spin,
+            "scheduled": {
+                booking_id: {
+                    "release_at": datetime.fromtimestamp(drop.release_ts).isoformat(timespec="milliseconds"),
+                    "stage": drop.stage,
+                }
+                for booking_id, drop in self.scheduled.items()
+            },
+            "trigger_to_click": _summary(list(self.trigger_to_click)),
+            "trigger_lateness": _summary(list(self.trigger_lateness)),
+        }
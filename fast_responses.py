@@ -0,0 +1,58 @@
+"""
+Fast JSON responses and response compression.
+
+FastJSONResponse renders with orjson (datetimes, UUIDs and non-str dict
+keys handled natively) and is the app's default response class. Hot
+endpoints return it directly with plain data, which skips FastAPI's
+response-model validation and jsonable_encoder pass entirely.
+
+CompressionMiddleware is Starlette's GZip middleware minus the responses it
+must not touch: server-sent event streams (gzip would hold events back in
+its buffer) and the frontend, which is served precompressed.
+
+    GZIP_MIN_SIZE=1000      bytes; smaller responses are sent as-is
+
+orjson is optional; without it the stdlib json module is used.
+"""
+
+import re
+import json
+from datetime import date, datetime
+from typing import Any
+
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import JSONResponse
+from starlette.types import Receive, Scope, Send
+
+try:
+    import orjson
+except ImportError:  # slower stdlib fallback
+    orjson = None
+
+# /parse/stream and /watch/{id}/events are SSE; /app is precompressed
+UNCOMPRESSED_PATHS = re.compile(r"^(/parse/stream$|/watch/[^/]+/events$|/app(/|$))")
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class CompressionMiddleware(GZipMiddleware):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and UNCOMPRESSED_PATHS.match(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
@@ -0,0 +1,74 @@
+"""
+Static file serving for the built frontend.
+
+PrecompressedStaticFiles extends Starlette's StaticFiles (which already does
+ETag/Last-Modified and 304 responses) to:
+  - serve the .br/.gz variant written by build_frontend.py when the client
+    accepts it, without compressing on the fly
+  - mark fingerprinted assets (name.<hash>.ext) as immutable for a year and
+    make HTML revalidate on every load
+"""
+
+import os
+import re
+from mimetypes import guess_type
+from pathlib import Path
+from typing import Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles, NotModifiedResponse
+from starlette.types import Scope
+
+FRONTEND_DIR = Path(__file__).parent / "frontend"
+DIST_DIR = FRONTEND_DIR / "dist"
+
+FINGERPRINTED = re.compile(r"\.[0-9a-f]{10}\.[a-z0-9]+$")
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def frontend_directory() -> Path:
+    """The built frontend if present, otherwise the raw source pages"""
+    return DIST_DIR if (DIST_DIR / "index.html").exists() else FRONTEND_DIR
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    def file_response(
+        self,
+        full_path: str,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        full_path = str(full_path)
+        request_headers = Headers(scope=scope)
+        accepted = request_headers.get("accept-encoding", "")
+        media_type = guess_type(full_path)[0] or "text/plain"
+
+        served_path, served_stat, encoding = full_path, stat_result, None
+        for candidate_encoding, suffix in ENCODINGS:
+            if candidate_encoding in accepted:
+                variant_stat = _stat(full_path + suffix)
+                if variant_stat is not None:
+                    served_path, served_stat, encoding = full_path + suffix, variant_stat, candidate_encoding
+                    break
+
+        response = FileResponse(served_path, status_code=status_code, stat_result=served_stat, media_type=media_type)
+        if encoding is not None:
+            response.headers["content-encoding"] = encoding
+        response.headers["vary"] = "Accept-Encoding"
+        response.headers["cache-control"] = IMMUTABLE_CACHE if FINGERPRINTED.search(full_path) else REVALIDATE_CACHE
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+def _stat(path: str) -> Optional[os.stat_result]:
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
@@ -0,0 +1,113 @@
+"""
+Record an OpenTable booking session to HAR and replay it offline.
+
+A recording is a HAR file plus a JSON sidecar (<har>.json) holding the
+booking data, the recording time and the outcome. Replaying serves every
+request from the HAR with the page clock pinned to the recording time, so
+the same flow runs deterministically without the live site.
+
+    # Record (stops at the verification step, nothing is confirmed)
+    python har_replay.py record fixtures/opentable_booking.har.zip
+
+    # Replay once
+    python har_replay.py replay fixtures/opentable_booking.har.zip
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from typing import Dict, Any, Tuple
+
+from book_opentable import OpenTableBooker, book_reservation_with_booker
+
+DEFAULT_HAR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "opentable_booking.har.zip")
+
+DEFAULT_RESERVATION = {
+    "restaurant": "Nobu",
+    "location": "Los Angeles",
+    "date": "June,20,2025",
+    "time": "19:00",
+    "party_size": 4,
+    "phone": "1234567890",
+    "email": "test@test.com"
+}
+
+
+def sidecar_path(har_path: str) -> str:
+    return har_path + ".json"
+
+
+def load_recording(har_path: str) -> Dict[str, Any]:
+    with open(sidecar_path(har_path)) as f:
+        return json.load(f)
+
+
+def _outcome(result: Dict[str, Any]) -> Dict[str, Any]:
+    """The parts of a result a replay is expected to reproduce"""
+    return {
+        "success": bool(result.get("success")),
+        "failed_step": result.get("failed_step"),
+        "verification_pending": bool(result.get("verification_pending")),
+    }
+
+
+def record_booking(har_path: str, data: Dict[str, Any], headless: bool = False) -> Dict[str, Any]:
+    """Run the flow against the live site, saving its traffic to har_path"""
+    os.makedirs(os.path.dirname(os.path.abspath(har_path)), exist_ok=True)
+    recorded_at_ms = int(time.time() * 1000)
+    booker = OpenTableBooker(headless=headless, record_har_path=har_path)
+    booker.start()
+    try:
+        result = book_reservation_with_booker(booker, data)
+    finally:
+        booker.close()
+    recording = {"recorded_at_ms": recorded_at_ms, "data": data, "outcome": _outcome(result)}
+    with open(sidecar_path(har_path), "w") as f:
+        json.dump(recording, f, indent=2)
+    return recording
+
+
+def replay_booking(har_path: str, headless: bool = True) -> Tuple[Dict[str, Any], float]:
+    """Re-run a recorded flow from its HAR. Returns (outcome, seconds)"""
+    recording = load_recording(har_path)
+    booker = OpenTableBooker(
+        headless=headless,
+        replay_har_path=har_path,
+        replay_clock_ms=recording["recorded_at_ms"],
+    )
+    start = time.perf_counter()
+    booker.start()
+    try:
+        result = book_reservation_with_booker(booker, dict(recording["data"]))
+    finally:
+        booker.close()
+    return _outcome(result), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record or replay an OpenTable booking HAR")
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("har", nargs="?", default=DEFAULT_HAR)
+    parser.add_argument("--data", help="JSON file with the reservation to record (default: a sample)")
+    parser.add_argument("--headless", action="store_true")
+    args = parser.parse_args()
+
+    if args.mode == "record":
+        data = DEFAULT_RESERVATION
+        if args.data:
+            with open(args.data) as f:
+                data = json.load(f)
+        recording = record_booking(args.har, data, headless=args.headless)
+        print(f"Recorded {args.har}: {recording['outcome']}")
+        return
+
+    if not os.path.exists(args.har):
+        sys.exit(f"No recording at {args.har}; run with 'record' first")
+    outcome, elapsed = replay_booking(args.har, headless=True)
+    print(f"Replayed {args.har} in {elapsed:.2f}s: {outcome}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Duplicate /book suppression.
+
+A double-click or a client retry must not start a second browser flow for
+the same reservation. /book claims two keys before starting any work:
+
+  - the client's Idempotency-Key header, if sent, kept for IDEMPOTENCY_KEY_TTL
+  - a fingerprint of the normalized reservation, kept for BOOKING_DEDUPE_WINDOW
+
+If either key is already claimed by a live booking, /book returns that
+booking instead. Claims expire, so the same reservation can be booked again
+after the window.
+
+A single worker keeps claims in memory; with several workers they go in the
+database so a duplicate landing on another worker is caught too.
+"""
+
+import re
+import json
+import time
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, Tuple
+
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.exc import IntegrityError
+
+from database import Base, SessionLocal
+
+PURGE_EVERY = 100
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return re.sub(r"\s+", " ", value.strip().lower())
+    return value
+
+
+def reservation_fingerprint(details: Dict[str, Any]) -> str:
+    """Same reservation, same fingerprint, regardless of case, spacing or phone formatting"""
+    normalized = {key: _normalize(value) for key, value in details.items()
+                  if key != "speculation_token" and value not in (None, "")}
+    if "phone" in normalized:
+        normalized["phone"] = re.sub(r"\D", "", str(normalized["phone"]))
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    claim(key, ...) -> None if the caller now owns the key, else the
+    (booking_id, fingerprint) it already belongs to.
+    """
+
+    def __init__(self):
+        self.claims: Dict[str, Tuple[str, str, float]] = {}  # key -> (booking_id, fingerprint, expires)
+        self.claimed = 0
+        self.lock = threading.Lock()
+
+    def claim(self, key: str, fingerprint: str, booking_id: str, ttl: float) -> Optional[Tuple[str, str]]:
+        now = time.monotonic()
+        with self.lock:
+            self.claimed += 1
+            if self.claimed % PURGE_EVERY == 0:
+                self.claims = {k: v for k, v in self.claims.items() if v[2] > now}
+            existing = self.claims.get(key)
+            if existing is not None and existing[2] > now:
+                return existing[0], existing[1]
+            self.claims[key] = (booking_id, fingerprint, now + ttl)
+            return None
+
+    def put(self, key: str, fingerprint: str, booking_id: str, ttl: float) -> None:
+        with self.lock:
+            self.claims[key] = (booking_id, fingerprint, time.monotonic() + ttl)
+
+    def forget(self, key: str) -> None:
+        with self.lock:
+            self.claims.pop(key, None)
+
+
+class IdempotencyRecord(Base):
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String, primary_key=True, index=True)
+    booking_id = Column(String, nullable=False)
+    fingerprint = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class DatabaseIdempotencyStore:
+    """Same interface as IdempotencyStore; the primary key makes claims atomic across workers"""
+
+    def __init__(self):
+        self.claimed = 0
+
+    def claim(self, key: str, fingerprint: str, booking_id: str, ttl: float) -> Optional[Tuple[str, str]]:
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=ttl)
+        self.claimed += 1
+        db = SessionLocal()
+        try:
+            if self.claimed % PURGE_EVERY == 0:
+                db.query(IdempotencyRecord).filter(IdempotencyRecord.expires_at < now).delete()
+                db.commit()
+            db.add(IdempotencyRecord(key=key, booking_id=booking_id, fingerprint=fingerprint, expires_at=expires_at))
+            try:
+                db.commit()
+                return None
+            except IntegrityError:
+                db.rollback()
+            row = db.get(IdempotencyRecord, key)
+            if row is not None and row.expires_at > now:
+                return row.booking_id, row.fingerprint
+            # Expired (or purged meanwhile): take it over
+            db.merge(IdempotencyRecord(key=key, booking_id=booking_id, fingerprint=fingerprint, expires_at=expires_at))
+            db.commit()
+            return None
+        finally:
+            db.close()
+
+    def put(self, key: str, fingerprint: str, booking_id: str, ttl: float) -> None:
+        db = SessionLocal()
+        try:
+            db.merge(IdempotencyRecord(key=key, booking_id=booking_id, fingerprint=fingerprint,
+                                       expires_at=datetime.utcnow() + timedelta(seconds=ttl)))
+            db.commit()
+        finally:
+            db.close()
+
+    def forget(self, key: str) -> None:
+        db = SessionLocal()
+        try:
+            db.query(IdempotencyRecord).filter(IdempotencyRecord.key == key).delete()
+            db.commit()
+        finally:
+            db.close()
@@ -0,0 +1,82 @@
+"""
+Incremental parsing of a JSON object arriving in chunks (e.g. an LLM token
+stream). Each top-level key/value pair is returned as soon as its value is
+complete, without waiting for the closing brace.
+"""
+
+import json
+from typing import Any, List, Tuple
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+
+class IncrementalObjectParser:
+    """
+    feed(text) returns the (key, value) pairs completed by that chunk.
+    Anything before the first "{" (a ```json fence, prose) is ignored.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.started = False
+        self.finished = False
+
+    def _skip(self, chars: str) -> None:
+        while self.pos < len(self.buffer) and self.buffer[self.pos] in chars:
+            self.pos += 1
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        self.buffer += text
+        pairs: List[Tuple[str, Any]] = []
+        if not self.started:
+            start = self.buffer.find("{", self.pos)
+            if start < 0:
+                self.pos = len(self.buffer)
+                return pairs
+            self.pos = start + 1
+            self.started = True
+
+        while not self.finished:
+            pair = self._next_pair()
+            if pair is None:
+                break
+            pairs.append(pair)
+        return pairs
+
+    def _next_pair(self):
+        """Consume one complete key/value pair, or return None and wait for more text"""
+        start = self.pos
+        self._skip(_WHITESPACE + ",")
+        if self.pos >= len(self.buffer):
+            self.pos = start
+            return None
+        if self.buffer[self.pos] == "}":
+            self.finished = True
+            return None
+
+        try:
+            key, end = _decoder.raw_decode(self.buffer, self.pos)
+        except json.JSONDecodeError:
+            self.pos = start
+            return None
+        self.pos = end
+        self._skip(_WHITESPACE)
+        if self.pos >= len(self.buffer) or self.buffer[self.pos] != ":":
+            self.pos = start
+            return None
+        self.pos += 1
+        self._skip(_WHITESPACE)
+
+        try:
+            value, end = _decoder.raw_decode(self.buffer, self.pos)
+        except json.JSONDecodeError:
+            self.pos = start
+            return None
+        if not isinstance(value, (str, dict, list)) and (end >= len(self.buffer) or self.buffer[end] not in _WHITESPACE + ",}"):
+            # "12" may still become "123" or "12.5"; numbers and literals need a terminator
+            self.pos = start
+            return None
+        self.pos = end
+        return key, value
@@ -0,0 +1,191 @@
+"""
+Non-blocking structured logging.
+
+Callers only pay for putting a LogRecord on a queue: message formatting,
+PII redaction, JSON encoding and file/stream I/O all happen on a single
+QueueListener thread. Records carry the booking_id and step set with
+booking_context()/set_step(), and chatty loggers can be sampled:
+
+    LOG_SAMPLE_RATES="opentable_booking.probe=10"   # keep 1 in 10 below ERROR
+    LOG_FORMAT=text                                 # human-readable output
+"""
+
+import os
+import re
+import json
+import queue
+import atexit
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional, Dict
+
+booking_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("booking_id", default=None)
+step_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("step", default=None)
+
+_listener: Optional[QueueListener] = None
+_setup_lock = threading.Lock()
+
+
+@contextmanager
+def booking_context(booking_id: Optional[str] = None, step: Optional[str] = None):
+    """Tag every record logged inside the block with booking_id/step"""
+    booking_token = booking_id_var.set(booking_id) if booking_id is not None else None
+    step_token = step_var.set(step) if step is not None else None
+    try:
+        yield
+    finally:
+        if step_token is not None:
+            step_var.reset(step_token)
+        if booking_token is not None:
+            booking_id_var.reset(booking_token)
+
+
+def set_step(step: Optional[str]) -> None:
+    step_var.set(step)
+
+
+class ContextFilter(logging.Filter):
+    """Copies booking context onto the record in the emitting thread"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.booking_id = booking_id_var.get()
+        record.step = step_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps 1 in N records below ERROR for the configured logger prefixes"""
+
+    def __init__(self, rates: Dict[str, int]):
+        super().__init__()
+        self.rates = rates
+        self.counters: Dict[str, int] = {name: 0 for name in rates}
+        self.lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR:
+            return True
+        for name, rate in self.rates.items():
+            if record.name == name or record.name.startswith(name + "."):
+                with self.lock:
+                    self.counters[name] += 1
+                    return self.counters[name] % rate == 1 or rate <= 1
+        return True
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler.prepare() formats the message in the calling thread; skip
+    that so %-style arguments are only merged on the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+PHONE_PATTERN = re.compile(r"(?<!\d)(?:\+?1[\s.-]?)?\(?\d{3}\)?[\s.-]?\d{3}[\s.-]?(\d{4})(?!\d)")
+
+
+def redact(text: str) -> str:
+    """Mask email addresses and phone numbers, keeping the last 4 phone digits"""
+    text = EMAIL_PATTERN.sub("<email>", text)
+    return PHONE_PATTERN.sub(lambda m: f"<phone ...{m.group(1)}>", text)
+
+
+class RedactingJSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": redact(record.getMessage()),
+        }
+        booking_id = getattr(record, "booking_id", None)
+        if booking_id:
+            entry["booking_id"] = booking_id
+        step = getattr(record, "step", None)
+        if step:
+            entry["step"] = step
+        if record.exc_info:
+            entry["exc"] = redact(self.formatException(record.exc_info))
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class RedactingTextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = redact(super().format(record))
+        booking_id = getattr(record, "booking_id", None)
+        if booking_id:
+            step = getattr(record, "step", None)
+            line += f" [booking={booking_id}{' step=' + step if step else ''}]"
+        return line
+
+
+def parse_sample_rates(spec: str) -> Dict[str, int]:
+    rates = {}
+    for item in spec.split(","):
+        name, _, rate = item.partition("=")
+        if name.strip() and rate.strip():
+            rates[name.strip()] = max(1, int(rate))
+    return rates
+
+
+def setup_logging(
+    level: int = logging.INFO,
+    log_file: Optional[str] = "opentable_booking.log",
+    json_format: Optional[bool] = None,
+    sample_rates: Optional[Dict[str, int]] = None,
+) -> None:
+    """
+    Route all logging through a queue to a background listener. Safe to call
+    more than once; only the first call configures anything.
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+
+        if json_format is None:
+            json_format = os.getenv("LOG_FORMAT", "json") != "text"
+        if sample_rates is None:
+            sample_rates = parse_sample_rates(os.getenv("LOG_SAMPLE_RATES", "opentable_booking.probe=10"))
+
+        formatter = RedactingJSONFormatter() if json_format else RedactingTextFormatter()
+        handlers = [logging.StreamHandler()]
+        if log_file:
+            handlers.append(logging.FileHandler(log_file))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        queue_handler = DeferredQueueHandler(log_queue)
+        queue_handler.addFilter(ContextFilter())
+        if sample_rates:
+            queue_handler.addFilter(SamplingFilter(sample_rates))
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(queue_handler)
+        root.setLevel(level)
+
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
@@ -0,0 +1,59 @@
+"""
+Event loop lag monitor.
+
+A background task sleeps for a fixed interval and records how late it wakes
+up. Anything that blocks the loop (synchronous OpenAI calls, blocking
+future.result() waits, heavy JSON work) shows up directly as lag.
+"""
+
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float = 0.05, max_samples: int = 20000):
+        self.interval = interval
+        self.max_samples = max_samples
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def reset(self) -> None:
+        self.samples = []
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            if len(self.samples) >= self.max_samples:
+                # Keep the most recent window
+                self.samples = self.samples[self.max_samples // 2:]
+            self.samples.append(lag)
+
+    def stats(self) -> Dict[str, float]:
+        """Lag statistics in milliseconds"""
+        if not self.samples:
+            return {"samples": 0, "mean_ms": 0.0, "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        ordered = sorted(self.samples)
+        count = len(ordered)
+        return {
+            "samples": count,
+            "mean_ms": round(sum(ordered) / count * 1000, 3),
+            "p50_ms": round(ordered[int(0.50 * (count - 1))] * 1000, 3),
+            "p99_ms": round(ordered[int(0.99 * (count - 1))] * 1000, 3),
+            "max_ms": round(ordered[-1] * 1000, 3),
+        }
@@ -1,21 +1,43 @@
 import os
+import re
 import json
+import time
+import logging
+import threading
+from typing import AsyncIterator, Tuple, Any, Optional, Dict, List, Callable
 from dotenv import load_dotenv
-import openai
+from pydantic import ValidationError
+
+from json_stream import IncrementalObjectParser
+from schemas import ParsedReservation, REQUIRED_FIELDS
 
 # Load .env file
 load_dotenv()
 
-# Get API key from environment
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    raise ValueError("OPENAI_API_KEY not found. Make sure your .env file is in the project directory.")
+logger = logging.getLogger(__name__)
 
-# Set the API key for the OpenAI library
-openai.api_key = api_key
+_openai = None
 
-def parse_reservation_request(prompt: str) -> dict:
-    system_prompt = """
+def get_openai():
+    """
+    Import and configure the OpenAI library on first use, so importing this
+    module stays cheap and doesn't fail when the key is missing
+    """
+    global _openai
+    if _openai is None:
+        # Get API key from environment
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY not found. Make sure your .env file is in the project directory.")
+
+        import openai
+
+        # Set the API key for the OpenAI library
+        openai.api_key = api_key
+        _openai = openai
+    return _openai
+
+SYSTEM_PROMPT = """
     You are a helpful assistant that extracts reservation information from natural language.
     Return a JSON object with the following keys: restaurant, date (set year to 2025) (change number format to month,day,year as in "June,5,2025"), time, party_size, and location (if available), phone if available, email if available. use the restaurant_url to find the restaurant on opentable.com using the restaurant name and location. First name and last name if left blank can be auto filled with the user's account info.
     Example:
@@ -33,20 +55,199 @@ def parse_reservation_request(prompt: str) -> dict:
     }
     """
 
-    response = openai.ChatCompletion.create(
-        model="gpt-4",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.2
+# Short, schema-first prompt for the fast tier
+COMPACT_PROMPT = """Extract the reservation as one JSON object with exactly these keys:
+restaurant (string), date ("Month,D,YYYY", e.g. "June,5,2025"; year 2025 if not given),
+time ("HH:MM", 24-hour), party_size (integer), location (string), phone (digits only), email (string).
+Use null for anything not stated. Reply with the JSON object only."""
+
+DATE_FORMAT = re.compile(r"^[A-Z][a-z]+,\d{1,2},\d{4}$")
+TIME_FORMAT = re.compile(r"^\d{1,2}:\d{2}$")
+
+def _messages(prompt: str, system_prompt: str = SYSTEM_PROMPT) -> list:
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": prompt}
+    ]
+
+class ModelTier:
+    def __init__(self, name: str, model: str, system_prompt: str, json_mode: bool = False):
+        self.name = name
+        self.model = model
+        self.system_prompt = system_prompt
+        self.json_mode = json_mode
+
+class TierStats:
+    def __init__(self):
+        self.calls = 0
+        self.accepted = 0
+        self.rejections: Dict[str, int] = {}
+        self.latencies: List[float] = []
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        ordered = sorted(self.latencies)
+        count = len(ordered)
+        return {
+            "calls": self.calls,
+            "accepted": self.accepted,
+            "rejections": dict(self.rejections),
+            "latency_p50_s": round(ordered[int(0.50 * (count - 1))], 3) if count else None,
+            "latency_p95_s": round(ordered[int(0.95 * (count - 1))], 3) if count else None,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+        }
+
+def build_tiers() -> List[ModelTier]:
+    """
+    PARSE_FAST_MODEL (empty to disable the fast tier) is tried first with the
+    compact prompt; PARSE_FULL_MODEL with the original prompt is the fallback
+    """
+    tiers = []
+    fast_model = os.getenv("PARSE_FAST_MODEL", "gpt-3.5-turbo-0125")
+    if fast_model:
+        tiers.append(ModelTier("fast", fast_model, COMPACT_PROMPT, json_mode=True))
+    tiers.append(ModelTier("full", os.getenv("PARSE_FULL_MODEL", "gpt-4"), SYSTEM_PROMPT))
+    return tiers
+
+_tiers = build_tiers()
+_tier_stats: Dict[str, TierStats] = {tier.name: TierStats() for tier in _tiers}
+_stats_lock = threading.Lock()
+_parses = 0
+_escalations = 0
+
+def validate_parse(content: str) -> Tuple[Optional[dict], Optional[str]]:
+    """
+    Returns (data, None) if the completion is a usable reservation, else
+    (None, reason) with reason one of invalid_json, schema, missing_fields, format
+    """
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        return None, "invalid_json"
+    if not isinstance(data, dict):
+        return None, "invalid_json"
+    try:
+        ParsedReservation(**data)
+    except ValidationError:
+        return None, "schema"
+    if any(data.get(field) in (None, "") for field in REQUIRED_FIELDS):
+        return None, "missing_fields"
+    if not DATE_FORMAT.match(str(data["date"])) or not TIME_FORMAT.match(str(data["time"])):
+        return None, "format"
+    # The compact prompt asks for explicit nulls; drop them like absent keys
+    return {key: value for key, value in data.items() if value is not None}, None
+
+# (model, messages, **kwargs) -> (completion text, usage dict with prompt_tokens/completion_tokens)
+CompletionBackend = Callable[..., Tuple[str, Dict[str, int]]]
+
+def openai_completion(model: str, messages: list, **kwargs) -> Tuple[str, Dict[str, int]]:
+    response = get_openai().ChatCompletion.create(model=model, messages=messages, **kwargs)
+    return response.choices[0].message.content, dict(response.get("usage") or {})
+
+_completion_backend: CompletionBackend = openai_completion
+
+def set_completion_backend(backend: Optional[CompletionBackend]) -> None:
+    """Replace the OpenAI call (None restores it), e.g. with a stub for benchmarks/parse_bench.py"""
+    global _completion_backend
+    _completion_backend = backend or openai_completion
+
+def reset_parse_stats() -> None:
+    global _parses, _escalations
+    with _stats_lock:
+        for name in _tier_stats:
+            _tier_stats[name] = TierStats()
+        _parses = 0
+        _escalations = 0
+
+def _complete(tier: ModelTier, prompt: str) -> str:
+    kwargs = {}
+    if tier.json_mode:
+        kwargs["response_format"] = {"type": "json_object"}
+    start = time.perf_counter()
+    content, usage = _completion_backend(
+        model=tier.model,
+        messages=_messages(prompt, tier.system_prompt),
+        temperature=0.2 if tier.name == "full" else 0,
+        **kwargs
     )
+    with _stats_lock:
+        stats = _tier_stats[tier.name]
+        stats.calls += 1
+        stats.latencies.append(time.perf_counter() - start)
+        del stats.latencies[:-1000]
+        stats.prompt_tokens += usage.get("prompt_tokens", 0)
+        stats.completion_tokens += usage.get("completion_tokens", 0)
+    return content.strip()
 
-    content = response.choices[0].message.content.strip()
+def parse_reservation_request(prompt: str) -> dict:
+    """
+    Parse with the cheapest tier whose output validates, escalating to the
+    next tier on invalid JSON, schema errors or missing required fields
+    """
+    global _parses, _escalations
+    with _stats_lock:
+        _parses += 1
 
+    content = ""
+    for index, tier in enumerate(_tiers):
+        try:
+            content = _complete(tier, prompt)
+        except Exception as e:
+            if index == len(_tiers) - 1:
+                raise
+            logger.warning("%s request failed, escalating: %s", tier.model, e)
+            reason = "error"
+        else:
+            data, reason = validate_parse(content)
+            if data is not None:
+                with _stats_lock:
+                    _tier_stats[tier.name].accepted += 1
+                return data
+        with _stats_lock:
+            rejections = _tier_stats[tier.name].rejections
+            rejections[reason] = rejections.get(reason, 0) + 1
+            if index < len(_tiers) - 1:
+                _escalations += 1
+
+    # The largest model didn't validate either; keep whatever JSON it gave,
+    # and let the API report the missing fields
     try:
         return json.loads(content)
     except json.JSONDecodeError as e:
-        print("⚠️ Failed to parse response as JSON:", e)
-        print("Raw response content:\n", content)
-        return {}
\ No newline at end of file
+        # Not the raw content: it holds the user's phone number and email
+        logger.warning("Failed to parse response as JSON: %s", e)
+        return {}
+
+def parse_stats() -> Dict[str, Any]:
+    """Per-tier latency, token usage and rejection reasons, and the escalation rate"""
+    with _stats_lock:
+        return {
+            "tiers": [
+                {"name": tier.name, "model": tier.model, **_tier_stats[tier.name].to_dict()}
+                for tier in _tiers
+            ],
+            "parses": _parses,
+            "escalations": _escalations,
+            "escalation_rate": round(_escalations / _parses, 3) if _parses else 0.0,
+        }
+
+async def stream_reservation_fields(prompt: str) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Stream the completion and yield (field, value) as soon as each value in
+    the JSON object is complete, instead of waiting for the whole response
+    """
+    parser = IncrementalObjectParser()
+    response = await get_openai().ChatCompletion.acreate(
+        model=_tiers[-1].model,
+        messages=_messages(prompt),
+        temperature=0.2,
+        stream=True
+    )
+    async for chunk in response:
+        text = chunk.choices[0].delta.get("content")
+        if not text:
+            continue
+        for field, value in parser.feed(text):
+            yield field, value
@@ -0,0 +1,206 @@
+"""
+Production launcher: several API worker processes sharing one socket.
+
+The master process imports the app once (so module-level setup is shared
+copy-on-write), creates the database tables, binds the port and forks the
+workers, each running its own uvicorn server and event loop. Crashed
+workers are replaced.
+
+On SIGTERM (or Ctrl+C) the master forwards the signal to every worker. A
+worker refuses new bookings with 503 + Retry-After (still answering status
+polls), gives in-flight bookings DRAIN_TIMEOUT seconds to finish and marks
+the rest failed (their steps are checkpointed, so a retry resumes them).
+Only then does uvicorn stop accepting connections and cancel what is left,
+and the worker closes its browsers. Workers still alive shortly after the
+deadline are killed.
+
+Booking sessions, browsers held for verification and scheduled drops live
+in the worker that started them. Booking status is shared through the
+database so /status works on any worker, and each worker listens on a
+private Unix socket so verify, retry and cancel requests landing elsewhere
+are forwarded to the owner (see worker_proxy.py).
+
+    python production.py --workers 4 --port 8000
+    python start_app.py --production
+
+    WEB_CONCURRENCY=<cpu count>       worker processes
+    DRAIN_TIMEOUT=120                 seconds for in-flight bookings on shutdown
+
+Requires fork (Linux/macOS).
+"""
+
+import os
+import sys
+import time
+import signal
+import socket
+import secrets
+import logging
+import argparse
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+# Time after the drain deadline for browsers and logs to close
+KILL_GRACE_SECONDS = 15
+
+# After the drain, how long uvicorn waits for open requests before cancelling them
+SHUTDOWN_GRACE_SECONDS = 5
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(sock: socket.socket, drain_timeout: float) -> None:
+    """Serve the preloaded app on the shared socket until told to drain"""
+    import uvicorn
+    import app as app_module
+    from worker_proxy import worker_socket_path
+
+    class DrainingServer(uvicorn.Server):
+        def handle_exit(self, sig, frame):
+            # Refuse new bookings before uvicorn stops the listener
+            app_module.begin_drain()
+            super().handle_exit(sig, frame)
+
+        async def shutdown(self, sockets=None):
+            # Bookings run as background tasks of their /book request, which
+            # uvicorn cancels once timeout_graceful_shutdown is up; let them
+            # finish (or be marked interrupted) before that clock starts
+            await app_module.finish_drain()
+            await super().shutdown(sockets=sockets)
+
+    # Other workers forward requests for this worker's bookings here
+    address = worker_socket_path(os.getpid())
+    if os.path.exists(address):
+        os.unlink(address)
+    private = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    private.bind(address)
+    private.listen(128)
+    app_module.worker_address = address
+
+    config = uvicorn.Config(
+        app_module.app,
+        log_level="info",
+        timeout_graceful_shutdown=SHUTDOWN_GRACE_SECONDS,
+    )
+    try:
+        DrainingServer(config).run(sockets=[sock, private])
+    finally:
+        private.close()
+        if os.path.exists(address):
+            os.unlink(address)
+
+
+class Master:
+    def __init__(self, sock: socket.socket, workers: int, drain_timeout: float):
+        self.sock = sock
+        self.workers = workers
+        self.drain_timeout = drain_timeout
+        self.children: Dict[int, int] = {}  # pid -> worker index
+        self.stopping = False
+
+    def spawn(self, index: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                run_worker(self.sock, self.drain_timeout)
+            except Exception:
+                logger.exception("Worker %d crashed", index)
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = index
+        logger.info("Started worker %d (pid %d)", index, pid)
+
+    def stop(self, signum, frame) -> None:
+        if self.stopping:
+            return
+        self.stopping = True
+        logger.info("Received %s, draining %d workers", signal.Signals(signum).name, len(self.children))
+        for pid in self.children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for index in range(self.workers):
+            self.spawn(index)
+
+        while self.children and not self.stopping:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            index = self.children.pop(pid, None)
+            if index is not None and not self.stopping:
+                logger.warning("Worker %d (pid %d) exited with %d, replacing it",
+                               index, pid, os.waitstatus_to_exitcode(status))
+                self.spawn(index)
+
+        self.reap(time.monotonic() + self.drain_timeout + KILL_GRACE_SECONDS)
+        self.sock.close()
+
+    def reap(self, deadline: float) -> None:
+        """Wait for draining workers, killing those still alive at the deadline"""
+        while self.children and time.monotonic() < deadline:
+            for pid in list(self.children):
+                done, _ = os.waitpid(pid, os.WNOHANG)
+                if done:
+                    self.children.pop(pid)
+            time.sleep(0.2)
+        for pid in self.children:
+            logger.error("Worker pid %d did not drain in time, killing it", pid)
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+
+
+def serve(host: str, port: int, workers: int, drain_timeout: float) -> None:
+    # Read by app.py at import: several workers share booking status via the DB
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    os.environ["DRAIN_TIMEOUT"] = str(drain_timeout)
+    # Proves a request was forwarded by a sibling worker (see worker_proxy.py)
+    os.environ["WORKER_FORWARD_SECRET"] = secrets.token_hex(16)
+
+    import app  # preload: imported once, inherited by every worker
+    from database import init_db, engine
+
+    init_db()
+    # Workers must not share the master's pooled database connections
+    engine.dispose()
+
+    sock = bind_socket(host, port)
+    print(f"🚀 Serving on http://{host}:{port} with {workers} workers (pid {os.getpid()})")
+    Master(sock, workers, drain_timeout).run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the API with several worker processes")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+                        help="Worker processes (default: WEB_CONCURRENCY or CPU count)")
+    parser.add_argument("--drain-timeout", type=float, default=float(os.getenv("DRAIN_TIMEOUT", "120")),
+                        help="Seconds in-flight bookings get to finish on shutdown (default: 120)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [master] %(levelname)s %(message)s")
+    if not hasattr(os, "fork"):
+        sys.exit("production.py needs fork(); use start_app.py on this platform")
+    serve(args.host, args.port, max(1, args.workers), args.drain_timeout)
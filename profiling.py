@@ -0,0 +1,213 @@
+"""
+On-demand profiling for single requests and bookings.
+
+An admin adds X-Profile: 1 (or ?profile=1) plus X-Admin-Token (or
+?admin_token=) to any request. That request is profiled with cProfile on the
+event loop thread, and a sampling profiler collects stacks from the loop
+thread and from any worker thread (browser session, to_thread) that runs
+work on the request's behalf. Profiling a /book or /booking/{id}/retry
+request also profiles the background booking it starts, sampling only,
+because the booking runs for minutes alongside other requests.
+
+cProfile on the loop thread also sees other coroutines that ran while the
+request was awaiting; the sampled worker-thread stacks are exact.
+
+Profiles are kept in memory (the newest PROFILE_MAX_STORED) and served by
+the /admin/profiles endpoints as pstats files and flamegraph-ready collapsed
+stacks. Without the flag a request costs one header/query lookup.
+
+    ADMIN_TOKEN=...                    required; profiling is off without it
+    PROFILE_MAX_STORED=50
+    PROFILE_SAMPLE_INTERVAL_MS=5
+"""
+
+import os
+import sys
+import hmac
+import time
+import uuid
+import marshal
+import cProfile
+import logging
+import threading
+import contextvars
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Callable
+
+logger = logging.getLogger(__name__)
+
+current_profile: contextvars.ContextVar[Optional["Profile"]] = contextvars.ContextVar("current_profile", default=None)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Profile:
+    def __init__(self, profile_id: str, kind: str, label: str, use_cprofile: bool):
+        self.profile_id = profile_id
+        self.kind = kind
+        self.label = label
+        self.started_at = datetime.now()
+        self.started = time.perf_counter()
+        self.duration_s: Optional[float] = None
+        self.cprofile = cProfile.Profile() if use_cprofile else None
+        self.threads: Dict[int, str] = {}
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.pstats: Optional[bytes] = None
+        self.lock = threading.Lock()
+
+    def attach_thread(self, name: str) -> int:
+        ident = threading.get_ident()
+        with self.lock:
+            self.threads[ident] = name
+        return ident
+
+    def detach_thread(self, ident: int) -> None:
+        with self.lock:
+            self.threads.pop(ident, None)
+
+    def sample(self, frames: Dict[int, Any]) -> None:
+        with self.lock:
+            threads = list(self.threads.items())
+        for ident, name in threads:
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            stack: List[str] = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(name)
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def finish(self) -> None:
+        self.duration_s = time.perf_counter() - self.started
+        if self.cprofile is not None:
+            self.cprofile.disable()
+            self.cprofile.create_stats()
+            # Same layout pstats.Stats.dump_stats writes
+            self.pstats = marshal.dumps(self.cprofile.stats)
+            self.cprofile = None
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "profile_id": self.profile_id,
+            "kind": self.kind,
+            "label": self.label,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "duration_s": round(self.duration_s, 3) if self.duration_s is not None else None,
+            "samples": self.samples,
+            "has_pstats": self.pstats is not None,
+        }
+
+
+class Profiler:
+    def __init__(self, admin_token: Optional[str], max_stored: int = 50, interval: float = 0.005):
+        self.admin_token = admin_token
+        self.max_stored = max_stored
+        self.interval = interval
+        self.active: Dict[str, Profile] = {}
+        self.stored: "OrderedDict[str, Profile]" = OrderedDict()
+        self.lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.admin_token)
+
+    def authorized(self, token: Optional[str]) -> bool:
+        return self.enabled and token is not None and hmac.compare_digest(token, self.admin_token)
+
+    def _sample_forever(self) -> None:
+        while True:
+            with self.lock:
+                profiles = list(self.active.values())
+                if not profiles:
+                    self._sampler = None
+                    return
+            frames = sys._current_frames()
+            for profile in profiles:
+                profile.sample(frames)
+            time.sleep(self.interval)
+
+    def begin(self, kind: str, label: str, use_cprofile: bool = False, sample_current_thread: bool = False,
+              profile_id: Optional[str] = None) -> Profile:
+        profile = Profile(profile_id or uuid.uuid4().hex[:12], kind, label, use_cprofile)
+        if profile.cprofile is not None:
+            try:
+                profile.cprofile.enable()
+            except ValueError:
+                # Another cProfile is already running on this thread
+                profile.cprofile = None
+        if sample_current_thread:
+            profile.attach_thread(threading.current_thread().name)
+        with self.lock:
+            self.active[profile.profile_id] = profile
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample_forever, name="profile-sampler", daemon=True)
+                self._sampler.start()
+        return profile
+
+    def end(self, profile: Profile) -> None:
+        profile.finish()
+        with self.lock:
+            self.active.pop(profile.profile_id, None)
+            self.stored[profile.profile_id] = profile
+            while len(self.stored) > self.max_stored:
+                self.stored.popitem(last=False)
+        logger.info("Stored %s profile %s (%.2fs, %d samples)",
+                    profile.kind, profile.profile_id, profile.duration_s, profile.samples)
+
+    @contextmanager
+    def profiling(self, kind: str, label: str, use_cprofile: bool = False, sample_current_thread: bool = False,
+                  profile_id: Optional[str] = None):
+        """Profile the block; worker threads started inside it attach themselves"""
+        profile = self.begin(kind, label, use_cprofile, sample_current_thread, profile_id)
+        token = current_profile.set(profile)
+        try:
+            yield profile
+        finally:
+            current_profile.reset(token)
+            self.end(profile)
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        return self.stored.get(profile_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [profile.to_dict() for profile in reversed(self.stored.values())]
+
+
+@contextmanager
+def attached():
+    """Have the active profile (if any) sample the current worker thread"""
+    profile = current_profile.get()
+    if profile is None:
+        yield
+        return
+    ident = profile.attach_thread(threading.current_thread().name)
+    try:
+        yield
+    finally:
+        profile.detach_thread(ident)
+
+
+def attached_call(fn: Callable[..., Any], *args: Any) -> Any:
+    """fn(*args) with the current thread attached to the active profile; for asyncio.to_thread"""
+    with attached():
+        return fn(*args)
+
+
+profiler = Profiler(
+    admin_token=os.getenv("ADMIN_TOKEN"),
+    max_stored=int(os.getenv("PROFILE_MAX_STORED", "50")),
+    interval=float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5")) / 1000,
+)
@@ -0,0 +1,315 @@
+"""
+Booking provider interface and registry.
+
+process_booking dispatches through a ProviderRegistry instead of calling
+book_reservation directly. Three dispatch modes are supported:
+
+    route   try providers that list the restaurant, best observed stats first
+    race    probe availability on every listing provider that can check it,
+            book on the first that confirms the requested slot, and fall back
+            to providers that can't check (route order) if none does
+    <name>  book on that provider only
+
+OpenTable has no availability probe (only a full browser flow can tell), so
+with Resy and OpenTable registered, race means "probe Resy, book there if
+the slot is open, otherwise fall back to OpenTable".
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Callable, Tuple
+
+from browser_sessions import SessionManager
+from profiling import attached_call
+from circuit_breaker import opentable_breakers
+from book_resy import get_resy_client, book_resy_async, to_resy_day, match_slot, ResyError
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderStats:
+    """
+    Exponentially weighted latency and success rate for a provider.
+    New providers start with an optimistic prior so they get tried.
+    """
+
+    def __init__(self, alpha: float = 0.2, prior_latency: float = 10.0, prior_success: float = 0.8):
+        self.alpha = alpha
+        self.latency = prior_latency
+        self.success_rate = prior_success
+        self.attempts = 0
+        self.successes = 0
+        self.availability_latency: Optional[float] = None
+
+    def record_booking(self, latency: float, success: bool) -> None:
+        self.attempts += 1
+        self.successes += int(success)
+        self.latency += self.alpha * (latency - self.latency)
+        self.success_rate += self.alpha * ((1.0 if success else 0.0) - self.success_rate)
+
+    def record_availability(self, latency: float) -> None:
+        if self.availability_latency is None:
+            self.availability_latency = latency
+        else:
+            self.availability_latency += self.alpha * (latency - self.availability_latency)
+
+    def score(self) -> float:
+        """Higher is better: expected successes per second of booking time"""
+        return self.success_rate / max(self.latency, 0.05)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "attempts": self.attempts,
+            "successes": self.successes,
+            "success_rate": round(self.success_rate, 3),
+            "latency_s": round(self.latency, 3),
+            "availability_latency_s": round(self.availability_latency, 3) if self.availability_latency is not None else None,
+            "score": round(self.score(), 4),
+        }
+
+
+class BookingProvider:
+    """
+    Base class for booking platforms. Subclasses return the same result
+    dict shape as book_reservation ({"success": ..., "message"/"error": ...}).
+    """
+
+    name = "base"
+
+    async def lists(self, data: Dict[str, Any]) -> bool:
+        """Whether this platform lists the restaurant"""
+        return True
+
+    async def check_availability(self, data: Dict[str, Any]) -> Optional[bool]:
+        """
+        True if the requested slot is open, False if not,
+        None if the provider can't tell without booking
+        """
+        return None
+
+    async def book(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class OpenTableProvider(BookingProvider):
+    """
+    Browser-driven OpenTable booking. The synchronous Playwright flow runs in
+    a worker thread so it never blocks the event loop. With a SessionManager,
+    each booking gets its own browser session, which is held afterwards if
+    OpenTable is waiting for a verification code.
+    """
+
+    name = "opentable"
+
+    def __init__(
+        self,
+        book_fn: Callable[[Dict[str, Any]], Dict[str, Any]],
+        session_book_fn: Optional[Callable[[Any, Dict[str, Any]], Dict[str, Any]]] = None,
+        sessions: Optional[SessionManager] = None,
+    ):
+        self.book_fn = book_fn
+        self.session_book_fn = session_book_fn
+        self.sessions = sessions
+
+    async def book(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        # While a step keeps failing, fail before launching a browser for it
+        breaker = opentable_breakers.blocking("step:")
+        if breaker is not None:
+            return {
+                "success": False,
+                "error": f"OpenTable automation is failing ({breaker.name}); not attempted, retry in {breaker.retry_after():.0f}s",
+                "circuit_open": True,
+                "retry_after": round(breaker.retry_after(), 1),
+            }
+
+        booking_id = data.get("booking_id")
+        if self.sessions is None or self.session_book_fn is None or not booking_id:
+            return await asyncio.to_thread(attached_call, self.book_fn, data)
+
+        session = self.sessions.create(booking_id)
+        held = False
+        try:
+            result = await session.run(self.session_book_fn, data)
+            if result.get("success") and result.get("verification_pending"):
+                self.sessions.hold(booking_id, session)
+                held = True
+            return result
+        finally:
+            if not held:
+                await session.close()
+
+
+class ResyProvider(BookingProvider):
+    name = "resy"
+
+    def __init__(self, venue_ttl: float = 3600.0, miss_ttl: float = 60.0, max_venues: int = 512):
+        # (restaurant, location) -> (venue hit or None, expires), so race
+        # probes and the booking itself share one venue lookup. Misses expire
+        # quickly so a venue added to Resy (or a bad lookup) isn't routed
+        # away from Resy for long.
+        self._venues: "OrderedDict[Tuple[str, str], Tuple[Optional[Dict[str, Any]], float]]" = OrderedDict()
+        self.venue_ttl = venue_ttl
+        self.miss_ttl = miss_ttl
+        self.max_venues = max_venues
+
+    async def _venue(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        key = (data["restaurant"].strip().lower(), (data.get("location") or "").strip().lower())
+        cached = self._venues.get(key)
+        if cached is not None and cached[1] > time.monotonic():
+            self._venues.move_to_end(key)
+            return cached[0]
+        venue = await get_resy_client().find_venue(data["restaurant"], data.get("location"))
+        ttl = self.venue_ttl if venue is not None else self.miss_ttl
+        self._venues[key] = (venue, time.monotonic() + ttl)
+        self._venues.move_to_end(key)
+        while len(self._venues) > self.max_venues:
+            self._venues.popitem(last=False)
+        return venue
+
+    async def lists(self, data: Dict[str, Any]) -> bool:
+        try:
+            return await self._venue(data) is not None
+        except Exception as e:
+            logger.warning(f"Resy venue lookup failed: {str(e)}")
+            return False
+
+    async def check_availability(self, data: Dict[str, Any]) -> Optional[bool]:
+        venue = await self._venue(data)
+        if venue is None:
+            return False
+        geo = venue.get("_geoloc", {})
+        try:
+            slots = await get_resy_client().find_slots(
+                venue["id"]["resy"], to_resy_day(data["date"]), int(data["party_size"]),
+                geo.get("lat", 0), geo.get("lng", 0)
+            )
+        except ResyError as e:
+            logger.warning(f"Resy availability check failed: {str(e)}")
+            return None
+        return match_slot(slots, data["time"]) is not None
+
+    async def book(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        return await book_resy_async(data)
+
+
+class ProviderRegistry:
+    def __init__(self, default_mode: str = "route"):
+        self.providers: Dict[str, BookingProvider] = {}
+        self.stats: Dict[str, ProviderStats] = {}
+        self.default_mode = default_mode
+
+    def register(self, provider: BookingProvider) -> None:
+        self.providers[provider.name] = provider
+        self.stats.setdefault(provider.name, ProviderStats())
+
+    def modes(self) -> List[str]:
+        return ["route", "race"] + list(self.providers)
+
+    def ranked(self, names: Optional[List[str]] = None) -> List[BookingProvider]:
+        """Providers ordered by observed score, best first"""
+        names = names if names is not None else list(self.providers)
+        return sorted((self.providers[n] for n in names), key=lambda p: self.stats[p.name].score(), reverse=True)
+
+    async def _book_on(self, provider: BookingProvider, data: Dict[str, Any]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            result = await provider.book(data)
+        except Exception as e:
+            logger.error(f"Provider {provider.name} raised during booking: {str(e)}")
+            result = {"success": False, "error": str(e)}
+        self.stats[provider.name].record_booking(time.perf_counter() - start, bool(result.get("success")))
+        result.setdefault("provider", provider.name)
+        return result
+
+    async def _listing_providers(self, data: Dict[str, Any]) -> List[BookingProvider]:
+        providers = list(self.providers.values())
+        listed = await asyncio.gather(*(p.lists(data) for p in providers), return_exceptions=True)
+        return [p for p, ok in zip(providers, listed) if ok is True]
+
+    async def _route(self, data: Dict[str, Any], candidates: List[BookingProvider]) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"success": False, "error": "No provider lists this restaurant"}
+        for provider in self.ranked([p.name for p in candidates]):
+            logger.info(f"Booking via {provider.name}")
+            result = await self._book_on(provider, data)
+            if result.get("success"):
+                break
+        return result
+
+    async def _probe(self, provider: BookingProvider, data: Dict[str, Any]) -> Tuple[BookingProvider, Optional[bool]]:
+        start = time.perf_counter()
+        try:
+            available = await provider.check_availability(data)
+        except Exception as e:
+            logger.warning(f"Availability probe on {provider.name} failed: {str(e)}")
+            available = None
+        self.stats[provider.name].record_availability(time.perf_counter() - start)
+        return provider, available
+
+    async def _race(self, data: Dict[str, Any], candidates: List[BookingProvider]) -> Dict[str, Any]:
+        probes = [asyncio.ensure_future(self._probe(p, data)) for p in candidates]
+        winner: Optional[BookingProvider] = None
+        unknown: List[BookingProvider] = []
+        try:
+            for next_done in asyncio.as_completed(probes):
+                provider, available = await next_done
+                if available:
+                    winner = provider
+                    break
+                if available is None:
+                    unknown.append(provider)
+        finally:
+            for probe in probes:
+                if not probe.done():
+                    probe.cancel()
+
+        if winner is not None:
+            logger.info(f"Race won by {winner.name}")
+            result = await self._book_on(winner, data)
+            if result.get("success"):
+                return result
+            # The confirmed slot was lost between probe and book, or booking failed
+            unknown = [p for p in unknown if p is not winner]
+            if not unknown:
+                return result
+
+        if not unknown:
+            return {"success": False, "error": "Requested slot is not available on any provider"}
+        # Nobody confirmed the slot; fall back to providers that can't check
+        return await self._route(data, unknown)
+
+    async def book(self, data: Dict[str, Any], mode: Optional[str] = None) -> Dict[str, Any]:
+        mode = mode or self.default_mode
+        if mode in self.providers:
+            return await self._book_on(self.providers[mode], data)
+
+        candidates = await self._listing_providers(data)
+        if not candidates:
+            return {"success": False, "error": f"Could not find restaurant '{data.get('restaurant')}' on any provider"}
+        if mode == "race":
+            return await self._race(data, candidates)
+        return await self._route(data, candidates)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "default_mode": self.default_mode,
+            "providers": {name: self.stats[name].to_dict() for name in self.providers},
+        }
+
+
+def build_default_registry(
+    book_fn: Callable[[Dict[str, Any]], Dict[str, Any]],
+    session_book_fn: Optional[Callable[[Any, Dict[str, Any]], Dict[str, Any]]] = None,
+    sessions: Optional[SessionManager] = None,
+) -> ProviderRegistry:
+    """
+    OpenTable is always registered. Resy is registered when credentials or a
+    stand-in base URL are configured.
+    """
+    registry = ProviderRegistry(default_mode=os.getenv("BOOKING_PROVIDER_MODE", "route"))
+    registry.register(OpenTableProvider(book_fn, session_book_fn, sessions))
+    if os.getenv("RESY_AUTH_TOKEN") or os.getenv("RESY_API_BASE"):
+        registry.register(ResyProvider())
+    return registry
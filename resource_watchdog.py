@@ -0,0 +1,229 @@
+"""
+Chromium memory watchdog and per-booking resource accounting.
+
+Every locally launched booker registers the root of its browser process tree
+(the Playwright driver, whose children are Chromium's processes), found as
+the new child of this process running "run-driver". A sampler thread polls
+RSS and CPU of each tree, and each booking records the tree's RSS at
+start/end, its peak, and the CPU seconds it consumed.
+
+Long-lived bookers are checked against the limits: the global booker
+between bookings and availability pollers before each poll. Over the RSS
+limit the browser context is recycled first (that drops the renderer
+processes); if RSS is still over, or the booker has served too many
+bookings, the whole browser is restarted. Per-booking sessions are closed
+when their booking ends, so they are only accounted, not recycled.
+
+    BROWSER_MAX_RSS_MB=1500             recycle above this tree RSS
+    BROWSER_MAX_BOOKINGS=50             restart after this many bookings
+    BROWSER_WATCHDOG_INTERVAL=2         seconds between samples
+
+psutil is optional; without it the watchdog is disabled.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from typing import Optional, Dict, Any, List, Set
+
+try:
+    import psutil
+except ImportError:  # accounting is optional
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# In the Playwright driver's command line (node .../cli.js run-driver)
+DRIVER_MARKER = "run-driver"
+
+
+def child_pids() -> Set[int]:
+    """PIDs of this process's direct children"""
+    if psutil is None:
+        return set()
+    try:
+        return {proc.pid for proc in psutil.Process().children()}
+    except psutil.Error:
+        return set()
+
+
+def find_driver_pid(before: Set[int]) -> Optional[int]:
+    """The Playwright driver started since child_pids() returned `before`"""
+    if psutil is None:
+        return None
+    try:
+        children = psutil.Process().children()
+    except psutil.Error:
+        return None
+    for proc in children:
+        if proc.pid in before:
+            continue
+        try:
+            if any(DRIVER_MARKER in part for part in proc.cmdline()):
+                return proc.pid
+        except psutil.Error:
+            continue
+    return None
+
+
+class TrackedBrowser:
+    def __init__(self, root_pid: int):
+        self.root_pid = root_pid
+        self.bookings_served = 0
+        self.processes: Dict[int, Any] = {}
+        self.rss_mb = 0.0
+        self.cpu_seconds = 0.0
+        self.current: Optional[Dict[str, Any]] = None
+        # Sampled from both the watchdog thread and the booking's thread
+        self.lock = threading.Lock()
+
+    def sample(self) -> None:
+        """Refresh RSS and cumulative CPU time of the whole process tree"""
+        with self.lock:
+            self._sample()
+
+    def _sample(self) -> None:
+        try:
+            root = self.processes.get(self.root_pid) or psutil.Process(self.root_pid)
+            tree = [root] + root.children(recursive=True)
+        except psutil.Error:
+            return
+        # Reuse Process objects so exited children drop out and PIDs aren't re-resolved
+        self.processes = {proc.pid: self.processes.get(proc.pid, proc) for proc in tree}
+        rss = 0
+        cpu = 0.0
+        for proc in self.processes.values():
+            try:
+                rss += proc.memory_info().rss
+                times = proc.cpu_times()
+                cpu += times.user + times.system
+            except psutil.Error:
+                continue
+        self.rss_mb = rss / MB
+        self.cpu_seconds = cpu
+        if self.current is not None:
+            self.current["rss_peak_mb"] = max(self.current["rss_peak_mb"], self.rss_mb)
+
+
+class BrowserWatchdog:
+    def __init__(self, max_rss_mb: float = 1500.0, max_bookings: int = 50, interval: float = 2.0, history: int = 200):
+        self.enabled = psutil is not None
+        self.max_rss_mb = max_rss_mb
+        self.max_bookings = max_bookings
+        self.interval = interval
+        self.tracked: Dict[int, TrackedBrowser] = {}  # id(booker) -> tree
+        self.bookings: deque = deque(maxlen=history)
+        self.recycles = {"context": 0, "browser": 0}
+        self.lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+
+    def track(self, booker, root_pid: Optional[int]) -> None:
+        if not self.enabled or root_pid is None:
+            return
+        with self.lock:
+            self.tracked[id(booker)] = TrackedBrowser(root_pid)
+        self._ensure_sampler()
+
+    def untrack(self, booker) -> None:
+        with self.lock:
+            self.tracked.pop(id(booker), None)
+
+    def _ensure_sampler(self) -> None:
+        if self._sampler is None:
+            self._sampler = threading.Thread(target=self._sample_forever, name="browser-watchdog", daemon=True)
+            self._sampler.start()
+
+    def _sample_forever(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            with self.lock:
+                browsers = list(self.tracked.values())
+            for browser in browsers:
+                browser.sample()
+
+    def begin_booking(self, booker, booking_id: Optional[str]) -> None:
+        browser = self.tracked.get(id(booker))
+        if browser is None:
+            return
+        browser.sample()
+        browser.current = {
+            "booking_id": booking_id,
+            "rss_start_mb": browser.rss_mb,
+            "rss_peak_mb": browser.rss_mb,
+            "cpu_start": browser.cpu_seconds,
+            "started": time.time(),
+        }
+
+    def end_booking(self, booker) -> Optional[Dict[str, Any]]:
+        """Close the booking's accounting record and return it"""
+        browser = self.tracked.get(id(booker))
+        if browser is None or browser.current is None:
+            return None
+        browser.sample()
+        current, browser.current = browser.current, None
+        browser.bookings_served += 1
+        record = {
+            "booking_id": current["booking_id"],
+            "rss_start_mb": round(current["rss_start_mb"], 1),
+            "rss_end_mb": round(browser.rss_mb, 1),
+            "rss_peak_mb": round(current["rss_peak_mb"], 1),
+            "rss_growth_mb": round(browser.rss_mb - current["rss_start_mb"], 1),
+            "cpu_seconds": round(browser.cpu_seconds - current["cpu_start"], 2),
+            "duration_s": round(time.time() - current["started"], 1),
+        }
+        self.bookings.append(record)
+        return record
+
+    def recycle_action(self, booker) -> Optional[str]:
+        """
+        What to recycle before the next booking: "context", "browser" or
+        None. A context recycle that didn't bring RSS down escalates.
+        """
+        browser = self.tracked.get(id(booker))
+        if browser is None:
+            return None
+        if browser.bookings_served >= self.max_bookings:
+            return "browser"
+        if browser.rss_mb <= self.max_rss_mb:
+            return None
+        return "browser" if getattr(booker, "context_recycled", False) else "context"
+
+    def record_recycle(self, booker, action: str) -> None:
+        self.recycles[action] += 1
+        browser = self.tracked.get(id(booker))
+        if browser is not None:
+            logger.warning("Recycling %s: tree RSS %.0fMB after %d bookings",
+                           action, browser.rss_mb, browser.bookings_served)
+            browser.sample()
+
+    def snapshot(self) -> Dict[str, Any]:
+        records: List[Dict[str, Any]] = list(self.bookings)
+        count = len(records)
+        return {
+            "enabled": self.enabled,
+            "max_rss_mb": self.max_rss_mb,
+            "max_bookings": self.max_bookings,
+            "recycles": dict(self.recycles),
+            "browsers": [
+                {"rss_mb": round(b.rss_mb, 1), "processes": len(b.processes), "bookings_served": b.bookings_served}
+                for b in list(self.tracked.values())
+            ],
+            "per_booking": {
+                "samples": count,
+                "avg_peak_mb": round(sum(r["rss_peak_mb"] for r in records) / count, 1) if count else None,
+                "avg_growth_mb": round(sum(r["rss_growth_mb"] for r in records) / count, 1) if count else None,
+                "avg_cpu_seconds": round(sum(r["cpu_seconds"] for r in records) / count, 2) if count else None,
+            },
+            "recent": records[-10:],
+        }
+
+
+watchdog = BrowserWatchdog(
+    max_rss_mb=float(os.getenv("BROWSER_MAX_RSS_MB", "1500")),
+    max_bookings=int(os.getenv("BROWSER_MAX_BOOKINGS", "50")),
+    interval=float(os.getenv("BROWSER_WATCHDOG_INTERVAL", "2")),
+)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Resy API endpoints used by book_resy.py
+
+    uvicorn resy_standin:app --port 8081
+    RESY_API_BASE=http://localhost:8081 python main.py
+
+Venues and slots are generated in memory; booked slots disappear from /4/find.
+"""
+
+import uuid
+from typing import Dict, Any, Set, Tuple
+
+from fastapi import FastAPI, HTTPException, Form
+from pydantic import BaseModel
+
+app = FastAPI(title="Resy Stand-in")
+
+VENUES = [
+    {"id": {"resy": 1001}, "name": "Nobu", "location": {"name": "Los Angeles", "code": "la"},
+     "_geoloc": {"lat": 34.0522, "lng": -118.2437}},
+    {"id": {"resy": 1002}, "name": "Katana", "location": {"name": "Los Angeles", "code": "la"},
+     "_geoloc": {"lat": 34.0907, "lng": -118.3850}},
+    {"id": {"resy": 2001}, "name": "Carbone", "location": {"name": "New York", "code": "ny"},
+     "_geoloc": {"lat": 40.7280, "lng": -74.0003}},
+]
+
+SLOT_TIMES = ["17:00", "17:30", "18:00", "18:30", "19:00", "19:30", "20:00", "20:30", "21:00"]
+
+# (venue_id, day, time) tuples that have been booked
+booked_slots: Set[Tuple[int, str, str]] = set()
+# book_token -> slot it was issued for
+book_tokens: Dict[str, Tuple[int, str, str]] = {}
+
+
+class SearchRequest(BaseModel):
+    query: str
+    per_page: int = 5
+    types: list = ["venue"]
+
+
+class DetailsRequest(BaseModel):
+    config_id: str
+    day: str
+    party_size: int
+
+
+def _config_token(venue_id: int, day: str, time: str) -> str:
+    return f"rgs://resy/{venue_id}/{day}/{time}"
+
+
+@app.post("/3/venuesearch/search")
+async def venue_search(request: SearchRequest):
+    query = request.query.lower()
+    hits = [venue for venue in VENUES if venue["name"].lower() in query or query in venue["name"].lower()]
+    return {"search": {"hits": hits[:request.per_page]}}
+
+
+@app.get("/4/find")
+async def find(venue_id: int, day: str, party_size: int, lat: float = 0, long: float = 0):
+    slots = []
+    for time in SLOT_TIMES:
+        if (venue_id, day, time) in booked_slots:
+            continue
+        slots.append({
+            "config": {"id": len(slots) + 1, "token": _config_token(venue_id, day, time), "type": "Dining Room"},
+            "date": {"start": f"{day} {time}:00", "end": f"{day} {time}:00"},
+            "size": {"min": 1, "max": 8},
+        })
+    return {"results": {"venues": [{"venue": {"id": {"resy": venue_id}}, "slots": slots}]}}
+
+
+@app.post("/3/details")
+async def details(request: DetailsRequest):
+    try:
+        _, _, venue_id, day, time = request.config_id.split("/")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid config_id")
+    slot = (int(venue_id), day, time)
+    if slot in booked_slots:
+        raise HTTPException(status_code=412, detail="Slot no longer available")
+    token = uuid.uuid4().hex
+    book_tokens[token] = slot
+    return {
+        "book_token": {"value": token, "date_expires": f"{day} 23:59:59"},
+        "user": {"payment_methods": [{"id": 42, "is_default": True}]},
+    }
+
+
+@app.post("/3/book")
+async def book(book_token: str = Form(...), source_id: str = Form(None), struct_payment_method: str = Form(None)):
+    slot = book_tokens.pop(book_token, None)
+    if slot is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired book token")
+    if slot in booked_slots:
+        raise HTTPException(status_code=412, detail="Slot no longer available")
+    booked_slots.add(slot)
+    return {"resy_token": uuid.uuid4().hex, "reservation_id": len(booked_slots) + 500000}
+
+
+@app.post("/reset")
+async def reset() -> Dict[str, Any]:
+    booked_slots.clear()
+    book_tokens.clear()
+    return {"message": "Stand-in state cleared"}
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run("resy_standin:app", host="127.0.0.1", port=8081, log_level="info")
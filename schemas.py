@@ -0,0 +1,23 @@
+"""
+Schemas shared between the API and the parsing layer.
+"""
+
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class ParsedReservation(BaseModel):
+    restaurant: Optional[str] = None
+    date: Optional[str] = None
+    time: Optional[str] = None
+    party_size: Optional[int] = None
+    location: Optional[str] = None
+    phone: Optional[str] = None
+    email: Optional[str] = None
+    restaurant_url: Optional[str] = None
+    speculation_token: Optional[str] = Field(None, description="Hand back to /book to use the browser warmed after /parse")
+
+
+# Fields a parse must produce before a booking can be attempted
+REQUIRED_FIELDS = ("restaurant", "date", "time", "party_size")
@@ -5,20 +5,24 @@ Run this alongside your FastAPI backend
 """
 
 import http.server
-import socketserver
 import os
 import webbrowser
 from pathlib import Path
 
+from frontend_static import FINGERPRINTED, IMMUTABLE_CACHE, REVALIDATE_CACHE, frontend_directory
+
 class CustomHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
     def __init__(self, *args, **kwargs):
-        super().__init__(*args, directory=str(Path("frontend").absolute()), **kwargs)
+        super().__init__(*args, directory=str(frontend_directory().absolute()), **kwargs)
 
     def end_headers(self):
         # Add CORS headers
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        # Fingerprinted build assets never change; everything else revalidates
+        path = self.path.split('?', 1)[0]
+        self.send_header('Cache-Control', IMMUTABLE_CACHE if FINGERPRINTED.search(path) else REVALIDATE_CACHE)
         super().end_headers()
 
 def serve_frontend(port=3000, open_browser=True):
@@ -35,9 +39,10 @@ def serve_frontend(port=3000, open_browser=True):
     # Start server
     handler = CustomHTTPRequestHandler
     
-    with socketserver.TCPServer(("", port), handler) as httpd:
+    # Threaded so one slow client doesn't stall every other request
+    with http.server.ThreadingHTTPServer(("", port), handler) as httpd:
         print(f"🌐 Frontend server starting at http://localhost:{port}")
-        print(f"📁 Serving files from: {frontend_dir.absolute()}")
+        print(f"📁 Serving files from: {frontend_directory().absolute()}")
         print("💡 Make sure your FastAPI backend is running on http://localhost:8000")
         print("\n🔧 To stop the server, press Ctrl+C")
         
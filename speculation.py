@@ -0,0 +1,181 @@
+"""
+Speculative prewarm between /parse and /book.
+
+Once a reservation is parsed the user usually confirms it a few seconds
+later. Instead of idling, /parse starts a browser session under a
+speculation token and runs the restaurant search there, leaving the page on
+the slot list. /book hands the token back; if the reservation details still
+match, the booking adopts the warm session and the pipeline's search step is
+skipped because the slot list is already on the page. Anything not adopted
+within the TTL is closed.
+
+Speculation never competes with real bookings: at most max_active run at
+once, none start while real bookings plus speculations would fill the
+browser capacity, and a booking that needs a browser evicts the oldest
+speculation when capacity is full.
+
+    SPECULATIVE_PREWARM=0          disable speculation
+    SPECULATION_MAX_ACTIVE=2       concurrent speculative sessions
+    SPECULATION_TTL=90             seconds before unused work is discarded
+    BROWSER_CAPACITY=4             browsers shared by bookings and speculation
+"""
+
+import time
+import uuid
+import asyncio
+import logging
+from typing import Optional, Dict, Any, Callable, Tuple
+
+from browser_sessions import BrowserSession, SessionManager
+
+logger = logging.getLogger(__name__)
+
+KEY_FIELDS = ("restaurant", "location", "date", "time", "party_size")
+
+
+def speculation_key(details: Dict[str, Any]) -> Optional[Tuple[str, ...]]:
+    """Normalized details a warm page depends on, or None if any are missing"""
+    values = []
+    for field in KEY_FIELDS:
+        value = details.get(field)
+        if value in (None, ""):
+            return None
+        values.append(str(value).strip().lower())
+    return tuple(values)
+
+
+class Speculation:
+    def __init__(self, token: str, key: Tuple[str, ...], session: BrowserSession):
+        self.token = token
+        self.key = key
+        self.session = session
+        self.created_at = time.monotonic()
+        self.task: Optional[asyncio.Task] = None
+        self.result: Optional[Dict[str, Any]] = None
+
+    def age(self) -> float:
+        return time.monotonic() - self.created_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        state = "warming" if self.task is not None and not self.task.done() else (
+            "ready" if self.result and self.result.get("ready") else "failed")
+        return {"state": state, "age_s": round(self.age(), 1)}
+
+
+class SpeculationManager:
+    def __init__(
+        self,
+        sessions: SessionManager,
+        warm_fn: Callable[[Any, Dict[str, Any]], Dict[str, Any]],
+        busy: Callable[[], int],
+        max_active: int = 2,
+        capacity: int = 4,
+        ttl: float = 90.0,
+        warm_timeout: float = 45.0,
+    ):
+        self.sessions = sessions
+        self.warm_fn = warm_fn
+        self.busy = busy
+        self.max_active = max_active
+        self.capacity = capacity
+        self.ttl = ttl
+        self.warm_timeout = warm_timeout
+        self.active: Dict[str, Speculation] = {}
+        self.counters = {"started": 0, "adopted": 0, "mismatched": 0, "expired": 0, "rejected": 0, "evicted": 0, "failed": 0}
+        self._reaper: Optional[asyncio.Task] = None
+
+    def start_speculation(self, details: Dict[str, Any]) -> Optional[str]:
+        """
+        Begin warming a browser for these details. Returns the speculation
+        token, or None if the details are incomplete or the budget is spent.
+        """
+        key = speculation_key(details)
+        if key is None:
+            return None
+        if len(self.active) >= self.max_active or self.busy() + len(self.active) >= self.capacity:
+            self.counters["rejected"] += 1
+            return None
+
+        token = uuid.uuid4().hex
+        speculation = Speculation(token, key, BrowserSession(f"spec-{token}", self.sessions.booker_factory))
+        speculation.task = asyncio.get_running_loop().create_task(self._warm(speculation, dict(details)))
+        self.active[token] = speculation
+        self.counters["started"] += 1
+        return token
+
+    async def _warm(self, speculation: Speculation, details: Dict[str, Any]) -> None:
+        try:
+            speculation.result = await asyncio.wait_for(
+                speculation.session.run(self.warm_fn, details), self.warm_timeout
+            )
+        except Exception as e:
+            logger.info("Speculative prewarm %s failed: %s", speculation.token[:8], e)
+            speculation.result = {"ready": False, "error": str(e)}
+        if not speculation.result.get("ready"):
+            self.counters["failed"] += 1
+            # Nothing worth adopting
+            await self.discard(speculation.token)
+
+    async def adopt(self, token: str, booking_id: str, details: Dict[str, Any]) -> bool:
+        """
+        Hand the warm session for token to booking_id if the details still
+        match what was speculated on. Returns True if the session was adopted.
+        """
+        speculation = self.active.get(token)
+        if speculation is None:
+            return False
+        if speculation_key(details) != speculation.key:
+            self.counters["mismatched"] += 1
+            await self.discard(token)
+            return False
+
+        # A warm-up still in flight is fine: the session runs calls in
+        # order, so the booking's first step queues behind it
+        del self.active[token]
+        self.sessions.adopt(booking_id, speculation.session)
+        self.counters["adopted"] += 1
+        logger.info("Booking %s adopted speculative session %s", booking_id, token[:8])
+        return True
+
+    async def discard(self, token: str) -> None:
+        speculation = self.active.pop(token, None)
+        if speculation is None:
+            return
+        if speculation.task is not None and not speculation.task.done() and speculation.task is not asyncio.current_task():
+            speculation.task.cancel()
+        await speculation.session.close()
+
+    async def make_room(self) -> None:
+        """Evict the oldest speculation if a real booking needs its browser"""
+        while self.active and self.busy() + len(self.active) >= self.capacity:
+            oldest = min(self.active.values(), key=lambda s: s.created_at)
+            self.counters["evicted"] += 1
+            await self.discard(oldest.token)
+
+    async def _reap(self) -> None:
+        while True:
+            await asyncio.sleep(max(1.0, self.ttl / 4))
+            for token, speculation in list(self.active.items()):
+                if speculation.age() > self.ttl:
+                    self.counters["expired"] += 1
+                    await self.discard(token)
+
+    def start(self) -> None:
+        if self._reaper is None:
+            self._reaper = asyncio.get_running_loop().create_task(self._reap())
+
+    async def close_all(self) -> None:
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        for token in list(self.active):
+            await self.discard(token)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "max_active": self.max_active,
+            "capacity": self.capacity,
+            "ttl_s": self.ttl,
+            "counters": dict(self.counters),
+            "active": {token[:8]: speculation.to_dict() for token, speculation in self.active.items()},
+        }
@@ -8,6 +8,7 @@ import sys
 import time
 import os
 import signal
+import argparse
 import threading
 from pathlib import Path
 
@@ -79,8 +80,21 @@ def setup_files():
     
     return True
 
+def run_production(port, workers):
+    """Run the API with several worker processes; the API also serves the frontend at /app"""
+    from production import serve
+    serve("0.0.0.0", port, workers, float(os.getenv("DRAIN_TIMEOUT", "120")))
+
 def main():
     """Main startup function"""
+    parser = argparse.ArgumentParser(description="Run the reservation app")
+    parser.add_argument("--production", action="store_true",
+                        help="Multi-process API without --reload, draining bookings on SIGTERM")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+                        help="API worker processes in production mode (default: CPU count)")
+    parser.add_argument("--port", type=int, default=8000, help="API port in production mode (default: 8000)")
+    args = parser.parse_args()
+
     print("🎯 Restaurant Reservation App Startup")
     print("=" * 50)
     
@@ -104,6 +118,13 @@ def main():
         return
     
     print("✅ All required files found")
+
+    if args.production:
+        print(f"\n🏭 Production mode: {args.workers} API workers")
+        print(f"   - Backend API: http://localhost:{args.port}")
+        print(f"   - Frontend: http://localhost:{args.port}/app")
+        run_production(args.port, max(1, args.workers))
+        return
     print("\n🔧 Starting services...")
     print("   - Backend API: http://localhost:8000")
     print("   - Frontend: http://localhost:3000")
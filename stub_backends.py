@@ -0,0 +1,228 @@
+"""
+Stub parse/book backends for load testing.
+
+These stand in for `parse_reservation_request` and `stream_reservation_fields`
+(GPT-4) and `book_reservation` (Playwright) so the API can be exercised
+without an OpenAI key or a browser.
+Enable them by starting the API with RESERVATION_BACKEND=stub.
+
+Latency is drawn from a configurable distribution, e.g.
+
+    STUB_PARSE_LATENCY="lognormal:1.2,0.4"   # median 1.2s, sigma 0.4
+    STUB_BOOK_LATENCY="uniform:8,20"
+    STUB_BOOK_FAILURE_RATE=0.1
+    STUB_SEED=0                              # reproducible latencies and failures
+"""
+
+import os
+import re
+import json
+import math
+import time
+import random
+import asyncio
+import threading
+from typing import Dict, Any, Callable, AsyncIterator, Tuple
+
+from json_stream import IncrementalObjectParser
+
+# Unset or empty STUB_SEED gives a different run every time; any integer (0 too) is reproducible
+_seed = os.getenv("STUB_SEED", "").strip()
+_rng = random.Random(int(_seed) if _seed else None)
+_rng_lock = threading.Lock()
+
+
+class LatencyDistribution:
+    """
+    Samples a delay in seconds. Spec format is "<kind>:<arg1>[,<arg2>]":
+
+        constant:0.5          always 0.5s
+        uniform:0.2,1.0       uniform between 0.2s and 1.0s
+        normal:1.0,0.2        mean 1.0s, std 0.2s (clamped at 0)
+        lognormal:1.0,0.5     median 1.0s, sigma 0.5
+        exp:0.8               exponential with mean 0.8s
+    """
+
+    KINDS = ("constant", "uniform", "normal", "lognormal", "exp")
+    # kind -> spec form, one placeholder per argument
+    FORMS = {
+        "constant": "constant:<seconds>",
+        "uniform": "uniform:<low>,<high>",
+        "normal": "normal:<mean>,<std>",
+        "lognormal": "lognormal:<median>,<sigma>",
+        "exp": "exp:<mean>",
+    }
+
+    def __init__(self, kind: str, *args: float):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution: {kind}")
+        self.kind = kind
+        self.args = args
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyDistribution":
+        kind, _, raw_args = spec.strip().partition(":")
+        kind = kind.strip()
+        if kind not in cls.FORMS:
+            raise ValueError(f"Unknown latency distribution {spec!r}, expected one of {', '.join(cls.KINDS)}")
+        form = cls.FORMS[kind]
+        try:
+            args = [float(a) for a in raw_args.split(",") if a.strip()]
+        except ValueError:
+            raise ValueError(f"Invalid latency distribution {spec!r}, expected {form}")
+        if len(args) != form.count("<"):
+            raise ValueError(f"Invalid latency distribution {spec!r}, expected {form}")
+        return cls(kind, *args)
+
+    def sample(self) -> float:
+        with _rng_lock:
+            if self.kind == "constant":
+                value = self.args[0]
+            elif self.kind == "uniform":
+                value = _rng.uniform(self.args[0], self.args[1])
+            elif self.kind == "normal":
+                value = _rng.gauss(self.args[0], self.args[1])
+            elif self.kind == "lognormal":
+                value = _rng.lognormvariate(math.log(self.args[0]), self.args[1])
+            else:
+                value = _rng.expovariate(1.0 / self.args[0])
+        return max(0.0, value)
+
+    def __repr__(self) -> str:
+        return f"{self.kind}:{','.join(str(a) for a in self.args)}"
+
+
+def _should_fail(rate: float) -> bool:
+    with _rng_lock:
+        return _rng.random() < rate
+
+
+def _extract_fields(prompt: str) -> Dict[str, Any]:
+    """
+    Cheap regex extraction so stubbed /parse responses look like real ones
+    """
+    parsed: Dict[str, Any] = {}
+
+    match = re.search(r"(?:at|called)\s+(?:the restaurant called\s+)?([A-Z][\w'&]*(?:\s+[A-Z][\w'&]*)*)", prompt)
+    parsed["restaurant"] = match.group(1) if match else "Nobu"
+
+    match = re.search(r"\bin\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)", prompt)
+    parsed["location"] = match.group(1) if match else "Los Angeles"
+
+    match = re.search(r"for\s+(\d+)\s+(?:people|guests|persons)", prompt)
+    parsed["party_size"] = int(match.group(1)) if match else 2
+
+    match = re.search(r"(\d{4})-(\d{2})-(\d{2})", prompt)
+    if match:
+        months = ["January", "February", "March", "April", "May", "June", "July",
+                  "August", "September", "October", "November", "December"]
+        parsed["date"] = f"{months[int(match.group(2)) - 1]},{int(match.group(3))},{match.group(1)}"
+    else:
+        parsed["date"] = "June,5,2025"
+
+    match = re.search(r"\b(\d{1,2}:\d{2})\b", prompt)
+    parsed["time"] = match.group(1) if match else "19:00"
+
+    match = re.search(r"\b(\d{10})\b", prompt)
+    if match:
+        parsed["phone"] = match.group(1)
+
+    match = re.search(r"[\w.+-]+@[\w-]+\.[\w.]+", prompt)
+    if match:
+        parsed["email"] = match.group(0)
+
+    return parsed
+
+
+def make_stub_parser(latency: LatencyDistribution, failure_rate: float = 0.0) -> Callable[[str], dict]:
+    """Build a drop-in replacement for parse_reservation_request"""
+    def parse_reservation_request(prompt: str) -> dict:
+        # Blocking sleep on purpose: the live parser makes a synchronous
+        # OpenAI call, so the stub should hold the worker the same way.
+        time.sleep(latency.sample())
+        if _should_fail(failure_rate):
+            return {}
+        return _extract_fields(prompt)
+
+    return parse_reservation_request
+
+
+def make_stub_stream_parser(latency: LatencyDistribution, failure_rate: float = 0.0, chunk_chars: int = 4):
+    """
+    Build a drop-in replacement for stream_reservation_fields. The JSON the
+    regex extractor produces is released a few characters at a time over
+    the sampled completion latency and run through the incremental parser,
+    like tokens from a streamed completion.
+    """
+    async def stream_reservation_fields(prompt: str) -> AsyncIterator[Tuple[str, Any]]:
+        total = latency.sample()
+        if _should_fail(failure_rate):
+            await asyncio.sleep(total)
+            return
+        text = json.dumps(_extract_fields(prompt), indent=2)
+        chunks = [text[i:i + chunk_chars] for i in range(0, len(text), chunk_chars)]
+        parser = IncrementalObjectParser()
+        for chunk in chunks:
+            await asyncio.sleep(total / len(chunks))
+            for field, value in parser.feed(chunk):
+                yield field, value
+
+    return stream_reservation_fields
+
+
+def make_stub_completion(latency: LatencyDistribution, failure_rate: float = 0.0):
+    """
+    Build a completion backend for parse_reservation.set_completion_backend:
+    the regex extractor's JSON, after the sampled latency, with token
+    counts estimated at four characters per token
+    """
+    def complete(model: str, messages: list, **kwargs) -> Tuple[str, Dict[str, int]]:
+        time.sleep(latency.sample())
+        content = "I could not understand that request." if _should_fail(failure_rate) \
+            else json.dumps(_extract_fields(messages[-1]["content"]))
+        prompt_chars = sum(len(message["content"]) for message in messages)
+        return content, {"prompt_tokens": prompt_chars // 4 + 1, "completion_tokens": len(content) // 4 + 1}
+
+    return complete
+
+
+def make_stub_booker(latency: LatencyDistribution, failure_rate: float = 0.0) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """Build a drop-in replacement for book_reservation"""
+    def book_reservation(data: Dict[str, Any]) -> Dict[str, Any]:
+        for field in ["restaurant", "location"]:
+            if field not in data:
+                return {
+                    "success": False,
+                    "error": f"Missing required field: {field}"
+                }
+
+        time.sleep(latency.sample())
+        if _should_fail(failure_rate):
+            return {
+                "success": False,
+                "error": "Failed to confirm reservation"
+            }
+        return {
+            "success": True,
+            "message": "Reservation booked successfully (verification code not provided)"
+        }
+
+    return book_reservation
+
+
+def _env_distribution(name: str, default: str) -> LatencyDistribution:
+    return LatencyDistribution.parse(os.getenv(name, default))
+
+
+def _env_rate(name: str, default: float = 0.0) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+PARSE_LATENCY = _env_distribution("STUB_PARSE_LATENCY", "lognormal:1.5,0.4")
+PARSE_FAILURE_RATE = _env_rate("STUB_PARSE_FAILURE_RATE")
+BOOK_LATENCY = _env_distribution("STUB_BOOK_LATENCY", "uniform:10,25")
+BOOK_FAILURE_RATE = _env_rate("STUB_BOOK_FAILURE_RATE")
+
+parse_reservation_request = make_stub_parser(PARSE_LATENCY, PARSE_FAILURE_RATE)
+stream_reservation_fields = make_stub_stream_parser(PARSE_LATENCY, PARSE_FAILURE_RATE)
+book_reservation = make_stub_booker(BOOK_LATENCY, BOOK_FAILURE_RATE)
@@ -1,6 +1,7 @@
 import requests
 import time
 import json
+import uuid
 
 # Base URL for your API
 BASE_URL = "http://localhost:8000"
@@ -107,6 +108,34 @@ def test_health_endpoint():
     else:
         print(f"❌ Health check failed: {response.text}")
 
+def test_idempotency_key_reuse():
+    """Test reusing an Idempotency-Key for a different reservation leaves no booking behind"""
+    print("\n🧪 Testing Idempotency-Key reuse with a different reservation...")
+
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+    reservation = {
+        "restaurant": "Nobu",
+        "date": "2025-06-25",
+        "time": "19:00",
+        "party_size": 4,
+        "location": "Los Angeles",
+        "phone": "1234567890",
+        "email": "test@test.com"
+    }
+    first = requests.post(f"{BASE_URL}/book", json={"reservation_details": reservation}, headers=headers)
+    assert first.status_code == 200, first.text
+    booking_id = first.json()["booking_id"]
+
+    before = requests.get(f"{BASE_URL}/bookings").json()["total"]
+    changed = dict(reservation, party_size=2)
+    response = requests.post(f"{BASE_URL}/book", json={"reservation_details": changed}, headers=headers)
+    assert response.status_code == 422, response.text
+    after = requests.get(f"{BASE_URL}/bookings").json()["total"]
+    assert after == before, f"rejected request left a session behind ({before} -> {after})"
+    print("✅ Reused key rejected with 422 and no orphaned session")
+
+    requests.delete(f"{BASE_URL}/booking/{booking_id}")
+
 def main():
     """Run all tests"""
     print("🚀 Starting API tests...\n")
@@ -114,6 +143,8 @@ def main():
     # Test health endpoint first
     test_health_endpoint()
     
+    test_idempotency_key_reuse()
+
     # Test parsing
     parsed_data = test_parse_endpoint()
     
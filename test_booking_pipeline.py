@@ -0,0 +1,94 @@
+import time
+
+from booking_pipeline import BookingPipeline, Step, RetryPolicy, Unavailable
+from circuit_breaker import BreakerRegistry, CircuitOpenError, CLOSED, OPEN
+
+
+class FakePage:
+    url = "https://www.opentable.com/r/standin"
+
+
+class FakeBooker:
+    page = FakePage()
+
+
+def _run_step(booker, name, fn, *args):
+    return fn(*args)
+
+
+def _pipeline(select_slot, breakers: BreakerRegistry) -> BookingPipeline:
+    return BookingPipeline([
+        Step("search", lambda booker, data: True, error="Could not find restaurant"),
+        Step("select_slot", select_slot, error="Failed to confirm reservation", retry=RetryPolicy(attempts=2, backoff=0)),
+    ], breakers=breakers)
+
+
+def _breakers() -> BreakerRegistry:
+    return BreakerRegistry(window=10, min_calls=3, failure_rate=0.5, open_seconds=60)
+
+
+def test_sold_out_keeps_circuit_closed():
+    """Test sold-out slots fail the booking without opening the step's breaker"""
+    print("🧪 Testing sold-out results against the circuit breaker...")
+    breakers = _breakers()
+    calls = []
+
+    def sold_out(booker, data):
+        calls.append(1)
+        return Unavailable("7:00 PM is not available")
+
+    pipeline = _pipeline(sold_out, breakers)
+    for _ in range(8):
+        outcome = pipeline.run(FakeBooker(), {}, _run_step)
+        assert not outcome["success"] and outcome.get("unavailable"), outcome
+        assert outcome["error"] == "7:00 PM is not available", outcome
+        assert not outcome.get("circuit_open"), outcome
+    assert breakers.get("step:select_slot").state == CLOSED
+    # Unavailable isn't retried
+    assert len(calls) == 8, f"expected 8 attempts, got {len(calls)}"
+    print("✅ Circuit stays closed after 8 sold-out bookings")
+
+
+def test_broken_step_opens_circuit():
+    """Test a step that keeps failing opens its breaker and later bookings fail fast"""
+    print("\n🧪 Testing a broken step against the circuit breaker...")
+    breakers = _breakers()
+    pipeline = _pipeline(lambda booker, data: False, breakers)
+    for _ in range(3):
+        pipeline.run(FakeBooker(), {}, _run_step)
+    assert breakers.get("step:select_slot").state == OPEN
+
+    start = time.perf_counter()
+    outcome = pipeline.run(FakeBooker(), {}, _run_step)
+    assert outcome.get("circuit_open") and outcome["failed_step"] == "select_slot", outcome
+    print(f"✅ Circuit opened; next booking failed fast in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+
+def test_open_selector_group_keeps_step_closed():
+    """Test a step failing fast on an open selector group doesn't count against the step's breaker"""
+    print("\n🧪 Testing an open selector group against the step's circuit breaker...")
+    breakers = _breakers()
+
+    def broken_selectors(booker, data):
+        raise CircuitOpenError("selectors:date_picker", 42.0)
+
+    pipeline = _pipeline(broken_selectors, breakers)
+    for _ in range(8):
+        outcome = pipeline.run(FakeBooker(), {}, _run_step)
+        assert outcome.get("circuit_open") and outcome["retry_after"] == 42.0, outcome
+        assert outcome["failed_step"] == "select_slot", outcome
+    for name in ("step:search", "step:select_slot"):
+        assert breakers.get(name).state == CLOSED, f"{name} is {breakers.get(name).state}"
+    print("✅ Step circuits stay closed while a selector group is open")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 Starting booking pipeline tests...\n")
+    test_sold_out_keeps_circuit_closed()
+    test_broken_step_opens_circuit()
+    test_open_selector_group_keeps_step_closed()
+
+
+if __name__ == "__main__":
+    main()
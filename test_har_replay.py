@@ -0,0 +1,70 @@
+import os
+import time
+
+import pytest
+from playwright.sync_api import sync_playwright
+
+from har_replay import DEFAULT_HAR, load_recording, replay_booking, sidecar_path
+
+# Record one with: python har_replay.py record
+HAR_PATH = os.getenv("OPENTABLE_HAR_FIXTURE", DEFAULT_HAR)
+
+
+def chromium_installed() -> bool:
+    try:
+        with sync_playwright() as p:
+            return os.path.exists(p.chromium.executable_path)
+    except Exception:
+        return False
+
+
+def skip_reason() -> str:
+    """Why the replay tests can't run here, or "" if they can"""
+    if not os.path.exists(HAR_PATH) or not os.path.exists(sidecar_path(HAR_PATH)):
+        return f"No recording at {HAR_PATH}; run 'python har_replay.py record' first"
+    if not chromium_installed():
+        return "Chromium is not installed; run 'playwright install chromium'"
+    return ""
+
+
+SKIP_REASON = skip_reason()
+requires_recording = pytest.mark.skipif(bool(SKIP_REASON), reason=SKIP_REASON)
+
+
+@requires_recording
+def test_replay_matches_recording():
+    """Test the booking flow reaches the same step on recorded traffic"""
+    print("🧪 Testing OpenTable flow against recorded HAR...")
+    recording = load_recording(HAR_PATH)
+    outcome, elapsed = replay_booking(HAR_PATH)
+    print(f"Replay took {elapsed:.2f}s: {outcome}")
+    # A selector that no longer matches the recorded pages shows up as a
+    # different failed_step (or a failure where the recording succeeded)
+    assert outcome == recording["outcome"], f"expected {recording['outcome']}, got {outcome}"
+    print("✅ Replay matches recording")
+
+
+@requires_recording
+def test_replay_is_deterministic():
+    """Test two replays of the same HAR end the same way"""
+    print("\n🧪 Testing replay determinism...")
+    first, _ = replay_booking(HAR_PATH)
+    second, _ = replay_booking(HAR_PATH)
+    assert first == second, f"{first} != {second}"
+    print("✅ Replays are deterministic")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 Starting HAR replay tests...\n")
+    if SKIP_REASON:
+        print(f"⚠️  {SKIP_REASON}")
+        return
+    start = time.perf_counter()
+    test_replay_matches_recording()
+    test_replay_is_deterministic()
+    print(f"\n⏱️  Total {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import time
+import asyncio
+
+import httpx
+
+from book_resy import ResyClient, book_resy_async, to_resy_day
+from resy_standin import app as standin_app
+
+RESERVATION = {
+    "restaurant": "Nobu",
+    "location": "Los Angeles",
+    "date": "June,20,2025",
+    "time": "19:00",
+    "party_size": 4,
+    "phone": "1234567890",
+    "email": "test@test.com"
+}
+
+
+def _standin_client() -> ResyClient:
+    """ResyClient wired straight to the stand-in app, no network needed"""
+    return ResyClient(base_url="http://resy.standin", transport=httpx.ASGITransport(app=standin_app))
+
+
+async def _book(data):
+    client = _standin_client()
+    try:
+        await client.client.post("/reset")
+        start = time.perf_counter()
+        first = await book_resy_async(data, client)
+        elapsed = time.perf_counter() - start
+        second = await book_resy_async(data, client)
+        return first, second, elapsed
+    finally:
+        await client.close()
+
+
+def test_date_conversion():
+    """Test parsed dates convert to Resy's day format"""
+    print("🧪 Testing date conversion...")
+    assert to_resy_day("June,5,2025") == "2025-06-05"
+    assert to_resy_day("2025-06-05") == "2025-06-05"
+    print("✅ Date conversion OK")
+
+
+def test_resy_booking_flow():
+    """Test venue lookup, slot find, details and book against the stand-in"""
+    print("\n🧪 Testing Resy booking against stand-in...")
+    first, second, elapsed = asyncio.run(_book(RESERVATION))
+    print(f"First booking: {first} ({elapsed * 1000:.0f} ms)")
+    print(f"Second booking: {second}")
+
+    assert first["success"], first
+    assert first["provider"] == "resy"
+    assert first["reservation_id"]
+    # The slot was taken by the first booking
+    assert not second["success"]
+    print("✅ Resy booking flow OK")
+
+
+def test_resy_unknown_restaurant():
+    """Test that an unknown venue fails with the usual error shape"""
+    print("\n🧪 Testing unknown restaurant...")
+    first, _, _ = asyncio.run(_book({**RESERVATION, "restaurant": "Nowhere Bistro"}))
+    assert not first["success"]
+    assert "Could not find restaurant" in first["error"]
+    print("✅ Unknown restaurant handled")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 Starting Resy provider tests...\n")
+    test_date_conversion()
+    test_resy_booking_flow()
+    test_resy_unknown_restaurant()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+"""
+Shared availability watching.
+
+Users waiting on a sold-out restaurant subscribe to a watch instead of
+resubmitting /book. Every subscription for the same (restaurant, location,
+date, party_size) and time window shares one SlotPoller, which keeps a
+single browser page on the slot list and reloads it, so page loads scale
+with distinct venues rather than with users. OpenTable only lists slots
+near the searched time, so each window of WATCH_TIME_WINDOW_MINUTES (by a
+subscription's earliest wanted time, 19:00 if it has none) gets its own
+poller, searching at the middle of the window.
+
+The poll interval adapts:
+  - it backs off by 1.5x for every poll that saw no change, up to max_interval
+  - more subscribers shorten it
+  - near times of day when this venue has released slots before, it drops to
+    min_interval
+
+Each poll's slot diff is pushed to subscribers (served as SSE by app.py). A
+subscription with auto_book set fires on_hit once when one of its wanted
+times appears, and then ends.
+
+A subscription nobody streams events from expires after idle_ttl (auto-book
+ones after auto_book_ttl, since they don't need a reader); the poller drops
+expired subscribers before each poll and stops with the last one.
+
+    WATCH_MAX_POLLERS=8       distinct venues watched at once
+    WATCH_MIN_INTERVAL=15     seconds between polls at the fastest
+    WATCH_MAX_INTERVAL=300    seconds between polls at the slowest
+    WATCH_TIME_WINDOW_MINUTES=120
+    WATCH_IDLE_TTL=600        seconds a subscription lives without an events stream
+    WATCH_AUTO_BOOK_TTL=86400 the same for auto-book subscriptions
+"""
+
+import os
+import math
+import time
+import uuid
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Callable, Awaitable, Tuple
+
+from browser_sessions import BrowserSession, SessionManager
+
+logger = logging.getLogger(__name__)
+
+KEY_FIELDS = ("restaurant", "location", "date", "party_size")
+RELEASE_BUCKET_MINUTES = 15
+TIME_WINDOW_MINUTES = int(os.getenv("WATCH_TIME_WINDOW_MINUTES", "120"))
+DEFAULT_TIME = "19:00"
+
+
+def time_window(times: List[str]) -> int:
+    """Index of the time window holding the earliest wanted time"""
+    anchor = min(times) if times else DEFAULT_TIME
+    try:
+        hours, minutes = (int(part) for part in anchor.split(":"))
+    except ValueError:
+        return time_window([])
+    return (hours * 60 + minutes) // TIME_WINDOW_MINUTES
+
+
+def window_search_time(window: int) -> str:
+    """The "HH:MM" a poller searches at: the middle of its window"""
+    minutes = min(window * TIME_WINDOW_MINUTES + TIME_WINDOW_MINUTES // 2, 23 * 60 + 59)
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def watch_key(details: Dict[str, Any], times: Optional[List[str]] = None) -> Tuple[str, ...]:
+    venue = tuple(str(details.get(field) or "").strip().lower() for field in KEY_FIELDS)
+    return venue + (str(time_window(times or [])),)
+
+
+def slot_to_24h(text: str) -> str:
+    """Convert a slot label like "7:00 PM" to "19:00"; unparseable labels pass through"""
+    try:
+        return datetime.strptime(text.strip(), "%I:%M %p").strftime("%H:%M")
+    except ValueError:
+        return text.strip()
+
+
+class Subscription:
+    def __init__(self, watch_id: str, key: Tuple[str, ...], details: Dict[str, Any], times: List[str], auto_book: bool):
+        self.watch_id = watch_id
+        self.key = key
+        self.details = details
+        self.times = set(times)
+        self.auto_book = auto_book
+        self.events: asyncio.Queue = asyncio.Queue(maxsize=100)
+        self.closed = False
+        # Open events streams, and when one was last open (or the subscription was made)
+        self.listeners = 0
+        self.last_seen = time.monotonic()
+
+    def attach(self) -> None:
+        self.listeners += 1
+
+    def detach(self) -> None:
+        self.listeners = max(0, self.listeners - 1)
+        self.last_seen = time.monotonic()
+
+    def idle_for(self, now: float) -> float:
+        return 0.0 if self.listeners else now - self.last_seen
+
+    def push(self, event: Dict[str, Any]) -> None:
+        if self.events.full():
+            # A stalled client only misses the oldest diffs
+            self.events.get_nowait()
+        self.events.put_nowait(event)
+
+    def wanted(self, slots: List[str]) -> Optional[str]:
+        """First slot matching this subscription's times (any slot if none given)"""
+        for slot in slots:
+            if not self.times or slot in self.times:
+                return slot
+        return None
+
+
+class SlotPoller:
+    def __init__(self, key: Tuple[str, ...], details: Dict[str, Any], session: BrowserSession):
+        self.key = key
+        self.details = details
+        self.session = session
+        self.subscribers: Dict[str, Subscription] = {}
+        self.slots: Optional[List[str]] = None
+        self.unchanged_polls = 0
+        self.failures = 0
+        self.polls = 0
+        self.interval = 0.0
+        self.last_poll: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+class AvailabilityWatcher:
+    def __init__(
+        self,
+        sessions: SessionManager,
+        poll_fn: Callable[[Any, Dict[str, Any]], Dict[str, Any]],
+        on_hit: Optional[Callable[[Subscription, str], Awaitable[Optional[str]]]] = None,
+        max_pollers: int = 8,
+        min_interval: float = 15.0,
+        max_interval: float = 300.0,
+        idle_ttl: float = 600.0,
+        auto_book_ttl: float = 86400.0,
+    ):
+        self.sessions = sessions
+        self.poll_fn = poll_fn
+        self.on_hit = on_hit
+        self.max_pollers = max_pollers
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.idle_ttl = idle_ttl
+        self.auto_book_ttl = auto_book_ttl
+        self.pollers: Dict[Tuple[str, ...], SlotPoller] = {}
+        self.subscriptions: Dict[str, Subscription] = {}
+        # (restaurant, location) -> count of slot releases per time-of-day bucket
+        self.release_history: Dict[Tuple[str, str], Counter] = {}
+        self.page_loads = 0
+
+    def subscribe(self, details: Dict[str, Any], times: Optional[List[str]] = None, auto_book: bool = False) -> Subscription:
+        """Raises RuntimeError if a new venue would exceed max_pollers"""
+        key = watch_key(details, times)
+        poller = self.pollers.get(key)
+        if poller is None:
+            if len(self.pollers) >= self.max_pollers:
+                raise RuntimeError("Too many restaurants are being watched, try again later")
+            session = BrowserSession(f"watch-{uuid.uuid4().hex[:8]}", self.sessions.booker_factory)
+            search = {**details, "time": window_search_time(int(key[-1]))}
+            poller = SlotPoller(key, search, session)
+            self.pollers[key] = poller
+            poller.task = asyncio.get_running_loop().create_task(self._run(poller))
+            logger.info("Started availability poller for %s", key[0])
+
+        subscription = Subscription(uuid.uuid4().hex, key, dict(details), times or [], auto_book)
+        poller.subscribers[subscription.watch_id] = subscription
+        self.subscriptions[subscription.watch_id] = subscription
+        if poller.slots is not None:
+            subscription.push(self._event("snapshot", poller, poller.slots, [], []))
+        return subscription
+
+    async def unsubscribe(self, watch_id: str) -> bool:
+        subscription = self.subscriptions.pop(watch_id, None)
+        if subscription is None:
+            return False
+        subscription.closed = True
+        subscription.push({"type": "closed"})
+        poller = self.pollers.get(subscription.key)
+        if poller is not None:
+            poller.subscribers.pop(watch_id, None)
+            if not poller.subscribers:
+                await self._stop(poller)
+        return True
+
+    async def _reap(self, poller: SlotPoller) -> None:
+        """Unsubscribe the poller's subscribers nobody has streamed from for their TTL"""
+        now = time.monotonic()
+        for subscription in list(poller.subscribers.values()):
+            ttl = self.auto_book_ttl if subscription.auto_book else self.idle_ttl
+            if subscription.idle_for(now) > ttl:
+                logger.info("Watch %s expired after %.0fs without a listener", subscription.watch_id, ttl)
+                await self.unsubscribe(subscription.watch_id)
+
+    async def _stop(self, poller: SlotPoller) -> None:
+        self.pollers.pop(poller.key, None)
+        if poller.task is not None and poller.task is not asyncio.current_task():
+            poller.task.cancel()
+        await poller.session.close()
+        logger.info("Stopped availability poller for %s after %d polls", poller.key[0], poller.polls)
+
+    def _near_release(self, poller: SlotPoller, now: datetime) -> bool:
+        history = self.release_history.get(poller.key[:2])
+        if not history:
+            return False
+        bucket = (now.hour * 60 + now.minute) // RELEASE_BUCKET_MINUTES
+        per_day = 24 * 60 // RELEASE_BUCKET_MINUTES
+        return any(history.get((bucket + offset) % per_day) for offset in (-1, 0, 1))
+
+    def next_interval(self, poller: SlotPoller, now: Optional[datetime] = None) -> float:
+        if self._near_release(poller, now or datetime.now()):
+            return self.min_interval
+        interval = self.min_interval * (1.5 ** poller.unchanged_polls) * (1.5 ** poller.failures)
+        interval /= 1 + math.log2(max(1, len(poller.subscribers)))
+        return max(self.min_interval, min(self.max_interval, interval))
+
+    def _record_release(self, poller: SlotPoller) -> None:
+        now = datetime.now()
+        bucket = (now.hour * 60 + now.minute) // RELEASE_BUCKET_MINUTES
+        self.release_history.setdefault(poller.key[:2], Counter())[bucket] += 1
+
+    def _event(self, kind: str, poller: SlotPoller, slots: List[str], added: List[str], removed: List[str]) -> Dict[str, Any]:
+        return {
+            "type": kind,
+            "restaurant": poller.details.get("restaurant"),
+            "date": poller.details.get("date"),
+            "party_size": poller.details.get("party_size"),
+            "slots": slots,
+            "added": added,
+            "removed": removed,
+            "at": datetime.now().isoformat(timespec="seconds"),
+        }
+
+    async def _poll(self, poller: SlotPoller) -> None:
+        poller.polls += 1
+        self.page_loads += 1
+        try:
+            result = await poller.session.run(self.poll_fn, poller.details)
+        except Exception as e:
+            result = {"ok": False, "error": str(e)}
+        poller.last_poll = time.monotonic()
+        if not result.get("ok"):
+            poller.failures = min(poller.failures + 1, 6)
+            logger.warning("Availability poll for %s failed: %s", poller.key[0], result.get("error"))
+            return
+        poller.failures = 0
+
+        slots = sorted({slot_to_24h(slot) for slot in result.get("slots", [])})
+        if poller.slots is None:
+            poller.slots = slots
+            for subscription in poller.subscribers.values():
+                subscription.push(self._event("snapshot", poller, slots, [], []))
+            await self._check_hits(poller, slots)
+            return
+
+        added = [slot for slot in slots if slot not in poller.slots]
+        removed = [slot for slot in poller.slots if slot not in slots]
+        poller.slots = slots
+        if not added and not removed:
+            poller.unchanged_polls = min(poller.unchanged_polls + 1, 20)
+            return
+        poller.unchanged_polls = 0
+        if added:
+            self._record_release(poller)
+        for subscription in poller.subscribers.values():
+            subscription.push(self._event("slots", poller, slots, added, removed))
+        if added:
+            await self._check_hits(poller, added)
+
+    async def _check_hits(self, poller: SlotPoller, slots: List[str]) -> None:
+        if self.on_hit is None:
+            return
+        for subscription in list(poller.subscribers.values()):
+            if not subscription.auto_book:
+                continue
+            slot = subscription.wanted(slots)
+            if slot is None:
+                continue
+            try:
+                booking_id = await self.on_hit(subscription, slot)
+            except Exception as e:
+                logger.error("Auto-book for watch %s failed to start: %s", subscription.watch_id, e)
+                continue
+            subscription.push({"type": "booking_started", "slot": slot, "booking_id": booking_id})
+            await self.unsubscribe(subscription.watch_id)
+
+    async def _run(self, poller: SlotPoller) -> None:
+        while self.pollers.get(poller.key) is poller:
+            await self._reap(poller)
+            if self.pollers.get(poller.key) is not poller:
+                break
+            await self._poll(poller)
+            if self.pollers.get(poller.key) is not poller:
+                break
+            poller.interval = self.next_interval(poller)
+            await asyncio.sleep(poller.interval)
+
+    async def close_all(self) -> None:
+        for watch_id in list(self.subscriptions):
+            await self.unsubscribe(watch_id)
+        for poller in list(self.pollers.values()):
+            await self._stop(poller)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "pollers": len(self.pollers),
+            "subscriptions": len(self.subscriptions),
+            "page_loads": self.page_loads,
+            "venues": [
+                {
+                    "restaurant": poller.details.get("restaurant"),
+                    "date": poller.details.get("date"),
+                    "party_size": poller.details.get("party_size"),
+                    "search_time": poller.details.get("time"),
+                    "subscribers": len(poller.subscribers),
+                    "polls": poller.polls,
+                    "interval_s": round(poller.interval, 1),
+                    "slots": poller.slots,
+                }
+                for poller in self.pollers.values()
+            ],
+        }
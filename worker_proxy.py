@@ -0,0 +1,88 @@
+"""
+Routing booking requests to the worker that owns the booking.
+
+With several workers on one socket (production.py), a request for a
+booking can land on any of them, but its session and any browser held for
+a verification code live in the worker that started it. Each worker also
+listens on a private Unix socket; that address is stored with the
+booking's shared status, and verify, retry and cancel requests reaching
+another worker are proxied there.
+
+Forwarded requests carry FORWARD_HEADER with a secret the master hands to
+its workers, so clients can't pose as a forwarding worker, and
+FORWARDED_CLIENT_HEADER with the original client address for the rate
+limits.
+
+    WORKER_SOCKET_DIR=<tmp dir>      where the private sockets are created
+"""
+
+import os
+import re
+import hmac
+import tempfile
+import logging
+from typing import Optional
+
+import httpx
+from starlette.requests import Request
+from starlette.responses import Response
+
+logger = logging.getLogger(__name__)
+
+FORWARD_HEADER = "x-worker-forward"
+FORWARDED_CLIENT_HEADER = "x-worker-forwarded-for"
+
+# Verification submits the code in the browser, which can take a while
+FORWARD_TIMEOUT = 120.0
+
+# Routes that act on the owning worker's booking session
+_OWNED_ROUTES = {
+    "DELETE": re.compile(r"^/booking/(?P<booking_id>[^/]+)$"),
+    "POST": re.compile(r"^/booking/(?P<booking_id>[^/]+)/(retry|verify)$"),
+}
+
+# Connection-level headers, and encodings httpx has already undone
+_HOP_HEADERS = {"host", "connection", "keep-alive", "content-length", "transfer-encoding",
+                "accept-encoding", "content-encoding", FORWARD_HEADER, FORWARDED_CLIENT_HEADER}
+
+
+def worker_socket_path(pid: int) -> str:
+    directory = os.getenv("WORKER_SOCKET_DIR", tempfile.gettempdir())
+    return os.path.join(directory, f"reservation-worker-{pid}.sock")
+
+
+def owned_booking_id(method: str, path: str) -> Optional[str]:
+    """The booking a request must be handled by its owner for, if any"""
+    pattern = _OWNED_ROUTES.get(method)
+    match = pattern.match(path) if pattern else None
+    return match["booking_id"] if match else None
+
+
+def is_forwarded(request: Request) -> bool:
+    secret = os.getenv("WORKER_FORWARD_SECRET")
+    return bool(secret) and hmac.compare_digest(request.headers.get(FORWARD_HEADER, ""), secret)
+
+
+async def forward(request: Request, address: str) -> Optional[Response]:
+    """Replay the request on the worker at address; None if that worker is gone"""
+    headers = {name: value for name, value in request.headers.items() if name not in _HOP_HEADERS}
+    headers[FORWARD_HEADER] = os.getenv("WORKER_FORWARD_SECRET", "")
+    headers[FORWARDED_CLIENT_HEADER] = request.client.host if request.client else "unknown"
+    transport = httpx.AsyncHTTPTransport(uds=address)
+    try:
+        async with httpx.AsyncClient(transport=transport, timeout=FORWARD_TIMEOUT) as client:
+            upstream = await client.request(
+                request.method,
+                f"http://worker{request.url.path}",
+                params=request.url.query,
+                content=await request.body(),
+                headers=headers,
+            )
+    except httpx.TransportError as e:
+        logger.warning("Owner worker at %s unreachable for %s %s: %s", address, request.method, request.url.path, e)
+        return None
+    return Response(
+        content=upstream.content,
+        status_code=upstream.status_code,
+        headers={name: value for name, value in upstream.headers.items() if name not in _HOP_HEADERS},
+    )